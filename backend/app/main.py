@@ -1,21 +1,65 @@
-from fastapi import FastAPI, HTTPException, Depends, Request
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException, Depends, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from app.services.services import (
-    get_es_client,
-    get_cross_encoder_model,
-    perform_elasticsearch_search,
-    rerank_with_cross_encoder,
+    get_search_backend,
+    get_document_store,
+    get_rerank_batcher,
+    get_result_cache,
+    get_score_cache,
+    get_summary_cache,
+    get_token_counter,
+    get_query_embedder,
+    get_batch_search_slots,
+    get_suggest_index,
+    perform_search_after,
+    retrieve_candidates,
+    retrieve_candidates_batch,
+    retrieve_candidates_with_facets,
+    rerank_batch_with_cascade,
+    rerank_with_cascade,
+    get_rerank_cascade,
     get_together_client,
     stream_rag_response,
 )
-from elasticsearch import Elasticsearch
-from sentence_transformers import CrossEncoder
-from together import Together
+from together import AsyncTogether
+from app.services.batching import RerankBatcher
+from app.services.cascade import RerankCascade
+from app.services.context import TokenCounter
+from app.services.embeddings import (
+    QueryEmbedder,
+    load_embedding_model,
+    preload_embedding_model,
+)
+from app.services.local_search import LocalSearchBackend
+from app.services.search_backend import ElasticsearchBackend, SearchBackend
+from app.services.documents import DocumentStore, resolve_documents
+from app.services.filters import SearchFilters
+from app.services.pagination import cursor_scope, decode_cursor, encode_cursor
+from app.services.cache import QueryResultCache, SummaryCache, build_cache_backend
+from app.services.score_cache import PairScoreCache
+from app.services.suggest import MAX_SUGGESTIONS, SuggestIndex
+from app.services.reranker import (
+    load_cross_encoder,
+    preload_cross_encoder,
+    reranker_cache_name,
+    warm_up_cross_encoder,
+)
+from app.services.responses import (
+    RESPONSE_PROFILES,
+    dumps_json,
+    json_response,
+    project_hits,
+    source_includes,
+)
+from app.services.telemetry import TimingMiddleware, render_metrics, span
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import os
-from typing import List, Dict, Optional, Any  # For type hinting
+import time
+from typing import List, Dict, Optional, Any, Tuple, Union  # For type hinting
 import json  # For JSONDecodeError
 
 # Import Pydantic BaseModel
@@ -24,14 +68,109 @@ from pydantic import BaseModel, Field
 load_dotenv()
 ES_HOSTS = os.environ.get("ELASTIC_URL_PROD")
 ES_API_KEY = os.environ.get("API_KEY")
+# "elasticsearch", or "local" for the in-process BM25 index built with
+# `python -m app.tools.build_local_index` (no Elasticsearch needed).
+SEARCH_BACKEND = os.environ.get("SEARCH_BACKEND", "elasticsearch").lower()
+LOCAL_INDEX_PATH = os.environ.get("LOCAL_INDEX_PATH", "local_index")
+# Title/author prefix index for /suggest, built with
+# `python -m app.tools.build_suggest_index`. /suggest answers 503 without it.
+SUGGEST_INDEX_PATH = os.environ.get("SUGGEST_INDEX_PATH", "suggest_index")
+# Seconds browsers may reuse a /suggest response; suggestions only change on re-ingestion.
+SUGGEST_CACHE_MAX_AGE_S = int(os.environ.get("SUGGEST_CACHE_MAX_AGE_S", "300"))
 
 TOGETHER_API_KEY = os.environ.get("TOGETHER_API_KEY")
 TOGETHER_DEFAULT_MODEL = "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free"
 TOGETHER_MODEL_NAME = os.environ.get("TOGETHER_MODEL_NAME", TOGETHER_DEFAULT_MODEL)
+# Optional override of the TogetherAI API URL, e.g. to point at a local fake server.
+TOGETHER_BASE_URL = os.environ.get("TOGETHER_BASE_URL")
 
 CROSS_ENCODER_MODEL_NAME = os.environ.get(
     "CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"
 )
+# Inference backend for the reranker: "torch", "onnx" or "int8". The ONNX
+# backends expect a model exported with `python -m app.tools.export_reranker`.
+CROSS_ENCODER_BACKEND = os.environ.get("CROSS_ENCODER_BACKEND", "torch")
+CROSS_ENCODER_ONNX_FILE = os.environ.get("CROSS_ENCODER_ONNX_FILE")
+# Number of threads allowed to run cross-encoder inference concurrently.
+# PyTorch releases the GIL inside its kernels, so a small thread pool is enough
+# to keep the event loop free without oversubscribing the CPU.
+RERANK_POOL_SIZE = int(os.environ.get("RERANK_POOL_SIZE", "2"))
+# Concurrent rerank requests are merged into one `predict` call holding up to
+# RERANK_MAX_BATCH_PAIRS pairs, waiting at most RERANK_MAX_WAIT_MS for it to fill.
+RERANK_MAX_BATCH_PAIRS = int(os.environ.get("RERANK_MAX_BATCH_PAIRS", "200"))
+RERANK_MAX_WAIT_MS = float(os.environ.get("RERANK_MAX_WAIT_MS", "5"))
+# Early-exit cascade in front of the cross-encoder. Candidates whose cheap score
+# (CASCADE_MODEL, a smaller cross-encoder, or else the first-stage score) is
+# more than CASCADE_MARGIN standard deviations below the k-th best are not
+# reranked. An empty margin disables pruning. RERANK_BUDGET_MS caps the rerank
+# depth by the measured cost per pair; requests can override it with ?budget_ms=.
+CASCADE_MODEL = os.environ.get("CASCADE_MODEL", "")
+CASCADE_MARGIN = os.environ.get("CASCADE_MARGIN", "")
+RERANK_BUDGET_MS = os.environ.get("RERANK_BUDGET_MS", "")
+
+# /search result cache: an in-process LRU, optionally backed by a store shared
+# across workers ("none", "sqlite" or "redis").
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+SEARCH_CACHE_TTL_S = float(os.environ.get("SEARCH_CACHE_TTL_S", "300"))
+SEARCH_CACHE_BACKEND = os.environ.get("SEARCH_CACHE_BACKEND", "none")
+SEARCH_CACHE_PATH = os.environ.get("SEARCH_CACHE_PATH", "search_cache.sqlite3")
+SEARCH_CACHE_REDIS_URL = os.environ.get("SEARCH_CACHE_REDIS_URL")
+
+# Persistent (query, document) cross-encoder score cache. An empty path disables it.
+PAIR_SCORE_CACHE_PATH = os.environ.get("PAIR_SCORE_CACHE_PATH", "pair_scores.mmap")
+PAIR_SCORE_CACHE_SLOTS = int(os.environ.get("PAIR_SCORE_CACHE_SLOTS", str(1 << 20)))
+
+# In-process LRU of finished LLM summaries, bounded by total text size. 0 disables it.
+SUMMARY_CACHE_MAX_BYTES = int(os.environ.get("SUMMARY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# Documents served by /search, kept so summarization requests can name them by id.
+DOCUMENT_STORE_MAX_ENTRIES = int(os.environ.get("DOCUMENT_STORE_MAX_ENTRIES", "10000"))
+DOCUMENT_STORE_TTL_S = float(os.environ.get("DOCUMENT_STORE_TTL_S", "3600"))
+
+# Hugging Face tokenizer used to budget the summarization context, ideally the
+# one of TOGETHER_MODEL_NAME. Empty (the default), or a tokenizer that fails to
+# load, falls back to a conservative estimate.
+CONTEXT_TOKENIZER = os.environ.get("CONTEXT_TOKENIZER", "")
+CONTEXT_MAX_TOKENS = int(os.environ.get("CONTEXT_MAX_TOKENS", "3000"))
+
+# Bi-encoder used for hybrid BM25 + kNN retrieval. Leave empty for BM25 only;
+# the index must have been ingested with the same --embedding_model.
+EMBEDDING_MODEL = os.environ.get("EMBEDDING_MODEL", "")
+HYBRID_NUM_CANDIDATES = int(os.environ.get("HYBRID_NUM_CANDIDATES", "100"))
+
+# BM25 hits (or fused hybrid hits) passed to the cross-encoder.
+SEARCH_CANDIDATES = int(os.environ.get("SEARCH_CANDIDATES", "20"))
+SEARCH_TOP_K = 5
+SUMMARY_MAX_DOCUMENTS = 20
+# `_source` fields returned by /search: "compact" (what the results page
+# renders) or "full". Requests can override it with ?profile=.
+SEARCH_RESPONSE_PROFILE = os.environ.get("SEARCH_RESPONSE_PROFILE", "compact")
+
+# /search pages hold up to SEARCH_MAX_PAGE_SIZE hits. Pages within the rerank
+# window (the SEARCH_CANDIDATES reranked hits) are sliced from the cached
+# window; later ones continue in BM25 order with search_after on an
+# Elasticsearch point-in-time, kept alive for SEARCH_PIT_KEEP_ALIVE per page.
+# Cursors of the same query share one; each worker shares at most
+# SEARCH_MAX_OPEN_PITS of them.
+SEARCH_MAX_PAGE_SIZE = int(os.environ.get("SEARCH_MAX_PAGE_SIZE", "50"))
+SEARCH_PIT_KEEP_ALIVE = os.environ.get("SEARCH_PIT_KEEP_ALIVE", "5m")
+SEARCH_MAX_OPEN_PITS = int(os.environ.get("SEARCH_MAX_OPEN_PITS", "64"))
+# Values counted per facet when a request asks for ?facets=true.
+SEARCH_FACET_SIZE = int(os.environ.get("SEARCH_FACET_SIZE", "10"))
+
+# POST /search/batch limits: queries per request, and batch requests served at
+# once (later ones wait), so batch jobs leave rerank capacity to /search.
+SEARCH_BATCH_MAX_QUERIES = int(os.environ.get("SEARCH_BATCH_MAX_QUERIES", "100"))
+SEARCH_BATCH_MAX_CONCURRENT = int(os.environ.get("SEARCH_BATCH_MAX_CONCURRENT", "1"))
+
+# Warm-up `predict` rounds per rerank thread before a worker reports ready on
+# /ready. 0 skips warm-up, leaving lazy initialization to the first requests.
+WARMUP_ROUNDS = int(os.environ.get("WARMUP_ROUNDS", "1"))
+
+# Per-request sampling profiler (pyinstrument): when enabled, a request sent
+# with `X-Profile: 1` writes an HTML profile to the directory, one at a time.
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "false").lower() == "true"
+PROFILER_OUTPUT_DIR = os.environ.get("PROFILER_OUTPUT_DIR", "profiles")
 
 
 class DocumentSourceModel(BaseModel):
@@ -48,58 +187,352 @@ class DocumentSourceModel(BaseModel):
 
 
 class RerankedDocumentModel(BaseModel):
-    _index: Optional[str] = None
-    _id: Optional[str] = None
-    _score: Optional[float] = None
-    _source: DocumentSourceModel
+    index: Optional[str] = Field(None, alias="_index")
+    id: Optional[str] = Field(None, alias="_id")
+    score: Optional[float] = Field(None, alias="_score")
+    source: DocumentSourceModel = Field(alias="_source")
     cross_encoder_score: Optional[float] = None
 
+    class Config:
+        populate_by_name = True
+
+
+class CompactDocumentSourceModel(BaseModel):
+    citekey: Optional[str] = None
+    title: Optional[str] = None
+    abstract: Optional[str] = None
+    year: Optional[int] = None
+    authors: Optional[List[str]] = None
+    booktitle: Optional[str] = None
+    publisher: Optional[str] = None
+    address: Optional[str] = None
+    pages: Optional[str] = None
+    url: Optional[str] = None
+
+    class Config:
+        # The "full" profile returns every stored field.
+        extra = "allow"
+
+
+class CompactRerankedDocumentModel(RerankedDocumentModel):
+    source: CompactDocumentSourceModel = Field(alias="_source")
+
+
+class FacetValueModel(BaseModel):
+    value: Union[int, str]
+    count: int  # Matching documents with this value
+
+
+class SearchResponseModel(BaseModel):
+    query: str
+    initial_hits_count: int
+    reranked_hits: List[CompactRerankedDocumentModel]
+    # With ?facets=true: the most frequent values of each facet among all matches.
+    facets: Optional[Dict[str, List[FacetValueModel]]] = None
+    # Pass back as ?cursor= for the next page; absent on the last page.
+    next_cursor: Optional[str] = None
+
+
+class BatchSearchRequestModel(BaseModel):
+    queries: List[str] = Field(min_length=1, max_length=SEARCH_BATCH_MAX_QUERIES)
+    profile: Optional[str] = None
+
+
+class BatchSearchResponseModel(BaseModel):
+    # One `/search` response per query, in request order.
+    results: List[SearchResponseModel]
+
+
+class SuggestionModel(BaseModel):
+    text: str
+    type: str  # "title" or "author"
+    count: int  # Documents with this title or author
+
+
+class SuggestResponseModel(BaseModel):
+    query: str
+    suggestions: List[SuggestionModel]
+
 
 class SummarizationRequestModel(BaseModel):
     query: str
     documents: List[RerankedDocumentModel]
 
 
+def preload_models():
+    """
+    Loads the configured models into this process, to be handed out by the
+    loaders in `lifespan`. `python -m app.serve` calls it before forking its
+    workers, so they share one copy of the weights.
+    """
+    print(f"Preloading cross-encoder model: {CROSS_ENCODER_MODEL_NAME}...")
+    preload_cross_encoder(
+        CROSS_ENCODER_MODEL_NAME,
+        backend=CROSS_ENCODER_BACKEND,
+        onnx_file=CROSS_ENCODER_ONNX_FILE,
+    )
+    if CASCADE_MODEL:
+        print(f"Preloading cascade model: {CASCADE_MODEL}...")
+        preload_cross_encoder(CASCADE_MODEL)
+    if EMBEDDING_MODEL:
+        print(f"Preloading embedding model: {EMBEDDING_MODEL}...")
+        preload_embedding_model(EMBEDDING_MODEL)
+
+
+async def warm_up(app: FastAPI) -> float:
+    """Runs every model once so the first requests do not pay for lazy initialization."""
+    start = time.perf_counter()
+    await warm_up_cross_encoder(
+        app.state.cross_encoder_model,
+        app.state.rerank_executor,
+        concurrency=RERANK_POOL_SIZE,
+        rounds=WARMUP_ROUNDS,
+    )
+    rerank_cascade = getattr(app.state, "rerank_cascade", None)
+    if rerank_cascade is not None and rerank_cascade.cheap_batcher is not None:
+        await warm_up_cross_encoder(
+            rerank_cascade.cheap_batcher.model,
+            app.state.rerank_executor,
+            concurrency=RERANK_POOL_SIZE,
+            rounds=WARMUP_ROUNDS,
+        )
+    if getattr(app.state, "query_embedder", None) is not None:
+        await app.state.query_embedder.embed("warm up")
+    # Loads the context tokenizer, which is otherwise loaded on first use.
+    app.state.token_counter.count("warm up")
+    return time.perf_counter() - start
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    print("Attempting to connect to Elasticsearch...")
+    startup_started = time.perf_counter()
+    app.state.ready = False
+    if SEARCH_RESPONSE_PROFILE not in RESPONSE_PROFILES:
+        raise ValueError(f"Unknown SEARCH_RESPONSE_PROFILE: {SEARCH_RESPONSE_PROFILE}")
+
+    if SEARCH_BACKEND == "local":
+        print(f"Opening local search index: {LOCAL_INDEX_PATH}...")
+        try:
+            app.state.search_backend = LocalSearchBackend(LOCAL_INDEX_PATH)
+            print(
+                f"Local search index opened ({app.state.search_backend.meta['num_docs']} documents)."
+            )
+        except Exception as e:
+            print(f"ERROR: Failed to open local search index: {e}")
+            raise
+        if EMBEDDING_MODEL:
+            raise ValueError("Hybrid retrieval (EMBEDDING_MODEL) requires SEARCH_BACKEND=elasticsearch.")
+    elif SEARCH_BACKEND == "elasticsearch":
+        print("Attempting to connect to Elasticsearch...")
+        from elasticsearch import AsyncElasticsearch
+
+        try:
+            app.state.search_backend = ElasticsearchBackend(
+                AsyncElasticsearch(hosts=ES_HOSTS, api_key=ES_API_KEY),
+                pit_keep_alive=SEARCH_PIT_KEEP_ALIVE,
+                max_open_pits=SEARCH_MAX_OPEN_PITS,
+            )
+            if not await app.state.search_backend.ping():
+                raise ValueError("Initial Elasticsearch ping failed.")
+            print("Successfully connected to Elasticsearch.")
+        except Exception as e:
+            print(f"ERROR: Failed to connect to Elasticsearch during startup: {e}")
+            raise
+    else:
+        raise ValueError(f"Unknown SEARCH_BACKEND: {SEARCH_BACKEND}")
+
+    if SUGGEST_INDEX_PATH and os.path.exists(os.path.join(SUGGEST_INDEX_PATH, "meta.json")):
+        try:
+            app.state.suggest_index = SuggestIndex(SUGGEST_INDEX_PATH)
+            print(
+                f"Suggest index opened ({app.state.suggest_index.meta['num_entries']} entries)."
+            )
+        except Exception as e:
+            print(f"ERROR: Failed to open suggest index: {e}")
+            raise
+    else:
+        print(f"Warning: No suggest index at {SUGGEST_INDEX_PATH}; /suggest is disabled.")
+
+    print(
+        f"Loading cross-encoder model: {CROSS_ENCODER_MODEL_NAME} "
+        f"({CROSS_ENCODER_BACKEND} backend)..."
+    )
     try:
-        app.state.es_client = Elasticsearch(hosts=ES_HOSTS, api_key=ES_API_KEY)
-        if not app.state.es_client.ping():
-            raise ValueError("Initial Elasticsearch ping failed.")
-        print("Successfully connected to Elasticsearch.")
+        app.state.cross_encoder_model = load_cross_encoder(
+            CROSS_ENCODER_MODEL_NAME,
+            backend=CROSS_ENCODER_BACKEND,
+            onnx_file=CROSS_ENCODER_ONNX_FILE,
+        )
+        print("Cross-encoder model loaded successfully.")
     except Exception as e:
-        print(f"ERROR: Failed to connect to Elasticsearch during startup: {e}")
+        print(f"ERROR: Failed to load cross-encoder model: {e}")
         raise
 
-    print(f"Loading cross-encoder model: {CROSS_ENCODER_MODEL_NAME}...")
+    app.state.score_cache = None
+    if PAIR_SCORE_CACHE_PATH:
+        print(f"Opening pair score cache at {PAIR_SCORE_CACHE_PATH}...")
+        try:
+            app.state.score_cache = PairScoreCache(
+                path=PAIR_SCORE_CACHE_PATH,
+                model_name=reranker_cache_name(
+                    CROSS_ENCODER_MODEL_NAME, CROSS_ENCODER_BACKEND, CROSS_ENCODER_ONNX_FILE
+                ),
+                capacity=PAIR_SCORE_CACHE_SLOTS,
+            )
+            print("Pair score cache opened.")
+        except Exception as e:
+            print(f"ERROR: Failed to open pair score cache: {e}")
+            raise
+
+    print(f"Starting rerank worker pool with {RERANK_POOL_SIZE} thread(s)...")
+    app.state.rerank_executor = ThreadPoolExecutor(
+        max_workers=RERANK_POOL_SIZE, thread_name_prefix="rerank"
+    )
+    app.state.rerank_batcher = RerankBatcher(
+        model=app.state.cross_encoder_model,
+        executor=app.state.rerank_executor,
+        max_batch_pairs=RERANK_MAX_BATCH_PAIRS,
+        max_wait_ms=RERANK_MAX_WAIT_MS,
+        max_inflight_batches=RERANK_POOL_SIZE,
+    )
+    app.state.rerank_batcher.start()
+
+    cascade_batcher = None
+    if CASCADE_MODEL:
+        print(f"Loading cascade model: {CASCADE_MODEL}...")
+        try:
+            cascade_batcher = RerankBatcher(
+                model=load_cross_encoder(CASCADE_MODEL),
+                executor=app.state.rerank_executor,
+                max_batch_pairs=RERANK_MAX_BATCH_PAIRS,
+                max_wait_ms=RERANK_MAX_WAIT_MS,
+                max_inflight_batches=RERANK_POOL_SIZE,
+                stage_prefix="cascade",
+            )
+            cascade_batcher.start()
+            print("Cascade model loaded successfully.")
+        except Exception as e:
+            print(f"ERROR: Failed to load cascade model: {e}")
+            raise
+    # Without a margin or a budget it keeps every candidate and is skipped,
+    # but still serves the ?budget_ms= overrides and counts them.
+    app.state.rerank_cascade = RerankCascade(
+        cheap_batcher=cascade_batcher,
+        margin=float(CASCADE_MARGIN) if CASCADE_MARGIN else None,
+        default_budget_ms=float(RERANK_BUDGET_MS) if RERANK_BUDGET_MS else None,
+    )
+
+    if EMBEDDING_MODEL:
+        print(f"Loading embedding model for hybrid retrieval: {EMBEDDING_MODEL}...")
+        try:
+            # Query embeddings are small; they share the rerank worker pool.
+            app.state.query_embedder = QueryEmbedder(
+                load_embedding_model(EMBEDDING_MODEL), app.state.rerank_executor
+            )
+            print("Embedding model loaded successfully.")
+        except Exception as e:
+            print(f"ERROR: Failed to load embedding model: {e}")
+            raise
+
+    print(f"Initializing search result cache (shared backend: {SEARCH_CACHE_BACKEND})...")
     try:
-        app.state.cross_encoder_model = CrossEncoder(CROSS_ENCODER_MODEL_NAME)
-        print("Cross-encoder model loaded successfully.")
+        app.state.result_cache = QueryResultCache(
+            max_entries=SEARCH_CACHE_MAX_ENTRIES,
+            ttl_s=SEARCH_CACHE_TTL_S,
+            backend=build_cache_backend(
+                SEARCH_CACHE_BACKEND,
+                path=SEARCH_CACHE_PATH,
+                redis_url=SEARCH_CACHE_REDIS_URL,
+            ),
+        )
+        print("Search result cache initialized.")
     except Exception as e:
-        print(f"ERROR: Failed to load cross-encoder model: {e}")
+        print(f"ERROR: Failed to initialize search result cache: {e}")
         raise
 
+    app.state.batch_search_slots = asyncio.Semaphore(SEARCH_BATCH_MAX_CONCURRENT)
+
+    app.state.document_store = DocumentStore(
+        max_entries=DOCUMENT_STORE_MAX_ENTRIES, ttl_s=DOCUMENT_STORE_TTL_S
+    )
+
+    print(f"Loading context tokenizer: {CONTEXT_TOKENIZER or 'estimated counts'}...")
+    app.state.token_counter = TokenCounter(CONTEXT_TOKENIZER or None)
+
+    if SUMMARY_CACHE_MAX_BYTES > 0:
+        app.state.summary_cache = SummaryCache(max_bytes=SUMMARY_CACHE_MAX_BYTES)
+        print(f"Summary cache initialized ({SUMMARY_CACHE_MAX_BYTES} bytes).")
+
     print(f"Initializing TogetherAI client with model: {TOGETHER_MODEL_NAME}...")
     if not TOGETHER_API_KEY:
         print("ERROR: TOGETHER_API_KEY not found in environment variables.")
         raise ValueError("TOGETHER_API_KEY is required but not set.")
     try:
-        app.state.together_client = Together(api_key=TOGETHER_API_KEY)
+        together_kwargs = {"base_url": TOGETHER_BASE_URL} if TOGETHER_BASE_URL else {}
+        app.state.together_client = AsyncTogether(
+            api_key=TOGETHER_API_KEY, **together_kwargs
+        )
         print("TogetherAI client initialized successfully.")
     except Exception as e:
         print(f"ERROR: Failed to initialize TogetherAI client: {e}")
         raise
 
+    app.state.warmup_s = 0.0
+    if WARMUP_ROUNDS > 0:
+        print("Warming up models...")
+        try:
+            app.state.warmup_s = await warm_up(app)
+            print(f"Models warmed up in {app.state.warmup_s:.2f}s.")
+        except Exception as e:
+            print(f"ERROR: Model warm-up failed: {e}")
+            raise
+
+    app.state.startup_s = time.perf_counter() - startup_started
+    app.state.ready = True
+    print(f"Worker {os.getpid()} ready in {app.state.startup_s:.2f}s.")
+
     yield
 
-    print("Closing Elasticsearch connection...")
-    if hasattr(app.state, "es_client") and app.state.es_client:
+    # Report not-ready first, so load balancers stop routing to this worker.
+    app.state.ready = False
+
+    print("Closing search backend...")
+    if hasattr(app.state, "search_backend"):
         try:
-            await app.state.es_client.close()
-            print("Elasticsearch connection closed.")
+            await app.state.search_backend.close()
+            print("Search backend closed.")
         except Exception as e:
-            print(f"ERROR: Failed to close Elasticsearch connection gracefully: {e}")
+            print(f"ERROR: Failed to close search backend gracefully: {e}")
+
+    if hasattr(app.state, "suggest_index"):
+        app.state.suggest_index.close()
+        del app.state.suggest_index
+
+    if hasattr(app.state, "result_cache"):
+        app.state.result_cache.close()
+        del app.state.result_cache
+        print("Search result cache closed.")
+
+    if hasattr(app.state, "rerank_batcher"):
+        await app.state.rerank_batcher.stop()
+        del app.state.rerank_batcher
+        print("Rerank batcher stopped.")
+
+    if getattr(app.state, "rerank_cascade", None) is not None:
+        if app.state.rerank_cascade.cheap_batcher is not None:
+            await app.state.rerank_cascade.cheap_batcher.stop()
+        del app.state.rerank_cascade
+        print("Rerank cascade stopped.")
+
+    if getattr(app.state, "score_cache", None) is not None:
+        app.state.score_cache.close()
+        del app.state.score_cache
+        print("Pair score cache flushed.")
+
+    if hasattr(app.state, "rerank_executor"):
+        app.state.rerank_executor.shutdown(wait=True)
+        del app.state.rerank_executor
+        print("Rerank worker pool shut down.")
 
     if hasattr(app.state, "cross_encoder_model"):
         del app.state.cross_encoder_model
@@ -118,6 +551,10 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
+)
+app.add_middleware(
+    TimingMiddleware, profiler_dir=PROFILER_OUTPUT_DIR if PROFILER_ENABLED else None
 )
 
 
@@ -126,49 +563,594 @@ def read_root():
     return {"Hello": "World"}
 
 
-@app.get("/search/{query}")
+@app.get("/ready")
+def ready(request: Request):
+    """
+    Readiness probe: 200 once this worker has loaded and warmed up its
+    models, 503 before that and while shutting down.
+    """
+    state = request.app.state
+    is_ready = getattr(state, "ready", False)
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={
+            "ready": is_ready,
+            "pid": os.getpid(),
+            "startup_s": getattr(state, "startup_s", None),
+            "warmup_s": getattr(state, "warmup_s", None),
+        },
+    )
+
+
+@app.get("/metrics")
+def metrics(request: Request):
+    """
+    Prometheus metrics of this worker: latency histograms per stage, per
+    route, of the LLM's first token and tokens/s, plus the rerank batcher
+    counters. Each worker keeps its own; scrape them all or aggregate.
+    """
+    gauges = {}
+    batchers = {"rerank": getattr(request.app.state, "rerank_batcher", None)}
+    rerank_cascade = getattr(request.app.state, "rerank_cascade", None)
+    if rerank_cascade is not None:
+        batchers["cascade"] = rerank_cascade.cheap_batcher
+    for name, batcher in batchers.items():
+        if batcher is None:
+            continue
+        for key, value in batcher.metrics.as_dict().items():
+            gauges[f"serp_{name}_batcher_{key}"] = value
+    return PlainTextResponse(
+        render_metrics(gauges), media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/stats/rerank")
+def rerank_stats(
+    rerank_batcher: RerankBatcher = Depends(get_rerank_batcher),
+    rerank_cascade: Optional[RerankCascade] = Depends(get_rerank_cascade),
+):
+    return {
+        **rerank_batcher.metrics.as_dict(),
+        "cascade": rerank_cascade.get_stats() if rerank_cascade else None,
+    }
+
+
+@app.get("/stats/cache")
+def cache_stats(
+    result_cache: QueryResultCache = Depends(get_result_cache),
+    score_cache: Optional[PairScoreCache] = Depends(get_score_cache),
+    summary_cache: Optional[SummaryCache] = Depends(get_summary_cache),
+    document_store: Optional[DocumentStore] = Depends(get_document_store),
+    token_counter: Optional[TokenCounter] = Depends(get_token_counter),
+):
+    return {
+        "search_results": result_cache.get_stats(),
+        "pair_scores": score_cache.get_stats() if score_cache else None,
+        "summaries": summary_cache.get_stats() if summary_cache else None,
+        "documents": document_store.get_stats() if document_store else None,
+        "context_tokens": token_counter.get_stats() if token_counter else None,
+    }
+
+
+def _cache_variant(
+    profile: str,
+    budget_ms: Optional[float] = None,
+    filters: Optional[SearchFilters] = None,
+    facets: bool = False,
+) -> str:
+    variant = f"profile={profile}"
+    # Results reranked under a tighter budget may differ, so they are cached apart.
+    if budget_ms is not None:
+        variant += f";budget_ms={budget_ms}"
+    if filters:
+        variant += f";filters={filters.cache_key()}"
+    if facets:
+        variant += ";facets"
+    return variant
+
+
+def search_filters(
+    year_from: Optional[int] = None,
+    year_to: Optional[int] = None,
+    entry_type: List[str] = Query([]),
+    author: List[str] = Query([]),
+    publisher: List[str] = Query([]),
+) -> SearchFilters:
+    """Search filters from the query string; repeat a parameter to accept several values."""
+    return SearchFilters(
+        year_from=year_from,
+        year_to=year_to,
+        entry_types=tuple(entry_type),
+        authors=tuple(author),
+        publishers=tuple(publisher),
+    )
+
+
+async def _search_and_rerank(
+    query: str,
+    search_backend: SearchBackend,
+    rerank_batcher: RerankBatcher,
+    score_cache: Optional[PairScoreCache],
+    result_cache: QueryResultCache,
+    document_store: Optional[DocumentStore],
+    query_embedder: Optional[QueryEmbedder],
+    rerank_cascade: Optional[RerankCascade],
+    budget_ms: Optional[float] = None,
+    profile: str = SEARCH_RESPONSE_PROFILE,
+    filters: Optional[SearchFilters] = None,
+    facets: bool = False,
+) -> Dict[str, Any]:
+    """
+    Retrieves and reranks hits for `query`; the body of a `/search` response
+    before paging.
+
+    `reranked_hits` is the whole rerank window, all SEARCH_CANDIDATES
+    candidates in rerank order; `_search_page` slices the requested page out
+    of it. Hits carry the `profile` fields plus `text`, which reranking and
+    summarization need; `project_hits` drops it before the response is sent.
+    """
+    cache_variant = _cache_variant(profile, budget_ms, filters, facets)
+    # Cached under k=SEARCH_CANDIDATES: the entry holds the whole window.
+    cached_response = await result_cache.get(
+        query, size=SEARCH_CANDIDATES, k=SEARCH_CANDIDATES, variant=cache_variant
+    )
+    if cached_response is not None:
+        if document_store is not None:
+            document_store.put_many(cached_response["reranked_hits"])
+        return {**cached_response, "query": query}
+
+    initial_es_hits, facet_counts = await retrieve_candidates_with_facets(
+        query=query,
+        search_backend=search_backend,
+        query_embedder=query_embedder,
+        size=SEARCH_CANDIDATES,
+        num_candidates=HYBRID_NUM_CANDIDATES,
+        source_includes=source_includes(profile),
+        filters=filters,
+        facet_size=SEARCH_FACET_SIZE if facets else 0,
+    )
+
+    response = {"query": query, "initial_hits_count": len(initial_es_hits)}
+    if facets:
+        response["facets"] = facet_counts
+    if not initial_es_hits:
+        response["reranked_hits"] = []
+        await result_cache.set(
+            query, SEARCH_CANDIDATES, SEARCH_CANDIDATES, response, variant=cache_variant
+        )
+        return response
+
+    reranked_hits = await rerank_with_cascade(
+        query=query,
+        search_results=initial_es_hits,
+        batcher=rerank_batcher,
+        k=SEARCH_TOP_K,
+        score_cache=score_cache,
+        cascade=rerank_cascade,
+        budget_ms=budget_ms,
+        depth=SEARCH_CANDIDATES,
+    )
+
+    if document_store is not None:
+        document_store.put_many(reranked_hits)
+
+    response["reranked_hits"] = reranked_hits
+    await result_cache.set(
+        query, SEARCH_CANDIDATES, SEARCH_CANDIDATES, response, variant=cache_variant
+    )
+    return response
+
+
+async def _search_page(
+    query: str,
+    response: Dict[str, Any],
+    position: Dict[str, Any],
+    page_size: int,
+    scope: str,
+    search_backend: SearchBackend,
+    document_store: Optional[DocumentStore],
+    profile: str = SEARCH_RESPONSE_PROFILE,
+    filters: Optional[SearchFilters] = None,
+) -> Tuple[List[Dict], Optional[str]]:
+    """
+    The hits of the page at `position` (from `decode_cursor`) and the cursor
+    of the next page, None after the last one.
+
+    Pages inside the rerank window are sliced from `response`, so paging
+    never re-scores the window. Past it, the results continue in BM25 order,
+    without the window's documents, from `search_after` on a point-in-time.
+    Each page fetches only its own hits, so a deep page costs the same as
+    the first one past the window.
+    """
+    window = response["reranked_hits"]
+    offset = position["offset"]
+    hits = window[offset : offset + page_size]
+    offset += len(hits)
+    # Fewer candidates than requested: the window already holds every match.
+    complete = response["initial_hits_count"] < SEARCH_CANDIDATES
+    if len(hits) == page_size or complete:
+        has_more = offset < len(window) or not complete
+        return hits, encode_cursor(scope, offset) if has_more else None
+
+    more_hits, pit_id = await perform_search_after(
+        query,
+        search_backend,
+        position["pit_id"],
+        after=position["after"],
+        size=page_size - len(hits),
+        source_includes=source_includes(profile),
+        filters=filters,
+        exclude_ids=[hit["_id"] for hit in window],
+        scope=scope,
+    )
+    next_cursor = None
+    if len(more_hits) == page_size - len(hits):
+        next_cursor = encode_cursor(scope, offset + len(more_hits), pit_id, more_hits[-1]["sort"])
+    else:
+        # The last page: nothing will read this point-in-time again.
+        await search_backend.close_pit(pit_id, scope=scope)
+    more_hits = [{key: value for key, value in hit.items() if key != "sort"} for hit in more_hits]
+    if document_store is not None:
+        document_store.put_many(more_hits)
+    return hits + more_hits, next_cursor
+
+
+async def _search_and_rerank_batch(
+    queries: List[str],
+    search_backend: SearchBackend,
+    rerank_batcher: RerankBatcher,
+    score_cache: Optional[PairScoreCache],
+    result_cache: QueryResultCache,
+    document_store: Optional[DocumentStore],
+    query_embedder: Optional[QueryEmbedder],
+    rerank_cascade: Optional[RerankCascade],
+    profile: str = SEARCH_RESPONSE_PROFILE,
+) -> List[Dict[str, Any]]:
+    """
+    `_search_and_rerank` for several queries. Cached queries are answered
+    from the result cache; the rest share one retrieval round trip and one
+    rerank pass. Repeated queries are only searched once.
+    """
+    cache_variant = _cache_variant(profile)
+    responses: Dict[str, Dict[str, Any]] = {}
+    misses = []
+    for query in dict.fromkeys(queries):
+        cached_response = await result_cache.get(
+            query, size=SEARCH_CANDIDATES, k=SEARCH_CANDIDATES, variant=cache_variant
+        )
+        if cached_response is not None:
+            responses[query] = {**cached_response, "query": query}
+        else:
+            misses.append(query)
+
+    if misses:
+        candidates = await retrieve_candidates_batch(
+            queries=misses,
+            search_backend=search_backend,
+            query_embedder=query_embedder,
+            size=SEARCH_CANDIDATES,
+            num_candidates=HYBRID_NUM_CANDIDATES,
+            source_includes=source_includes(profile),
+        )
+        reranked = await rerank_batch_with_cascade(
+            queries=misses,
+            search_results=candidates,
+            batcher=rerank_batcher,
+            k=SEARCH_TOP_K,
+            score_cache=score_cache,
+            cascade=rerank_cascade,
+            depth=SEARCH_CANDIDATES,
+        )
+        for query, hits, reranked_hits in zip(misses, candidates, reranked):
+            response = {
+                "query": query,
+                "initial_hits_count": len(hits),
+                "reranked_hits": reranked_hits,
+            }
+            await result_cache.set(
+                query, SEARCH_CANDIDATES, SEARCH_CANDIDATES, response, variant=cache_variant
+            )
+            responses[query] = response
+
+    if document_store is not None:
+        document_store.put_many(
+            hit for response in responses.values() for hit in response["reranked_hits"]
+        )
+    return [responses[query] for query in queries]
+
+
+def _sse_event(event: str, data: Any) -> str:
+    # JSON keeps newlines inside tokens from breaking the event framing.
+    return f"event: {event}\ndata: {dumps_json(data).decode('utf-8')}\n\n"
+
+
+def _check_profile(profile: str):
+    if profile not in RESPONSE_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown profile '{profile}'; expected one of {sorted(RESPONSE_PROFILES)}.",
+        )
+
+
+# These endpoints return pre-serialized `json_response` bodies, which FastAPI
+# does not validate against a `response_model`; `responses=` only documents
+# their schema in OpenAPI.
+@app.get("/search/{query}", responses={200: {"model": SearchResponseModel}})
 async def search_documents(
     query: str,
-    es_client: Elasticsearch = Depends(get_es_client),
-    cross_encoder_model: CrossEncoder = Depends(get_cross_encoder_model),
+    request: Request,
+    search_backend: SearchBackend = Depends(get_search_backend),
+    rerank_batcher: RerankBatcher = Depends(get_rerank_batcher),
+    score_cache: Optional[PairScoreCache] = Depends(get_score_cache),
+    result_cache: QueryResultCache = Depends(get_result_cache),
+    document_store: Optional[DocumentStore] = Depends(get_document_store),
+    query_embedder: Optional[QueryEmbedder] = Depends(get_query_embedder),
+    rerank_cascade: Optional[RerankCascade] = Depends(get_rerank_cascade),
+    budget_ms: Optional[float] = None,
+    profile: str = SEARCH_RESPONSE_PROFILE,
+    filters: SearchFilters = Depends(search_filters),
+    facets: bool = False,
+    page_size: int = Query(SEARCH_TOP_K, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
 ):
+    """
+    Reranked hits for `query`, with `_source` narrowed to the fields of
+    `profile`. Serialized with orjson when installed and compressed with
+    brotli or gzip per the request's Accept-Encoding.
+
+    `year_from`, `year_to`, `entry_type`, `author` and `publisher` restrict
+    the hits without changing their scores, and `facets=true` adds the value
+    counts of every facet over all the matches. The response's
+    `next_cursor`, passed back as `cursor` with the same parameters, returns
+    the following `page_size` hits.
+    """
+    _check_profile(profile)
+    scope = cursor_scope(query, _cache_variant(profile, budget_ms, filters))
+    position = {"offset": 0, "pit_id": None, "after": None}
+    if cursor is not None:
+        try:
+            position = decode_cursor(cursor, scope)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
     try:
-        initial_es_hits = perform_elasticsearch_search(
-            query=query, es_client=es_client, size=20
+        response = await _search_and_rerank(
+            query,
+            search_backend,
+            rerank_batcher,
+            score_cache,
+            result_cache,
+            document_store,
+            query_embedder,
+            rerank_cascade,
+            budget_ms=budget_ms,
+            profile=profile,
+            filters=filters,
+            facets=facets,
+        )
+        hits, next_cursor = await _search_page(
+            query,
+            response,
+            position,
+            page_size,
+            scope,
+            search_backend,
+            document_store,
+            profile=profile,
+            filters=filters,
         )
+        return json_response(
+            request,
+            {
+                **response,
+                "reranked_hits": project_hits(hits, profile),
+                "next_cursor": next_cursor,
+            },
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"ERROR: Unhandled error in search_documents endpoint: {e}")
+        raise HTTPException(status_code=500, detail=f"Search service error: {str(e)}")
 
-        if not initial_es_hits:
-            return {"query": query, "initial_hits_count": 0, "reranked_hits": []}
 
-        reranked_hits = rerank_with_cross_encoder(
-            query=query,
-            search_results=initial_es_hits,
-            model=cross_encoder_model,
-            k=5,
-        )
+@app.get("/suggest", responses={200: {"model": SuggestResponseModel}})
+async def suggest(
+    request: Request,
+    q: str = Query(min_length=1, max_length=200),
+    size: int = Query(10, ge=1, le=MAX_SUGGESTIONS),
+    suggest_index: SuggestIndex = Depends(get_suggest_index),
+):
+    """
+    Title and author completions for the typeahead: entries with a word
+    starting with `q`, most frequent first. Served from the in-process
+    prefix index without touching the search backend or the reranker.
+    """
+    with span("suggest"):
+        suggestions = suggest_index.suggest(q, size)
+    return json_response(
+        request,
+        {"query": q, "suggestions": suggestions},
+        headers={"Cache-Control": f"public, max-age={SUGGEST_CACHE_MAX_AGE_S}"},
+    )
+
 
-        return {
-            "query": query,
-            "initial_hits_count": len(initial_es_hits),
-            "reranked_hits": reranked_hits,
-        }
+@app.post("/search/batch", responses={200: {"model": BatchSearchResponseModel}})
+async def search_documents_batch(
+    body: BatchSearchRequestModel,
+    request: Request,
+    search_backend: SearchBackend = Depends(get_search_backend),
+    rerank_batcher: RerankBatcher = Depends(get_rerank_batcher),
+    score_cache: Optional[PairScoreCache] = Depends(get_score_cache),
+    result_cache: QueryResultCache = Depends(get_result_cache),
+    document_store: Optional[DocumentStore] = Depends(get_document_store),
+    query_embedder: Optional[QueryEmbedder] = Depends(get_query_embedder),
+    rerank_cascade: Optional[RerankCascade] = Depends(get_rerank_cascade),
+    batch_slots: asyncio.Semaphore = Depends(get_batch_search_slots),
+):
+    """
+    `/search` for up to SEARCH_BATCH_MAX_QUERIES queries in one request.
+
+    All queries go to the search backend in one `_msearch` and their
+    candidates are reranked in one shared cross-encoder pass. At most
+    SEARCH_BATCH_MAX_CONCURRENT batches run at once; the others wait.
+    """
+    profile = body.profile or SEARCH_RESPONSE_PROFILE
+    _check_profile(profile)
+    if not all(query.strip() for query in body.queries):
+        raise HTTPException(status_code=400, detail="Queries must be non-empty strings.")
+    try:
+        async with batch_slots:
+            responses = await _search_and_rerank_batch(
+                body.queries,
+                search_backend,
+                rerank_batcher,
+                score_cache,
+                result_cache,
+                document_store,
+                query_embedder,
+                rerank_cascade,
+                profile=profile,
+            )
+        return json_response(
+            request,
+            {
+                "results": [
+                    {
+                        **response,
+                        "reranked_hits": project_hits(
+                            response["reranked_hits"][:SEARCH_TOP_K], profile
+                        ),
+                    }
+                    for response in responses
+                ]
+            },
+        )
     except HTTPException:
         raise
     except Exception as e:
-        print(f"ERROR: Unhandled error in search_documents endpoint: {e}")
+        print(f"ERROR: Unhandled error in search_documents_batch endpoint: {e}")
         raise HTTPException(status_code=500, detail=f"Search service error: {str(e)}")
 
 
+@app.get("/search_stream/{query}")
+async def search_and_summarize_stream(
+    query: str,
+    search_backend: SearchBackend = Depends(get_search_backend),
+    rerank_batcher: RerankBatcher = Depends(get_rerank_batcher),
+    score_cache: Optional[PairScoreCache] = Depends(get_score_cache),
+    result_cache: QueryResultCache = Depends(get_result_cache),
+    document_store: Optional[DocumentStore] = Depends(get_document_store),
+    query_embedder: Optional[QueryEmbedder] = Depends(get_query_embedder),
+    rerank_cascade: Optional[RerankCascade] = Depends(get_rerank_cascade),
+    together_client: AsyncTogether = Depends(get_together_client),
+    summary_cache: Optional[SummaryCache] = Depends(get_summary_cache),
+    token_counter: Optional[TokenCounter] = Depends(get_token_counter),
+    budget_ms: Optional[float] = None,
+    profile: str = SEARCH_RESPONSE_PROFILE,
+    filters: SearchFilters = Depends(search_filters),
+    facets: bool = False,
+):
+    """
+    Search and summarization in one server-sent event stream.
+
+    Emits a `results` event with the first page of the `/search` response
+    body as soon as reranking finishes, then one `token` event per summary
+    chunk, and finally `done`. Failures are reported as an `error` event
+    with a `detail` field. Filters and facets are as for `/search`; its
+    `next_cursor` continues on `/search`.
+    """
+    _check_profile(profile)
+    scope = cursor_scope(query, _cache_variant(profile, budget_ms, filters))
+
+    async def event_stream():
+        try:
+            response = await _search_and_rerank(
+                query,
+                search_backend,
+                rerank_batcher,
+                score_cache,
+                result_cache,
+                document_store,
+                query_embedder,
+                rerank_cascade,
+                budget_ms=budget_ms,
+                profile=profile,
+                filters=filters,
+                facets=facets,
+            )
+            hits, next_cursor = await _search_page(
+                query,
+                response,
+                {"offset": 0, "pit_id": None, "after": None},
+                SEARCH_TOP_K,
+                scope,
+                search_backend,
+                document_store,
+                profile=profile,
+                filters=filters,
+            )
+        except HTTPException as e:
+            yield _sse_event("error", {"detail": e.detail})
+            return
+        except Exception as e:
+            print(f"ERROR: Unhandled error in search_and_summarize_stream endpoint: {e}")
+            yield _sse_event("error", {"detail": "An unexpected error occurred."})
+            return
+
+        yield _sse_event(
+            "results",
+            {
+                **response,
+                "reranked_hits": project_hits(hits, profile),
+                "next_cursor": next_cursor,
+            },
+        )
+        if hits:
+            summary = stream_rag_response(
+                query=query,
+                documents=hits,
+                together_client=together_client,
+                model_name=TOGETHER_MODEL_NAME,
+                max_context_tokens=CONTEXT_MAX_TOKENS,
+                summary_cache=summary_cache,
+                token_counter=token_counter,
+            )
+            try:
+                async for token in summary:
+                    yield _sse_event("token", token)
+            finally:
+                # Runs on client disconnect too, closing the upstream generation.
+                await summary.aclose()
+        yield _sse_event("done", {})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/rag_chat_legacy/{query}")
 async def generative_search_stream_legacy(
     query: str,
-    es_client: Elasticsearch = Depends(get_es_client),
-    cross_encoder_model: CrossEncoder = Depends(get_cross_encoder_model),
-    together_client: Together = Depends(get_together_client),
+    search_backend: SearchBackend = Depends(get_search_backend),
+    rerank_batcher: RerankBatcher = Depends(get_rerank_batcher),
+    score_cache: Optional[PairScoreCache] = Depends(get_score_cache),
+    query_embedder: Optional[QueryEmbedder] = Depends(get_query_embedder),
+    rerank_cascade: Optional[RerankCascade] = Depends(get_rerank_cascade),
+    together_client: AsyncTogether = Depends(get_together_client),
+    summary_cache: Optional[SummaryCache] = Depends(get_summary_cache),
+    token_counter: Optional[TokenCounter] = Depends(get_token_counter),
 ):
     try:
-        initial_es_hits = perform_elasticsearch_search(
-            query=query, es_client=es_client, size=20
+        initial_es_hits = await retrieve_candidates(
+            query=query,
+            search_backend=search_backend,
+            query_embedder=query_embedder,
+            size=SEARCH_CANDIDATES,
+            num_candidates=HYBRID_NUM_CANDIDATES,
+            # Reranking and the summary only read the text.
+            source_includes=["text"],
         )
         if not initial_es_hits:
 
@@ -177,8 +1159,13 @@ async def generative_search_stream_legacy(
 
             return StreamingResponse(empty_stream(), media_type="text/event-stream")
 
-        reranked_top_5_hits = rerank_with_cross_encoder(
-            query=query, search_results=initial_es_hits, model=cross_encoder_model, k=5
+        reranked_top_5_hits = await rerank_with_cascade(
+            query=query,
+            search_results=initial_es_hits,
+            batcher=rerank_batcher,
+            k=SEARCH_TOP_K,
+            score_cache=score_cache,
+            cascade=rerank_cascade,
         )
         if not reranked_top_5_hits:
 
@@ -194,6 +1181,9 @@ async def generative_search_stream_legacy(
             documents=reranked_top_5_hits,
             together_client=together_client,
             model_name=TOGETHER_MODEL_NAME,
+            max_context_tokens=CONTEXT_MAX_TOKENS,
+            summary_cache=summary_cache,
+            token_counter=token_counter,
         )
         return StreamingResponse(response_generator, media_type="text/event-stream")
     except HTTPException as e:
@@ -220,8 +1210,20 @@ async def generative_search_stream_legacy(
 @app.post("/summarize_documents_stream")
 async def summarize_documents_stream(
     http_request: Request,
-    together_client: Together = Depends(get_together_client),
+    search_backend: SearchBackend = Depends(get_search_backend),
+    together_client: AsyncTogether = Depends(get_together_client),
+    summary_cache: Optional[SummaryCache] = Depends(get_summary_cache),
+    token_counter: Optional[TokenCounter] = Depends(get_token_counter),
+    document_store: Optional[DocumentStore] = Depends(get_document_store),
 ):
+    """
+    Streams a summary of the given documents.
+
+    The body holds the `query` and either `document_ids`, a list of `_id`s
+    (citekeys) resolved on the server, or `documents`, full hits as returned
+    by `/search`. Resolving ids keeps request bodies small and ensures only
+    indexed text reaches the prompt.
+    """
     try:
         request_payload_dict = await http_request.json()
     except json.JSONDecodeError:  # Catch if JSON is malformed
@@ -236,6 +1238,7 @@ async def summarize_documents_stream(
     try:
         user_query = request_payload_dict.get("query")
         input_documents = request_payload_dict.get("documents")
+        document_ids = request_payload_dict.get("document_ids")
 
         if not user_query or not isinstance(user_query, str):
 
@@ -246,10 +1249,41 @@ async def summarize_documents_stream(
                 bad_query_stream(), media_type="text/event-stream", status_code=400
             )
 
+        if document_ids is not None:
+            if (
+                not isinstance(document_ids, list)
+                or not all(isinstance(doc_id, str) and doc_id for doc_id in document_ids)
+                or len(document_ids) > SUMMARY_MAX_DOCUMENTS
+            ):
+
+                async def bad_document_ids_stream():
+                    yield (
+                        "'document_ids' must be a list of at most "
+                        f"{SUMMARY_MAX_DOCUMENTS} non-empty strings."
+                    )
+
+                return StreamingResponse(
+                    bad_document_ids_stream(),
+                    media_type="text/event-stream",
+                    status_code=400,
+                )
+
+            try:
+                input_documents, not_found = await resolve_documents(
+                    document_ids, document_store, search_backend
+                )
+            except Exception as e:
+                print(f"ERROR: Failed to resolve documents for summarization: {e}")
+                raise HTTPException(
+                    status_code=500, detail=f"Document lookup error: {str(e)}"
+                )
+            if not_found:
+                print(f"Warning: Documents not found for summarization: {not_found}")
+
         if not isinstance(input_documents, list):
 
             async def bad_documents_stream():
-                yield "Missing 'documents' field in request body, or it is not a list."
+                yield "Missing 'documents' or 'document_ids' field in request body, or it is not a list."
 
             return StreamingResponse(
                 bad_documents_stream(), media_type="text/event-stream", status_code=400
@@ -269,6 +1303,9 @@ async def summarize_documents_stream(
             documents=input_documents,
             together_client=together_client,
             model_name=TOGETHER_MODEL_NAME,
+            max_context_tokens=CONTEXT_MAX_TOKENS,
+            summary_cache=summary_cache,
+            token_counter=token_counter,
         )
         return StreamingResponse(response_generator, media_type="text/event-stream")
 
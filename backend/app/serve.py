@@ -0,0 +1,164 @@
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from argparse import ArgumentParser
+
+import uvicorn
+
+# A worker exiting this soon after it was started is failing its startup
+# (e.g. Elasticsearch is unreachable); restarting it would only loop.
+MIN_WORKER_LIFETIME_S = 10.0
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, threads_per_worker: int, log_level: str):
+    """Body of a forked worker: serves the app on the inherited socket."""
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, signal.SIG_DFL)
+    if threads_per_worker:
+        # Workers share the cores; torch would otherwise start one thread per core each.
+        if "torch" in sys.modules:
+            sys.modules["torch"].set_num_threads(threads_per_worker)
+        else:
+            os.environ.setdefault("OMP_NUM_THREADS", str(threads_per_worker))
+
+    from app.main import app
+
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def fork_worker(sock: socket.socket, threads_per_worker: int, log_level: str) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+    status = 0
+    try:
+        run_worker(sock, threads_per_worker, log_level)
+    except SystemExit as e:
+        # uvicorn exits with a status code when the app fails to start.
+        status = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # Skips the parent's atexit handlers and buffered state.
+        os._exit(status)
+
+
+def serve(
+    host: str,
+    port: int,
+    workers: int,
+    preload: bool = True,
+    threads_per_worker: int = 0,
+    log_level: str = "info",
+) -> int:
+    """
+    Runs `workers` uvicorn workers forked from this process.
+
+    With `preload`, the models are loaded here first, so every worker gets
+    the weights through copy-on-write pages instead of loading its own copy:
+    startup after the first load is fast and the weights count once towards
+    memory. `gc.freeze()` keeps the collector from touching (and thereby
+    copying) the pages of the preloaded objects in the workers. No inference
+    runs before the fork; each worker warms up in its own `lifespan`.
+    """
+    start = time.perf_counter()
+    import app.main
+
+    if preload:
+        app.main.preload_models()
+        print(f"Preloaded models in {time.perf_counter() - start:.1f}s.")
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(host, port)
+    print(f"Serving on http://{host}:{port} with {workers} worker(s).")
+
+    children = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    for _ in range(workers):
+        children[fork_worker(sock, threads_per_worker, log_level)] = time.monotonic()
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    exit_code = 0
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        started_at = children.pop(pid, None)
+        if started_at is None or stopping:
+            continue
+        print(f"Worker {pid} exited with status {os.waitstatus_to_exitcode(status)}.")
+        if time.monotonic() - started_at < MIN_WORKER_LIFETIME_S:
+            print("ERROR: Worker failed during startup; stopping.")
+            exit_code = 1
+            stop(signal.SIGTERM, None)
+            continue
+        children[fork_worker(sock, threads_per_worker, log_level)] = time.monotonic()
+
+    sock.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Serves the API from workers forked after loading the models once."
+    )
+    argparse.add_argument("--host", default="127.0.0.1")
+    argparse.add_argument("--port", type=int, default=8000)
+    argparse.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    argparse.add_argument(
+        "--no_preload",
+        action="store_true",
+        help="Load the models in each worker instead, for comparison.",
+    )
+    argparse.add_argument(
+        "--threads_per_worker",
+        type=int,
+        help="torch intra-op threads per worker (default: CPU count / workers).",
+    )
+    argparse.add_argument("--log_level", default="info")
+    args = argparse.parse_args()
+
+    threads_per_worker = args.threads_per_worker
+    if threads_per_worker is None:
+        threads_per_worker = max(1, (os.cpu_count() or 1) // args.workers)
+    sys.exit(
+        serve(
+            args.host,
+            args.port,
+            args.workers,
+            preload=not args.no_preload,
+            threads_per_worker=threads_per_worker,
+            log_level=args.log_level,
+        )
+    )
@@ -0,0 +1,246 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from app.services.telemetry import current_timings, predict_timer, record_stage
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
+
+@dataclass
+class _PendingScore:
+    """A single request's (query, text) pairs waiting for a batched predict."""
+
+    pairs: List[List[str]]
+    future: asyncio.Future
+    # Seconds per stage of the batch that scored these pairs.
+    stages: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class BatcherMetrics:
+    """Counters describing how well concurrent rerank requests are being merged."""
+
+    max_batch_pairs: int
+    queue_depth_requests: int = 0
+    queue_depth_pairs: int = 0
+    batches_total: int = 0
+    requests_total: int = 0
+    pairs_total: int = 0
+    last_batch_pairs: int = 0
+    max_observed_batch_pairs: int = 0
+    predict_seconds_total: float = 0.0
+    errors_total: int = 0
+
+    def as_dict(self) -> Dict:
+        mean_batch_pairs = (
+            self.pairs_total / self.batches_total if self.batches_total else 0.0
+        )
+        return {
+            "queue_depth_requests": self.queue_depth_requests,
+            "queue_depth_pairs": self.queue_depth_pairs,
+            "batches_total": self.batches_total,
+            "requests_total": self.requests_total,
+            "pairs_total": self.pairs_total,
+            "mean_requests_per_batch": (
+                self.requests_total / self.batches_total if self.batches_total else 0.0
+            ),
+            "mean_batch_pairs": mean_batch_pairs,
+            "mean_batch_fill": mean_batch_pairs / self.max_batch_pairs,
+            "last_batch_pairs": self.last_batch_pairs,
+            "max_observed_batch_pairs": self.max_observed_batch_pairs,
+            "predict_seconds_total": self.predict_seconds_total,
+            "errors_total": self.errors_total,
+        }
+
+
+class RerankBatcher:
+    """
+    Dynamic batching engine for cross-encoder scoring.
+
+    Concurrent requests submit their (query, text) pairs through `score`. A
+    background task collects submissions for up to `max_wait_ms` or until
+    `max_batch_pairs` pairs are queued, runs a single `model.predict` on the
+    worker pool and scatters the scores back to each waiting request.
+    A request's pairs are never split across batches.
+
+    Each batch's predict, forward and tokenize times are recorded as the
+    `<stage_prefix>_predict`, `_forward` and `_tokenize` stages, and the time
+    a request waited for its batch as `<stage_prefix>_queue`.
+    """
+
+    def __init__(
+        self,
+        model: "CrossEncoder",
+        executor: Executor,
+        max_batch_pairs: int = 200,
+        max_wait_ms: float = 5.0,
+        max_inflight_batches: int = 1,
+        stage_prefix: str = "rerank",
+    ):
+        self.model = model
+        self.stage_prefix = stage_prefix
+        self.executor = executor
+        self.max_batch_pairs = max_batch_pairs
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.metrics = BatcherMetrics(max_batch_pairs=max_batch_pairs)
+        self._max_inflight_batches = max_inflight_batches
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+
+    def start(self):
+        """Starts the collector task on the running event loop."""
+        if self._worker is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self._max_inflight_batches)
+        self._worker = asyncio.create_task(self._collect_loop())
+
+    async def stop(self):
+        """Stops collecting and waits for batches already handed to the model."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+        # Fail anything still queued so callers are not left hanging.
+        while not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(
+                    RuntimeError("Rerank batcher stopped before scoring.")
+                )
+
+    async def score(self, pairs: List[List[str]]) -> List[float]:
+        """Queues `pairs` for the next batch and waits for their scores."""
+        if not pairs:
+            return []
+        if self._worker is None:
+            raise RuntimeError("Rerank batcher is not running.")
+
+        future = asyncio.get_running_loop().create_future()
+        pending = _PendingScore(pairs=pairs, future=future)
+        self.metrics.queue_depth_requests += 1
+        self.metrics.queue_depth_pairs += len(pairs)
+        start = time.perf_counter()
+        await self._queue.put(pending)
+        scores = await future
+
+        # The batch stages went to the histograms once per batch; the request
+        # still sees them in its own timings.
+        timings = current_timings()
+        if timings is not None:
+            for stage, seconds in pending.stages.items():
+                timings.add(stage, seconds)
+        predict_seconds = pending.stages.get(f"{self.stage_prefix}_predict", 0.0)
+        record_stage(
+            f"{self.stage_prefix}_queue",
+            max(0.0, time.perf_counter() - start - predict_seconds),
+        )
+        return scores
+
+    def _take(self, pending: _PendingScore):
+        self.metrics.queue_depth_requests -= 1
+        self.metrics.queue_depth_pairs -= len(pending.pairs)
+
+    async def _collect_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Waiting for a free slot first lets the queue keep filling while
+            # the model is busy, which naturally grows the next batch.
+            await self._slots.acquire()
+            try:
+                first = await self._queue.get()
+            except asyncio.CancelledError:
+                self._slots.release()
+                raise
+            self._take(first)
+            batch = [first]
+            batch_pairs = len(first.pairs)
+
+            deadline = loop.time() + self.max_wait_s
+            try:
+                while batch_pairs < self.max_batch_pairs:
+                    timeout = deadline - loop.time()
+                    try:
+                        if timeout <= 0:
+                            pending = self._queue.get_nowait()
+                        else:
+                            pending = await asyncio.wait_for(
+                                self._queue.get(), timeout
+                            )
+                    except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                        break
+                    self._take(pending)
+                    batch.append(pending)
+                    batch_pairs += len(pending.pairs)
+            except asyncio.CancelledError:
+                # Hand the partially collected batch to the model before exiting.
+                task = asyncio.create_task(self._run_batch(batch))
+                self._inflight.add(task)
+                raise
+
+            task = asyncio.create_task(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch: List[_PendingScore]):
+        loop = asyncio.get_running_loop()
+        try:
+            # Requests whose client already went away do not need scoring.
+            batch = [pending for pending in batch if not pending.future.done()]
+            if not batch:
+                return
+
+            all_pairs = [pair for pending in batch for pair in pending.pairs]
+            start = loop.time()
+            try:
+                scores, stages = await loop.run_in_executor(
+                    self.executor, predict_timer(self.model).predict, self.model, all_pairs
+                )
+            except Exception as e:
+                print(f"ERROR: Batched cross-encoder predict failed: {e}")
+                self.metrics.errors_total += 1
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                return
+
+            self._record_batch(len(batch), len(all_pairs), loop.time() - start)
+            stages = {
+                f"{self.stage_prefix}_{name}": seconds for name, seconds in stages.items()
+            }
+            for stage, seconds in stages.items():
+                record_stage(stage, seconds, request=False)
+
+            offset = 0
+            for pending in batch:
+                end = offset + len(pending.pairs)
+                pending.stages = stages
+                if not pending.future.done():
+                    pending.future.set_result([float(s) for s in scores[offset:end]])
+                offset = end
+        finally:
+            self._slots.release()
+
+    def _record_batch(self, num_requests: int, num_pairs: int, seconds: float):
+        metrics = self.metrics
+        metrics.batches_total += 1
+        metrics.requests_total += num_requests
+        metrics.pairs_total += num_pairs
+        metrics.last_batch_pairs = num_pairs
+        metrics.max_observed_batch_pairs = max(
+            metrics.max_observed_batch_pairs, num_pairs
+        )
+        metrics.predict_seconds_total += seconds
@@ -0,0 +1,434 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercases and collapses whitespace so trivially different queries share a key."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class CacheBackend:
+    """
+    Interface for a cache store shared between uvicorn workers.
+
+    Values are opaque bytes. The backend also owns the index generation
+    counter: bumping it invalidates every entry cached for older generations.
+    """
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl_s: float):
+        raise NotImplementedError
+
+    def get_generation(self) -> int:
+        raise NotImplementedError
+
+    def bump_generation(self) -> int:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SqliteCacheBackend(CacheBackend):
+    """File-based shared backend; every worker on the host opens the same file."""
+
+    def __init__(self, path: str, prune_every: int = 1000):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generation ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), value INTEGER NOT NULL)"
+        )
+        self._conn.execute("INSERT OR IGNORE INTO generation (id, value) VALUES (0, 0)")
+        self._conn.commit()
+        self._prune_every = prune_every
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl_s: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl_s),
+            )
+            self._writes += 1
+            if self._writes % self._prune_every == 0:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE expires_at < ?", (time.time(),)
+                )
+            self._conn.commit()
+
+    def get_generation(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM generation WHERE id = 0"
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump_generation(self) -> int:
+        with self._lock:
+            self._conn.execute("UPDATE generation SET value = value + 1 WHERE id = 0")
+            # Older generations can never be read again, so drop them right away.
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            row = self._conn.execute(
+                "SELECT value FROM generation WHERE id = 0"
+            ).fetchone()
+        return row[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class RedisCacheBackend(CacheBackend):
+    """Shared backend for multi-host deployments. Requires the `redis` package."""
+
+    def __init__(self, url: str, namespace: str = "serp-ai:cache"):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "RedisCacheBackend requires the 'redis' package (pip install redis)."
+            ) from e
+        self._client = redis.Redis.from_url(url)
+        self._namespace = namespace
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(f"{self._namespace}:entry:{key}")
+
+    def set(self, key: str, value: bytes, ttl_s: float):
+        self._client.set(
+            f"{self._namespace}:entry:{key}", value, px=max(1, int(ttl_s * 1000))
+        )
+
+    def get_generation(self) -> int:
+        value = self._client.get(f"{self._namespace}:generation")
+        return int(value) if value is not None else 0
+
+    def bump_generation(self) -> int:
+        return int(self._client.incr(f"{self._namespace}:generation"))
+
+    def close(self):
+        self._client.close()
+
+
+def build_cache_backend(
+    kind: str, path: Optional[str] = None, redis_url: Optional[str] = None
+) -> Optional[CacheBackend]:
+    """Creates the shared backend named by `kind` ("none", "sqlite" or "redis")."""
+    kind = (kind or "none").lower()
+    if kind == "none":
+        return None
+    if kind == "sqlite":
+        if not path:
+            raise ValueError("A file path is required for the sqlite cache backend.")
+        return SqliteCacheBackend(path)
+    if kind == "redis":
+        if not redis_url:
+            raise ValueError("A URL is required for the redis cache backend.")
+        return RedisCacheBackend(redis_url)
+    raise ValueError(f"Unknown cache backend: {kind}")
+
+
+class QueryResultCache:
+    """
+    Two-level cache for `/search` responses.
+
+    Level one is an in-process LRU with a TTL per entry. Level two is an
+    optional `CacheBackend` shared by all workers. Keys include the index
+    generation, so a re-ingest that bumps the generation invalidates both
+    levels; the shared generation is re-read at most every
+    `generation_check_interval_s` seconds. Backend calls are blocking, so
+    lookups and writes run them in a worker thread, off the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_s: float = 300.0,
+        backend: Optional[CacheBackend] = None,
+        generation_check_interval_s: float = 1.0,
+    ):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.backend = backend
+        self.generation_check_interval_s = generation_check_interval_s
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._generation = backend.get_generation() if backend else 0
+        self._generation_checked_at = time.monotonic()
+        self.stats = {
+            "local_hits": 0,
+            "shared_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "backend_errors": 0,
+        }
+
+    async def _refresh_generation(self):
+        if self.backend is None:
+            return
+        now = time.monotonic()
+        if now - self._generation_checked_at < self.generation_check_interval_s:
+            return
+        self._generation_checked_at = now
+        try:
+            generation = await asyncio.to_thread(self.backend.get_generation)
+        except Exception as e:
+            print(f"ERROR: Failed to read cache generation: {e}")
+            self.stats["backend_errors"] += 1
+            return
+        if generation != self._generation:
+            self._generation = generation
+            self._entries.clear()
+            self.stats["invalidations"] += 1
+
+    def make_key(self, query: str, size: int, k: int, variant: str = "") -> str:
+        raw = f"{self._generation}|{normalize_query(query)}|{size}|{k}|{variant}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, query: str, size: int, k: int, variant: str = "") -> Optional[Any]:
+        await self._refresh_generation()
+        key = self.make_key(query, size, k, variant)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at >= time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats["local_hits"] += 1
+                return value
+            del self._entries[key]
+            self.stats["expirations"] += 1
+
+        if self.backend is not None:
+            try:
+                raw = await asyncio.to_thread(self.backend.get, key)
+            except Exception as e:
+                print(f"ERROR: Shared cache lookup failed: {e}")
+                self.stats["backend_errors"] += 1
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._store_local(key, value)
+                self.stats["shared_hits"] += 1
+                return value
+
+        self.stats["misses"] += 1
+        return None
+
+    async def set(self, query: str, size: int, k: int, value: Any, variant: str = ""):
+        key = self.make_key(query, size, k, variant)
+        self._store_local(key, value)
+        self.stats["sets"] += 1
+        if self.backend is not None:
+            try:
+                await asyncio.to_thread(
+                    self.backend.set, key, json.dumps(value).encode("utf-8"), self.ttl_s
+                )
+            except Exception as e:
+                print(f"ERROR: Shared cache write failed: {e}")
+                self.stats["backend_errors"] += 1
+
+    def _store_local(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def invalidate(self):
+        """Drops every cached result, in this process and in the shared backend."""
+        self._entries.clear()
+        if self.backend is not None:
+            self._generation = self.backend.bump_generation()
+        else:
+            self._generation += 1
+        self.stats["invalidations"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.stats["local_hits"] + self.stats["shared_hits"]
+        lookups = hits + self.stats["misses"]
+        return {
+            **self.stats,
+            "hits": hits,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "generation": self._generation,
+        }
+
+    def close(self):
+        if self.backend is not None:
+            self.backend.close()
+
+
+class _SummaryFlight:
+    """One in-progress LLM generation that several identical requests can follow."""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def wake(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self) -> AsyncIterator[str]:
+        position = 0
+        while True:
+            while position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+
+class SummaryCache:
+    """
+    Byte-bounded LRU of finished LLM completions with single-flight generation.
+
+    A hit replays the stored completion at once. While a completion is being
+    generated, identical requests attach to that stream instead of starting
+    their own. The upstream generation is cancelled only once every attached
+    request has gone away, and only completions that finish cleanly are stored.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._inflight: Dict[str, _SummaryFlight] = {}
+        self.stats = {"hits": 0, "misses": 0, "joined": 0, "stores": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(
+        model_name: str,
+        query: str,
+        doc_ids: Sequence[str],
+        prompt_version: str,
+        context_digest: str = "",
+    ) -> str:
+        raw = "\x00".join(
+            [model_name, prompt_version, normalize_query(query), context_digest, *doc_ids]
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def stream(
+        self, key: str, produce: Callable[[], AsyncIterator[str]]
+    ) -> AsyncIterator[str]:
+        """Streams the completion for `key`, generating it with `produce` if needed."""
+        cached = self._entries.get(key)
+        if cached is not None:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            yield cached
+            return
+
+        flight = self._inflight.get(key)
+        if flight is None:
+            self.stats["misses"] += 1
+            flight = _SummaryFlight()
+            self._inflight[key] = flight
+            flight.task = asyncio.create_task(self._generate(key, flight, produce))
+        else:
+            self.stats["joined"] += 1
+
+        flight.subscribers += 1
+        try:
+            async for chunk in flight.follow():
+                yield chunk
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more; stop paying for the generation.
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    async def _generate(
+        self, key: str, flight: _SummaryFlight, produce: Callable[[], AsyncIterator[str]]
+    ):
+        try:
+            async for chunk in produce():
+                flight.chunks.append(chunk)
+                flight.wake()
+        except asyncio.CancelledError:
+            flight.error = RuntimeError("Summary generation was cancelled.")
+            raise
+        except Exception as e:
+            flight.error = e
+        else:
+            self._store(key, "".join(flight.chunks))
+        finally:
+            flight.done = True
+            self._forget(key, flight)
+            flight.wake()
+
+    def _forget(self, key: str, flight: _SummaryFlight):
+        if self._inflight.get(key) is flight:
+            del self._inflight[key]
+
+    def _store(self, key: str, text: str):
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key).encode("utf-8"))
+        self._entries[key] = text
+        self._bytes += size
+        self.stats["stores"] += 1
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.encode("utf-8"))
+            self.stats["evictions"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+        }
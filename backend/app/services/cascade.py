@@ -0,0 +1,132 @@
+import math
+import statistics
+from typing import Dict, List, Optional
+
+from app.services.batching import BatcherMetrics, RerankBatcher
+
+
+def select_cascade_candidates(
+    hits: List[Dict],
+    cheap_scores: List[float],
+    k: int,
+    margin: Optional[float] = 1.0,
+    max_depth: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Keeps the hits worth scoring with the full cross-encoder.
+
+    Hits are ordered by `cheap_scores`. The top `k` are always kept; each
+    further hit is kept while its cheap score lies within `margin` standard
+    deviations of the k-th best, i.e. while it could still plausibly enter
+    the top `k`. `margin=None` keeps every hit. `max_depth` caps the result,
+    but never below `k`.
+    """
+    order = sorted(range(len(hits)), key=lambda i: cheap_scores[i], reverse=True)
+    depth = len(order)
+    if margin is not None and len(order) > k:
+        spread = statistics.pstdev(cheap_scores)
+        boundary = cheap_scores[order[k - 1]]
+        depth = k
+        for i in order[k:]:
+            if spread and (boundary - cheap_scores[i]) / spread > margin:
+                break
+            depth += 1
+    if max_depth is not None:
+        depth = min(depth, max(k, max_depth))
+    return [hits[i] for i in order[:depth]]
+
+
+def ms_per_pair(metrics: BatcherMetrics) -> Optional[float]:
+    """Observed scoring cost per (query, document) pair, once anything was scored."""
+    if not metrics.pairs_total or not metrics.predict_seconds_total:
+        return None
+    return metrics.predict_seconds_total * 1000.0 / metrics.pairs_total
+
+
+def depth_for_budget(budget_ms: float, metrics: BatcherMetrics) -> Optional[int]:
+    """Pairs the cross-encoder can score within `budget_ms`."""
+    cost_ms = ms_per_pair(metrics)
+    if cost_ms is None:
+        return None
+    return max(0, math.floor(budget_ms / cost_ms))
+
+
+class RerankCascade:
+    """
+    Prunes first-stage candidates before the full cross-encoder.
+
+    Candidates are scored cheaply, by `cheap_batcher` (a smaller
+    cross-encoder) when given and by their first-stage `_score` otherwise,
+    and only those near the top-k boundary go on to the full model. A latency
+    budget per request further caps the depth, using the cross-encoder's
+    measured cost per pair.
+    """
+
+    def __init__(
+        self,
+        cheap_batcher: Optional[RerankBatcher] = None,
+        margin: Optional[float] = 1.0,
+        default_budget_ms: Optional[float] = None,
+    ):
+        self.cheap_batcher = cheap_batcher
+        self.margin = margin
+        self.default_budget_ms = default_budget_ms
+        self.stats = {
+            "requests": 0,
+            "candidates_in": 0,
+            "candidates_reranked": 0,
+            "budget_capped": 0,
+        }
+
+    def prunes(self, budget_ms: Optional[float] = None) -> bool:
+        """Whether `select` can drop anything; otherwise it keeps every candidate."""
+        if budget_ms is None:
+            budget_ms = self.default_budget_ms
+        return self.margin is not None or budget_ms is not None
+
+    async def select(
+        self,
+        sentence_pairs: List[List[str]],
+        hits: List[Dict],
+        batcher: RerankBatcher,
+        k: int,
+        budget_ms: Optional[float] = None,
+    ) -> List[Dict]:
+        budget_ms = budget_ms if budget_ms is not None else self.default_budget_ms
+        if self.cheap_batcher is not None:
+            cheap_scores = [float(s) for s in await self.cheap_batcher.score(sentence_pairs)]
+        else:
+            cheap_scores = [float(hit.get("_score") or 0.0) for hit in hits]
+
+        max_depth = None
+        if budget_ms is not None:
+            cheap_cost_ms = (
+                ms_per_pair(self.cheap_batcher.metrics) if self.cheap_batcher else None
+            )
+            if cheap_cost_ms:
+                # The cheap pass has already spent part of the budget.
+                budget_ms -= len(hits) * cheap_cost_ms
+            max_depth = depth_for_budget(budget_ms, batcher.metrics)
+
+        selected = select_cascade_candidates(
+            hits, cheap_scores, k, margin=self.margin, max_depth=max_depth
+        )
+        self.stats["requests"] += 1
+        self.stats["candidates_in"] += len(hits)
+        self.stats["candidates_reranked"] += len(selected)
+        if max_depth is not None and max_depth < len(hits):
+            self.stats["budget_capped"] += 1
+        return selected
+
+    def get_stats(self) -> Dict:
+        reranked_fraction = (
+            self.stats["candidates_reranked"] / self.stats["candidates_in"]
+            if self.stats["candidates_in"]
+            else 0.0
+        )
+        return {
+            **self.stats,
+            "margin": self.margin,
+            "default_budget_ms": self.default_budget_ms,
+            "reranked_fraction": reranked_fraction,
+        }
@@ -0,0 +1,167 @@
+import math
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class TokenCounter:
+    """
+    Counts LLM tokens for context budgeting, memoizing counts per document.
+
+    With `tokenizer_name`, counts come from that Hugging Face tokenizer (the
+    `tokenizers` package ships with sentence-transformers). Without it, or if
+    the tokenizer cannot be loaded, a conservative estimate of one token per
+    `chars_per_token` characters is used instead, which errs on the side of
+    sending too little context rather than overflowing the model's window.
+    """
+
+    def __init__(
+        self,
+        tokenizer_name: Optional[str] = None,
+        max_cached_documents: int = 50000,
+        chars_per_token: float = 3.0,
+    ):
+        self.tokenizer_name = None
+        self.chars_per_token = chars_per_token
+        self.max_cached_documents = max_cached_documents
+        self._tokenizer = None
+        self._counts: "OrderedDict[Tuple[str, int], int]" = OrderedDict()
+        self.stats = {"cached": 0, "counted": 0}
+        if tokenizer_name:
+            try:
+                from tokenizers import Tokenizer
+
+                self._tokenizer = Tokenizer.from_pretrained(tokenizer_name)
+                self.tokenizer_name = tokenizer_name
+            except Exception as e:
+                print(
+                    f"Warning: Failed to load tokenizer '{tokenizer_name}', "
+                    f"falling back to estimated token counts: {e}"
+                )
+
+    @property
+    def exact(self) -> bool:
+        return self._tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if self._tokenizer is None:
+            return math.ceil(len(text) / self.chars_per_token)
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def count_documents(self, docs: List[Tuple[Optional[str], str]]) -> List[int]:
+        """
+        Token counts for (doc_id, text) pairs, served from the memo when possible.
+
+        Documents without an id are counted every time. The memo key includes
+        the text's hash, so a re-ingested document with new text is recounted.
+        """
+        counts: List[Optional[int]] = []
+        pending = []
+        for i, (doc_id, text) in enumerate(docs):
+            count = None
+            if doc_id is not None:
+                count = self._counts.get((doc_id, hash(text)))
+            if count is None:
+                pending.append(i)
+            else:
+                self._counts.move_to_end((doc_id, hash(text)))
+            counts.append(count)
+        self.stats["cached"] += len(docs) - len(pending)
+        self.stats["counted"] += len(pending)
+
+        if pending:
+            texts = [docs[i][1] for i in pending]
+            if self._tokenizer is None:
+                new_counts = [self.count(text) for text in texts]
+            else:
+                new_counts = [
+                    len(encoding.ids)
+                    for encoding in self._tokenizer.encode_batch(
+                        texts, add_special_tokens=False
+                    )
+                ]
+            for i, count in zip(pending, new_counts):
+                counts[i] = count
+                doc_id, text = docs[i]
+                if doc_id is not None:
+                    self._counts[(doc_id, hash(text))] = count
+            while len(self._counts) > self.max_cached_documents:
+                self._counts.popitem(last=False)
+        return counts
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of `text` that fits in `max_tokens`, cut on a token boundary."""
+        if max_tokens <= 0:
+            return ""
+        if self._tokenizer is None:
+            prefix = text[: int(max_tokens * self.chars_per_token)]
+            # Do not leave half a word at the end.
+            cut = re.search(r"\s+\S*$", prefix)
+            return prefix[: cut.start()] if cut and len(prefix) < len(text) else prefix
+        encoding = self._tokenizer.encode(text, add_special_tokens=False)
+        if len(encoding.ids) <= max_tokens:
+            return text
+        return text[: encoding.offsets[max_tokens - 1][1]]
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "tokenizer": self.tokenizer_name,
+            "entries": len(self._counts),
+        }
+
+
+def _score_or_lowest(doc: Dict) -> float:
+    score = doc.get("cross_encoder_score")
+    return float("-inf") if score is None else score
+
+
+def pack_context(
+    documents: List[Dict],
+    counter: TokenCounter,
+    max_context_tokens: int,
+    min_truncated_tokens: int = 20,
+) -> str:
+    """
+    Builds the summarization context from as many documents as fit the budget.
+
+    Documents are taken greedily by descending `cross_encoder_score`, then
+    those without one in input order. The first document that no longer fits is cut
+    on a token boundary to fill the remaining budget, provided at least
+    `min_truncated_tokens` remain. Separators and headers count towards the
+    budget too.
+    """
+    candidates = [
+        doc
+        for doc in documents
+        if isinstance(doc["_source"].get("text", ""), str)
+        and doc["_source"].get("text", "").strip()
+    ]
+    candidates.sort(key=_score_or_lowest, reverse=True)
+    counts = counter.count_documents(
+        [(doc.get("_id"), doc["_source"]["text"]) for doc in candidates]
+    )
+
+    separator = "\n\n---\n\n"
+    separator_tokens = counter.count(separator)
+    context_parts = []
+    used_tokens = 0
+
+    for doc, doc_tokens in zip(candidates, counts):
+        doc_text = doc["_source"]["text"]
+        number = len(context_parts) + 1
+        header = f"Document {number}:\n"
+        overhead = counter.count(header) + (separator_tokens if context_parts else 0)
+        if used_tokens + overhead + doc_tokens <= max_context_tokens:
+            context_parts.append(header + doc_text)
+            used_tokens += overhead + doc_tokens
+            continue
+
+        header = f"Document {number} (truncated): "
+        overhead = counter.count(header) + (separator_tokens if context_parts else 0)
+        remaining_tokens = max_context_tokens - used_tokens - overhead
+        if remaining_tokens > min_truncated_tokens:
+            context_parts.append(header + counter.truncate(doc_text, remaining_tokens))
+        break
+
+    return separator.join(context_parts)
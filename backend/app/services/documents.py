@@ -0,0 +1,93 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.search_backend import SearchBackend
+
+
+class DocumentStore:
+    """
+    In-process LRU of recently served documents, keyed by `_id` (the citekey).
+
+    `/search` fills it with the hits it returns, so a summarization request
+    that only names those documents can be answered without re-sending or
+    re-fetching their text. Entries expire after `ttl_s` so re-ingested
+    documents are picked up again from Elasticsearch.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl_s: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "fetched": 0, "evictions": 0}
+
+    def put_many(self, hits: Iterable[Dict]):
+        expires_at = time.monotonic() + self.ttl_s
+        for hit in hits:
+            doc_id = hit.get("_id")
+            source = hit.get("_source")
+            if not doc_id or not isinstance(source, dict):
+                continue
+            # Only what summarization needs; per-query fields such as scores
+            # are not part of the document.
+            self._entries[doc_id] = (
+                expires_at,
+                {"_index": hit.get("_index"), "_id": doc_id, "_source": source},
+            )
+            self._entries.move_to_end(doc_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def get_many(self, doc_ids: List[str]) -> Tuple[Dict[str, Dict], List[str]]:
+        """Returns the stored documents by id and the ids that must be fetched."""
+        found = {}
+        missing = []
+        now = time.monotonic()
+        for doc_id in doc_ids:
+            entry = self._entries.get(doc_id)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[doc_id]
+                missing.append(doc_id)
+                continue
+            self._entries.move_to_end(doc_id)
+            found[doc_id] = entry[1]
+        self.stats["hits"] += len(found)
+        self.stats["misses"] += len(missing)
+        return found, missing
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, "entries": len(self._entries), "max_entries": self.max_entries}
+
+
+async def resolve_documents(
+    doc_ids: List[str],
+    store: Optional[DocumentStore],
+    search_backend: SearchBackend,
+    index_name: str = "serp-ai",
+) -> Tuple[List[Dict], List[str]]:
+    """
+    Looks up documents by id, from `store` first and with one backend `mget`
+    for the rest.
+
+    Returns the documents in the requested order and the ids that were not found.
+    """
+    # Duplicate ids would only repeat a document in the prompt.
+    doc_ids = list(dict.fromkeys(doc_ids))
+    if store is not None:
+        found, missing = store.get_many(doc_ids)
+    else:
+        found, missing = {}, doc_ids
+
+    if missing:
+        fetched = await search_backend.mget(missing, index_name=index_name)
+        for doc in fetched:
+            found[doc["_id"]] = doc
+        if store is not None:
+            store.put_many(fetched)
+            store.stats["fetched"] += len(fetched)
+
+    documents = [found[doc_id] for doc_id in doc_ids if doc_id in found]
+    not_found = [doc_id for doc_id in doc_ids if doc_id not in found]
+    return documents, not_found
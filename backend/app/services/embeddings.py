@@ -0,0 +1,142 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Dict, Iterable, Iterator, List
+
+# Field of the serp-ai index holding the document embedding.
+EMBEDDING_FIELD = "text_embedding"
+
+# Models loaded by `preload_embedding_model`, by name.
+_PRELOADED: Dict[str, Any] = {}
+
+
+def load_embedding_model(model_name: str) -> Any:
+    """Loads a SentenceTransformer bi-encoder on the CPU, or returns the preloaded one."""
+    if model_name in _PRELOADED:
+        return _PRELOADED[model_name]
+    # Imported here so ingestion without embeddings does not load torch.
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(model_name, device="cpu")
+
+
+def preload_embedding_model(model_name: str) -> Any:
+    """Loads the bi-encoder once for `load_embedding_model`; see `preload_cross_encoder`."""
+    _PRELOADED[model_name] = load_embedding_model(model_name)
+    return _PRELOADED[model_name]
+
+
+class EmbeddingEncoder:
+    """
+    Batched document encoder used at ingest time.
+
+    Texts are encoded `batch_size` at a time with normalized embeddings, so
+    cosine similarity in the index is a dot product. With `workers > 1` the
+    batches are spread over a pool of CPU processes.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 64, workers: int = 1):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.model = load_embedding_model(model_name)
+        self._pool = None
+        if workers > 1:
+            self._pool = self.model.start_multi_process_pool(["cpu"] * workers)
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        if self._pool is not None:
+            embeddings = self.model.encode_multi_process(
+                texts, self._pool, batch_size=self.batch_size, normalize_embeddings=True
+            )
+        else:
+            embeddings = self.model.encode(
+                texts,
+                batch_size=self.batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+            )
+        return embeddings.tolist()
+
+    def add_embeddings(self, sources: List[Dict], field: str = EMBEDDING_FIELD):
+        """Sets `field` on every source that has text to embed, in place."""
+        with_text = [
+            source
+            for source in sources
+            if isinstance(source.get("text"), str) and source["text"].strip()
+        ]
+        if not with_text:
+            return
+        for source, embedding in zip(
+            with_text, self.encode([source["text"] for source in with_text])
+        ):
+            source[field] = embedding
+
+    def embed_actions(
+        self, actions: Iterable[Dict], buffer_size: int = 1024, field: str = EMBEDDING_FIELD
+    ) -> Iterator[Dict]:
+        """Adds embeddings to a stream of bulk actions, `buffer_size` documents at a time."""
+        buffer: List[Dict] = []
+        for action in actions:
+            buffer.append(action)
+            if len(buffer) >= buffer_size:
+                yield from self._embed_buffer(buffer, field)
+                buffer = []
+        if buffer:
+            yield from self._embed_buffer(buffer, field)
+
+    def _embed_buffer(self, actions: List[Dict], field: str) -> Iterator[Dict]:
+        # Delete actions carry no source.
+        self.add_embeddings([a["_source"] for a in actions if "_source" in a], field)
+        yield from actions
+
+    def close(self):
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+
+class QueryEmbedder:
+    """Embeds search queries on a worker thread so the event loop stays free."""
+
+    def __init__(self, model: Any, executor: Executor):
+        self.model = model
+        self.executor = executor
+
+    async def embed(self, query: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        embedding = await loop.run_in_executor(
+            self.executor,
+            lambda: self.model.encode(query, normalize_embeddings=True, convert_to_numpy=True),
+        )
+        return embedding.tolist()
+
+    async def embed_many(self, queries: List[str]) -> List[List[float]]:
+        """Embeds a batch of queries in one `encode` call."""
+        loop = asyncio.get_running_loop()
+        embeddings = await loop.run_in_executor(
+            self.executor,
+            lambda: self.model.encode(queries, normalize_embeddings=True, convert_to_numpy=True),
+        )
+        return embeddings.tolist()
+
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Dict]], size: int, rank_constant: int = 60
+) -> List[Dict]:
+    """
+    Merges ranked hit lists by reciprocal rank fusion.
+
+    Each hit scores `sum(1 / (rank_constant + rank))` over the lists it
+    appears in (rank starting at 1), which needs no score normalization
+    between BM25 and vector similarity. The fused score replaces `_score`.
+    """
+    fused: Dict[str, float] = {}
+    hits: Dict[str, Dict] = {}
+    for results in result_lists:
+        for rank, hit in enumerate(results, start=1):
+            doc_id = hit["_id"]
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (rank_constant + rank)
+            hits.setdefault(doc_id, hit)
+
+    ranked = sorted(fused, key=lambda doc_id: fused[doc_id], reverse=True)[:size]
+    return [{**hits[doc_id], "_score": fused[doc_id]} for doc_id in ranked]
+
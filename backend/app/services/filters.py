@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+# Facet name -> the keyword/integer field it is counted on in the mapping.
+FACET_FIELDS = {
+    "year": "year",
+    "entry_type": "entry_type",
+    "authors": "authors",
+    "publisher": "publisher.keyword",
+}
+
+
+@dataclass(frozen=True)
+class SearchFilters:
+    """
+    Restrictions on the documents a search may return. Values within a field
+    are alternatives; the fields are combined with AND.
+    """
+
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    entry_types: Tuple[str, ...] = ()
+    authors: Tuple[str, ...] = ()
+    publishers: Tuple[str, ...] = ()
+
+    def __bool__(self) -> bool:
+        return bool(
+            self.year_from is not None
+            or self.year_to is not None
+            or self.entry_types
+            or self.authors
+            or self.publishers
+        )
+
+    def terms(self) -> Dict[str, Tuple[str, ...]]:
+        """The facet name and accepted values of every active keyword filter."""
+        terms = {
+            "entry_type": self.entry_types,
+            "authors": self.authors,
+            "publisher": self.publishers,
+        }
+        return {name: values for name, values in terms.items() if values}
+
+    def cache_key(self) -> str:
+        """A canonical string of the filters, for cache keys."""
+        if not self:
+            return ""
+        parts = [f"year={self.year_from}..{self.year_to}"]
+        parts.extend(f"{name}={'|'.join(sorted(values))}" for name, values in self.terms().items())
+        return ";".join(parts)
+
+    def es_clauses(self) -> List[Dict]:
+        """
+        Elasticsearch filter-context clauses. They do not score, so the
+        cluster can answer them from cached bitsets.
+        """
+        clauses = []
+        if self.year_from is not None or self.year_to is not None:
+            year_range = {}
+            if self.year_from is not None:
+                year_range["gte"] = self.year_from
+            if self.year_to is not None:
+                year_range["lte"] = self.year_to
+            clauses.append({"range": {"year": year_range}})
+        for name, values in self.terms().items():
+            clauses.append({"terms": {FACET_FIELDS[name]: list(values)}})
+        return clauses
+
+
+def facet_aggregations(size: int) -> Dict:
+    """A `terms` aggregation per facet, counting the `size` most frequent values."""
+    return {name: {"terms": {"field": field, "size": size}} for name, field in FACET_FIELDS.items()}
+
+
+def parse_facet_aggregations(aggregations: Dict) -> Dict[str, List[Dict[str, Any]]]:
+    """`{facet: [{"value", "count"}, ...]}` from the aggregations of `facet_aggregations`."""
+    return {
+        name: [
+            {"value": bucket["key"], "count": bucket["doc_count"]}
+            for bucket in aggregations.get(name, {}).get("buckets", [])
+        ]
+        for name in FACET_FIELDS
+    }
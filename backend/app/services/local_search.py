@@ -0,0 +1,461 @@
+import asyncio
+import hashlib
+import json
+import math
+import mmap
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.filters import FACET_FIELDS, SearchFilters
+from app.services.search_backend import SearchBackend
+
+_TOKEN = re.compile(r"\w+")
+
+# Lucene's BM25 defaults, as used by Elasticsearch.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, close to Elasticsearch's standard analyzer."""
+    return _TOKEN.findall(text.lower())
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+def _facet_values(name: str, source: Dict) -> List:
+    """The values `source` contributes to facet `name`, as the mapping would index them."""
+    if name == "year":
+        year = source.get("year")
+        return [year] if isinstance(year, int) and not isinstance(year, bool) else []
+    values = source.get(name)
+    if not isinstance(values, list):
+        values = [values]
+    # Like the `keyword` sub-fields, which skip values over `ignore_above`.
+    return [value for value in values if isinstance(value, str) and 0 < len(value) <= 256]
+
+
+def build_local_index(
+    documents: Iterable[Tuple[str, Dict]],
+    output_dir: str,
+    index_name: str = "serp-ai",
+    field: str = "text",
+) -> Dict:
+    """
+    Writes a BM25 index of (doc_id, source) pairs to `output_dir`.
+
+    Everything is stored as flat numpy arrays so the index can be memory
+    mapped: terms and ids are looked up by their sorted 64-bit hashes, each
+    term's postings are a contiguous slice of (doc number, term frequency)
+    arrays, and the sources are concatenated JSON records addressed by
+    offset. Per-document BM25 length norms are precomputed.
+
+    Each facet is stored as (value, doc number) pairs sorted by value, with
+    the values numbered in sorted order, so a filter is a slice and facet
+    counts are a `bincount`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    term_ids: Dict[str, int] = {}
+    postings: List[List[Tuple[int, int]]] = []
+    doc_lengths: List[int] = []
+    doc_ids: List[str] = []
+    doc_offsets = [0]
+    facet_pairs: Dict[str, List[Tuple[Any, int]]] = {name: [] for name in FACET_FIELDS}
+
+    with open(os.path.join(output_dir, "docs.bin"), "wb") as docs_file:
+        for doc_number, (doc_id, source) in enumerate(documents):
+            text = source.get(field)
+            tokens = tokenize(text) if isinstance(text, str) else []
+            doc_lengths.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                term_id = term_ids.setdefault(term, len(term_ids))
+                if term_id == len(postings):
+                    postings.append([])
+                postings[term_id].append((doc_number, min(tf, 65535)))
+
+            for name, pairs in facet_pairs.items():
+                pairs.extend((value, doc_number) for value in set(_facet_values(name, source)))
+
+            record = json.dumps([doc_id, source], ensure_ascii=False).encode("utf-8")
+            docs_file.write(record)
+            doc_offsets.append(doc_offsets[-1] + len(record))
+            doc_ids.append(doc_id)
+
+    num_docs = len(doc_lengths)
+    lengths = np.asarray(doc_lengths, dtype=np.float32)
+    avgdl = float(lengths.mean()) if num_docs else 0.0
+    doc_norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths / (avgdl or 1.0))
+
+    terms = list(term_ids)
+    term_hashes = np.fromiter((_hash64(t) for t in terms), dtype=np.uint64, count=len(terms))
+    term_order = np.argsort(term_hashes, kind="stable")
+    term_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+    term_offsets[1:] = np.cumsum([len(postings[i]) for i in term_order])
+    postings_docs = np.empty(term_offsets[-1], dtype=np.uint32)
+    postings_tfs = np.empty(term_offsets[-1], dtype=np.uint16)
+    for position, term_id in enumerate(term_order):
+        start, end = term_offsets[position], term_offsets[position + 1]
+        entries = np.asarray(postings[term_id], dtype=np.int64)
+        postings_docs[start:end] = entries[:, 0]
+        postings_tfs[start:end] = entries[:, 1]
+
+    id_hashes = np.fromiter((_hash64(d) for d in doc_ids), dtype=np.uint64, count=num_docs)
+    id_order = np.argsort(id_hashes, kind="stable").astype(np.uint32)
+
+    arrays = {
+        "term_hashes": term_hashes[term_order],
+        "term_offsets": term_offsets,
+        "postings_docs": postings_docs,
+        "postings_tfs": postings_tfs,
+        "doc_norms": doc_norms.astype(np.float32),
+        "doc_offsets": np.asarray(doc_offsets, dtype=np.int64),
+        "id_hashes": id_hashes[id_order],
+        "id_order": id_order,
+    }
+    facet_vocab = {}
+    for name, pairs in facet_pairs.items():
+        pairs.sort()
+        vocab = sorted({value for value, _ in pairs})
+        value_ids = {value: i for i, value in enumerate(vocab)}
+        facet_vocab[name] = vocab
+        arrays[f"facet_{name}_values"] = np.fromiter(
+            (value_ids[value] for value, _ in pairs), dtype=np.uint32, count=len(pairs)
+        )
+        arrays[f"facet_{name}_docs"] = np.fromiter(
+            (doc_number for _, doc_number in pairs), dtype=np.uint32, count=len(pairs)
+        )
+    for name, array in arrays.items():
+        np.save(os.path.join(output_dir, f"{name}.npy"), array)
+    with open(os.path.join(output_dir, "facets.json"), "w", encoding="utf-8") as f:
+        json.dump(facet_vocab, f, ensure_ascii=False)
+
+    meta = {
+        "index_name": index_name,
+        "field": field,
+        "num_docs": num_docs,
+        "num_terms": len(terms),
+        "avgdl": avgdl,
+        "k1": BM25_K1,
+        "b": BM25_B,
+        "facets": list(FACET_FIELDS),
+    }
+    # Written last: an index directory without meta.json is incomplete.
+    with open(os.path.join(output_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+class LocalSearchBackend(SearchBackend):
+    """
+    In-process BM25 search over an index written by `build_local_index`.
+
+    All arrays are memory-mapped, so opening the index costs milliseconds
+    regardless of its size and pages are loaded on first use. Stands in for
+    Elasticsearch in development, CI and small deployments.
+    """
+
+    name = "local"
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.term_hashes = load("term_hashes")
+        self.term_offsets = load("term_offsets")
+        self.postings_docs = load("postings_docs")
+        self.postings_tfs = load("postings_tfs")
+        self.doc_norms = load("doc_norms")
+        self.doc_offsets = load("doc_offsets")
+        self.id_hashes = load("id_hashes")
+        self.id_order = load("id_order")
+
+        # Indexes built before facets were added can only serve unfiltered searches.
+        self.facet_vocab: Optional[Dict[str, List]] = None
+        self.facet_columns: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._facet_value_ids: Dict[str, Dict[Any, int]] = {}
+        if "facets" in self.meta:
+            with open(os.path.join(index_dir, "facets.json"), "r", encoding="utf-8") as f:
+                self.facet_vocab = json.load(f)
+            for name, vocab in self.facet_vocab.items():
+                self.facet_columns[name] = (
+                    load(f"facet_{name}_values"),
+                    load(f"facet_{name}_docs"),
+                )
+                self._facet_value_ids[name] = {value: i for i, value in enumerate(vocab)}
+
+        self._docs_file = open(os.path.join(index_dir, "docs.bin"), "rb")
+        self._docs: Optional[mmap.mmap] = None
+        if os.fstat(self._docs_file.fileno()).st_size:
+            self._docs = mmap.mmap(self._docs_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    async def ping(self) -> bool:
+        return True
+
+    def _postings(self, term: str) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        term_hash = np.uint64(_hash64(term))
+        position = int(np.searchsorted(self.term_hashes, term_hash))
+        if position >= len(self.term_hashes) or self.term_hashes[position] != term_hash:
+            return None
+        start, end = self.term_offsets[position], self.term_offsets[position + 1]
+        return self.postings_docs[start:end], self.postings_tfs[start:end]
+
+    def _record(self, doc_number: int) -> Tuple[str, Dict]:
+        start, end = self.doc_offsets[doc_number], self.doc_offsets[doc_number + 1]
+        doc_id, source = json.loads(self._docs[start:end])
+        return doc_id, source
+
+    def _hit(
+        self,
+        doc_number: int,
+        score: Optional[float] = None,
+        source_includes: Optional[List[str]] = None,
+    ) -> Dict:
+        doc_id, source = self._record(doc_number)
+        if source_includes is not None:
+            source = {name: source[name] for name in source_includes if name in source}
+        hit = {"_index": self.meta["index_name"], "_id": doc_id}
+        if score is not None:
+            hit["_score"] = score
+        hit["_source"] = source
+        return hit
+
+    def _scores(self, query: str) -> np.ndarray:
+        num_docs = self.meta["num_docs"]
+        scores = np.zeros(num_docs, dtype=np.float32)
+        # Like a `match` query, every query token is a separate clause.
+        for term in tokenize(query):
+            postings = self._postings(term)
+            if postings is None:
+                continue
+            docs, tfs = postings
+            tfs = tfs.astype(np.float32)
+            df = len(docs)
+            idf = math.log(1 + (num_docs - df + 0.5) / (df + 0.5))
+            scores[docs] += idf * tfs / (tfs + self.doc_norms[docs])
+        return scores
+
+    def _docs_with(self, name: str, value_ids) -> np.ndarray:
+        """Mask of the documents with any of the values `value_ids` in facet `name`."""
+        values, docs = self.facet_columns[name]
+        mask = np.zeros(self.meta["num_docs"], dtype=bool)
+        for value_id in value_ids:
+            start = np.searchsorted(values, value_id, side="left")
+            end = np.searchsorted(values, value_id, side="right")
+            mask[docs[start:end]] = True
+        return mask
+
+    def _match_mask(self, scores: np.ndarray, filters: Optional[SearchFilters]) -> np.ndarray:
+        """The documents matching the query (any token) and `filters`."""
+        mask = scores > 0
+        if not filters:
+            return mask
+        if self.facet_vocab is None:
+            raise ValueError(
+                "The local index has no facet columns; rebuild it with app.tools.build_local_index."
+            )
+        if filters.year_from is not None or filters.year_to is not None:
+            low = filters.year_from if filters.year_from is not None else -(1 << 31)
+            high = filters.year_to if filters.year_to is not None else 1 << 31
+            years = self.facet_vocab["year"]
+            mask &= self._docs_with(
+                "year", [i for i, year in enumerate(years) if low <= year <= high]
+            )
+        for name, accepted in filters.terms().items():
+            value_ids = self._facet_value_ids[name]
+            mask &= self._docs_with(
+                name, [value_ids[value] for value in accepted if value in value_ids]
+            )
+        return mask
+
+    def _facet_counts(self, mask: np.ndarray, facet_size: int) -> Dict[str, List[Dict]]:
+        facets = {}
+        for name, (values, docs) in self.facet_columns.items():
+            vocab = self.facet_vocab[name]
+            counts = np.bincount(values[mask[docs]], minlength=len(vocab))
+            # Most frequent first, then by value, like a `terms` aggregation.
+            top = np.argsort(-counts, kind="stable")[:facet_size]
+            facets[name] = [
+                {"value": vocab[i], "count": int(counts[i])} for i in top if counts[i]
+            ]
+        return facets
+
+    @staticmethod
+    def _ranked(scores: np.ndarray, mask: np.ndarray, size: int) -> np.ndarray:
+        """The `size` best documents in `mask`, best first."""
+        matched = np.flatnonzero(mask)
+        if len(matched) > size:
+            # Everything tied with the size-th score stays in, so the
+            # tiebreak below decides which of them make the cut.
+            cutoff = np.partition(scores[matched], len(matched) - size)[len(matched) - size]
+            matched = matched[scores[matched] >= cutoff]
+        # Ties are broken by document order, which is stable across runs.
+        return matched[np.lexsort((matched, -scores[matched]))][:size]
+
+    def _top_hits(
+        self,
+        scores: np.ndarray,
+        mask: np.ndarray,
+        size: int,
+        source_includes: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        return [
+            self._hit(int(i), float(scores[i]), source_includes)
+            for i in self._ranked(scores, mask, size)
+        ]
+
+    def search_sync(
+        self,
+        query: str,
+        size: int = 100,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+    ) -> List[Dict]:
+        scores = self._scores(query)
+        return self._top_hits(scores, self._match_mask(scores, filters), size, source_includes)
+
+    def search_with_facets_sync(
+        self,
+        query: str,
+        size: int = 100,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        facet_size: int = 10,
+    ) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+        if self.facet_vocab is None:
+            raise ValueError(
+                "The local index has no facet columns; rebuild it with app.tools.build_local_index."
+            )
+        scores = self._scores(query)
+        mask = self._match_mask(scores, filters)
+        return (
+            self._top_hits(scores, mask, size, source_includes),
+            self._facet_counts(mask, facet_size),
+        )
+
+    def search_after_sync(
+        self,
+        query: str,
+        after: Optional[List] = None,
+        size: int = 10,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        exclude_ids: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """
+        The hits after the `sort` value `after`, a (score, doc number) pair.
+        The index never changes once written, so it is its own point-in-time.
+        """
+        scores = self._scores(query)
+        mask = self._match_mask(scores, filters)
+        for doc_id in exclude_ids or []:
+            doc_number = self._doc_number(doc_id)
+            if doc_number is not None:
+                mask[doc_number] = False
+        if after is not None:
+            score, doc_number = np.float32(after[0]), int(after[1])
+            numbers = np.arange(len(scores))
+            mask &= (scores < score) | ((scores == score) & (numbers > doc_number))
+        hits = []
+        for i in self._ranked(scores, mask, size):
+            hit = self._hit(int(i), float(scores[i]), source_includes)
+            hit["sort"] = [float(scores[i]), int(i)]
+            hits.append(hit)
+        return hits
+
+    def _doc_number(self, doc_id: str) -> Optional[int]:
+        id_hash = np.uint64(_hash64(doc_id))
+        position = int(np.searchsorted(self.id_hashes, id_hash))
+        while position < len(self.id_hashes) and self.id_hashes[position] == id_hash:
+            doc_number = int(self.id_order[position])
+            if self._record(doc_number)[0] == doc_id:
+                return doc_number
+            position += 1
+        return None
+
+    def mget_sync(self, doc_ids: List[str]) -> List[Dict]:
+        docs = []
+        for doc_id in doc_ids:
+            doc_number = self._doc_number(doc_id)
+            if doc_number is not None:
+                docs.append({**self._hit(doc_number), "found": True})
+        return docs
+
+    async def search(
+        self,
+        query: str,
+        index_name: str = "serp-ai",
+        size: int = 100,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+    ) -> List[Dict]:
+        # Scoring is numpy work; keep it off the event loop.
+        return await asyncio.to_thread(self.search_sync, query, size, source_includes, filters)
+
+    async def search_with_facets(
+        self,
+        query: str,
+        index_name: str = "serp-ai",
+        size: int = 100,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        facet_size: int = 10,
+    ) -> Tuple[List[Dict], Dict[str, List[Dict]]]:
+        return await asyncio.to_thread(
+            self.search_with_facets_sync, query, size, source_includes, filters, facet_size
+        )
+
+    async def open_pit(
+        self, index_name: str = "serp-ai", scope: Optional[str] = None
+    ) -> Optional[str]:
+        return None
+
+    async def search_after(
+        self,
+        query: str,
+        pit_id: Optional[str],
+        after: Optional[List] = None,
+        index_name: str = "serp-ai",
+        size: int = 10,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        exclude_ids: Optional[List[str]] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        hits = await asyncio.to_thread(
+            self.search_after_sync, query, after, size, source_includes, filters, exclude_ids
+        )
+        return hits, None
+
+    async def msearch(
+        self,
+        queries: List[str],
+        index_name: str = "serp-ai",
+        size: int = 100,
+        source_includes: Optional[List[str]] = None,
+    ) -> List[List[Dict]]:
+        # One thread hop for the batch rather than one per query.
+        return await asyncio.to_thread(
+            lambda: [self.search_sync(query, size, source_includes) for query in queries]
+        )
+
+    async def mget(self, doc_ids: List[str], index_name: str = "serp-ai") -> List[Dict]:
+        return await asyncio.to_thread(self.mget_sync, doc_ids)
+
+    def get_stats(self) -> Dict:
+        return {"backend": self.name, "index_dir": self.index_dir, **self.meta}
+
+    async def close(self):
+        if self._docs is not None:
+            self._docs.close()
+        self._docs_file.close()
@@ -0,0 +1,48 @@
+import base64
+import binascii
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from app.services.cache import normalize_query
+
+
+def cursor_scope(query: str, variant: str) -> str:
+    """Ties a cursor to the query and the parameters that decide its results."""
+    raw = f"{normalize_query(query)}|{variant}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def encode_cursor(
+    scope: str, offset: int, pit_id: Optional[str] = None, after: Optional[List] = None
+) -> str:
+    """
+    An opaque, URL-safe token for the page starting at `offset`. Past the
+    rerank window it also holds the point-in-time and the `sort` value of
+    the last hit served.
+    """
+    position = {"s": scope, "o": offset}
+    if after is not None:
+        position["pit"] = pit_id
+        position["after"] = after
+    raw = json.dumps(position, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, scope: str) -> Dict:
+    """
+    `{"offset", "pit_id", "after"}` of a cursor from `encode_cursor`. Raises
+    ValueError if it is malformed or belongs to another query.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+        offset = position["o"]
+        after = position.get("after")
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise ValueError("Malformed cursor.")
+    if position.get("s") != scope:
+        raise ValueError("The cursor belongs to a different query or parameters.")
+    if not isinstance(offset, int) or offset < 0 or not (after is None or isinstance(after, list)):
+        raise ValueError("Malformed cursor.")
+    return {"offset": offset, "pit_id": position.get("pit"), "after": after}
@@ -0,0 +1,107 @@
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
+RERANKER_BACKENDS = ("torch", "onnx", "int8")
+
+# Models loaded by `preload_cross_encoder`, by (model_name, backend, onnx_file).
+_PRELOADED: Dict[Tuple[str, str, Optional[str]], "CrossEncoder"] = {}
+
+# Short and long pairs, so warm-up covers the shapes served by /search.
+WARMUP_PAIRS = [
+    ["warm up", "A short document."],
+    ["cross encoder warm up query", " ".join(["A longer document about retrieval."] * 60)],
+]
+
+# File written by `export_dynamic_quantized_onnx_model` for each quantization config.
+DEFAULT_QUANTIZATION_CONFIG = "avx512_vnni"
+
+
+def quantized_onnx_file_name(quantization_config: str = DEFAULT_QUANTIZATION_CONFIG) -> str:
+    return f"onnx/model_qint8_{quantization_config}.onnx"
+
+
+def load_cross_encoder(
+    model_name: str, backend: str = "torch", onnx_file: Optional[str] = None
+) -> "CrossEncoder":
+    """
+    Loads the reranker with the requested inference backend.
+
+    - "torch": the PyTorch fp32 weights.
+    - "onnx": ONNX Runtime on the exported fp32 graph (`onnx/model.onnx`).
+    - "int8": ONNX Runtime on the dynamically quantized graph produced by
+      `python -m app.tools.export_reranker`.
+
+    `onnx_file` overrides the graph file inside the model directory. A model
+    preloaded with the same arguments is returned as is.
+    """
+    backend = backend.lower()
+    if backend not in RERANKER_BACKENDS:
+        raise ValueError(
+            f"Unknown reranker backend '{backend}', expected one of {RERANKER_BACKENDS}."
+        )
+    preloaded = _PRELOADED.get((model_name, backend, onnx_file))
+    if preloaded is not None:
+        return preloaded
+
+    # Imported here: sentence_transformers pulls in torch, which takes seconds.
+    from sentence_transformers import CrossEncoder
+
+    if backend == "torch":
+        return CrossEncoder(model_name)
+
+    if backend == "int8" and not onnx_file:
+        onnx_file = quantized_onnx_file_name()
+    model_kwargs = {"file_name": onnx_file} if onnx_file else {}
+    return CrossEncoder(model_name, backend="onnx", model_kwargs=model_kwargs)
+
+
+def preload_cross_encoder(
+    model_name: str, backend: str = "torch", onnx_file: Optional[str] = None
+) -> "CrossEncoder":
+    """
+    Loads the reranker once, so that `load_cross_encoder` hands out this
+    instance. Called in a parent process before forking workers, the weights
+    are then shared copy-on-write instead of loaded per worker.
+    """
+    backend = backend.lower()
+    model = load_cross_encoder(model_name, backend=backend, onnx_file=onnx_file)
+    _PRELOADED[(model_name, backend, onnx_file)] = model
+    return model
+
+
+async def warm_up_cross_encoder(
+    model: "CrossEncoder", executor: Executor, concurrency: int = 1, rounds: int = 1
+) -> float:
+    """
+    Runs `rounds` of `predict` calls on `concurrency` executor threads, so
+    lazy initialization (kernel selection, thread pools, allocator growth)
+    happens before the first request. Returns the seconds it took.
+    """
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(executor, model.predict, WARMUP_PAIRS)
+                for _ in range(concurrency)
+            )
+        )
+    return time.perf_counter() - start
+
+
+def reranker_cache_name(
+    model_name: str, backend: str, onnx_file: Optional[str] = None
+) -> str:
+    """
+    Identifies the model, backend and ONNX graph scoring pairs, since
+    quantized scores differ from fp32 ones.
+    """
+    if backend == "torch":
+        return model_name
+    name = f"{model_name}@{backend}"
+    return f"{name}:{onnx_file}" if onnx_file else name
@@ -0,0 +1,130 @@
+import gzip
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.services.telemetry import span
+
+try:
+    import orjson
+except ImportError:  # Optional: pip install -e ".[speedups]"
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# `_source` fields per response profile. "compact" holds what the results page
+# renders; "full" (None) returns every stored field except the embedding. The
+# reranker only needs `text`, which is always fetched and dropped from the
+# response unless the profile lists it.
+RESPONSE_PROFILES: Dict[str, Optional[List[str]]] = {
+    "compact": [
+        "citekey",
+        "title",
+        "abstract",
+        "year",
+        "authors",
+        "booktitle",
+        "publisher",
+        "address",
+        "pages",
+        "url",
+    ],
+    "full": None,
+}
+
+# Bodies smaller than this are sent uncompressed; the framing would cost more
+# than it saves.
+MIN_COMPRESS_BYTES = 1024
+
+
+def source_includes(profile: str) -> Optional[List[str]]:
+    """The `_source` fields to fetch for `profile`, or None for all of them."""
+    fields = RESPONSE_PROFILES[profile]
+    if fields is None:
+        return None
+    return fields + ["text"] if "text" not in fields else list(fields)
+
+
+def project_hits(hits: List[Dict], profile: str) -> List[Dict]:
+    """Copies of `hits` with `_source` narrowed to the fields of `profile`."""
+    fields = RESPONSE_PROFILES[profile]
+    if fields is None:
+        return hits
+    return [
+        {
+            **hit,
+            "_source": {
+                name: hit["_source"][name] for name in fields if name in hit["_source"]
+            },
+        }
+        for hit in hits
+    ]
+
+
+def dumps_json(value: Any) -> bytes:
+    """Compact JSON, through orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Content codings from an Accept-Encoding header, minus those with q=0."""
+    encodings = []
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.append(name)
+    return encodings
+
+
+def compress_body(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    """
+    Compresses `body` with the best coding the client accepts: brotli when
+    the `brotli` package is installed, gzip otherwise. Levels favour speed,
+    since every search response is compressed on the request path.
+    """
+    if len(body) < MIN_COMPRESS_BYTES:
+        return body, None
+    encodings = accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in encodings:
+        return brotli.compress(body, quality=4), "br"
+    if "gzip" in encodings:
+        return gzip.compress(body, compresslevel=5), "gzip"
+    return body, None
+
+
+def json_response(
+    request: Request,
+    value: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """A JSON response serialized by `dumps_json` and compressed per Accept-Encoding."""
+    with span("serialize"):
+        body = dumps_json(value)
+    with span("compress"):
+        body, encoding = compress_body(body, request.headers.get("accept-encoding", ""))
+    headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json",
+        headers=headers,
+    )
@@ -0,0 +1,150 @@
+import hashlib
+import os
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.cache import normalize_query
+
+# One slot per cached score. `check` lets a reader detect a slot that another
+# worker process is rewriting at the same time (a torn write reads as a miss).
+_SLOT_DTYPE = np.dtype(
+    [("key_hi", "<u8"), ("key_lo", "<u8"), ("score", "<f4"), ("check", "<u4")]
+)
+
+
+def _check_value(key_lo: int, score: np.float32) -> int:
+    return (key_lo & 0xFFFFFFFF) ^ int(np.float32(score).view(np.uint32))
+
+
+class PairScoreCache:
+    """
+    Bounded, persistent cache of cross-encoder scores for (query, document) pairs.
+
+    Scores live in a fixed-size, set-associative hash table in a memory-mapped
+    file, so the cache survives restarts and is shared by every worker that
+    opens the same path. Keys hash the normalized query, the document id, the
+    scored document text and the model name, so a document whose text changed
+    on re-ingest is scored again; when a bucket is full, the new score replaces one of its
+    slots chosen by the key, keeping the file size constant.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        model_name: str,
+        capacity: int = 1 << 20,
+        ways: int = 8,
+    ):
+        if capacity % ways != 0:
+            raise ValueError("PairScoreCache capacity must be a multiple of ways.")
+        self.path = path
+        self.model_name = model_name
+        self.capacity = capacity
+        self.ways = ways
+        self.num_buckets = capacity // ways
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "replacements": 0}
+
+        expected_size = capacity * _SLOT_DTYPE.itemsize
+        if os.path.exists(path) and os.path.getsize(path) != expected_size:
+            print(
+                f"Warning: Pair score cache {path} does not match the configured "
+                f"capacity ({capacity} slots). Recreating it."
+            )
+            os.remove(path)
+        mode = "r+" if os.path.exists(path) else "w+"
+        self._table = np.memmap(path, dtype=_SLOT_DTYPE, mode=mode, shape=(capacity,))
+
+    def _key(self, normalized_query: str, doc_id: str, text: str):
+        digest = hashlib.blake2b(
+            f"{self.model_name}\x00{normalized_query}\x00{doc_id}\x00{text}".encode("utf-8"),
+            digest_size=16,
+        ).digest()
+        key_hi = int.from_bytes(digest[:8], "little")
+        key_lo = int.from_bytes(digest[8:], "little")
+        # An all-zero key marks an empty slot.
+        return key_hi or 1, key_lo
+
+    def _bucket(self, key_hi: int):
+        start = (key_hi % self.num_buckets) * self.ways
+        return start, self._table[start : start + self.ways]
+
+    def get_many(
+        self, query: str, doc_ids: Sequence[Optional[str]], texts: Sequence[str]
+    ) -> List[Optional[float]]:
+        """Returns the cached score for each (document id, text), or None on a miss."""
+        normalized_query = normalize_query(query)
+        results: List[Optional[float]] = []
+        with self._lock:
+            for doc_id, text in zip(doc_ids, texts):
+                if doc_id is None:
+                    results.append(None)
+                    continue
+                key_hi, key_lo = self._key(normalized_query, doc_id, text)
+                _, bucket = self._bucket(key_hi)
+                matches = np.nonzero(
+                    (bucket["key_hi"] == key_hi) & (bucket["key_lo"] == key_lo)
+                )[0]
+                score = None
+                if matches.size:
+                    slot = bucket[matches[0]]
+                    if int(slot["check"]) == _check_value(key_lo, slot["score"]):
+                        score = float(slot["score"])
+                if score is None:
+                    self.stats["misses"] += 1
+                else:
+                    self.stats["hits"] += 1
+                results.append(score)
+        return results
+
+    def put_many(
+        self,
+        query: str,
+        doc_ids: Sequence[Optional[str]],
+        texts: Sequence[str],
+        scores: Sequence[float],
+    ):
+        normalized_query = normalize_query(query)
+        with self._lock:
+            for doc_id, text, score in zip(doc_ids, texts, scores):
+                if doc_id is None:
+                    continue
+                key_hi, key_lo = self._key(normalized_query, doc_id, text)
+                start, bucket = self._bucket(key_hi)
+                same = np.nonzero(
+                    (bucket["key_hi"] == key_hi) & (bucket["key_lo"] == key_lo)
+                )[0]
+                empty = np.nonzero((bucket["key_hi"] == 0) & (bucket["key_lo"] == 0))[0]
+                if same.size:
+                    way = int(same[0])
+                elif empty.size:
+                    way = int(empty[0])
+                else:
+                    way = key_lo % self.ways
+                    self.stats["replacements"] += 1
+                score32 = np.float32(score)
+                self._table[start + way] = (
+                    key_hi,
+                    key_lo,
+                    score32,
+                    _check_value(key_lo, score32),
+                )
+                self.stats["stores"] += 1
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_ratio": self.stats["hits"] / lookups if lookups else 0.0,
+            "capacity": self.capacity,
+        }
+
+    def flush(self):
+        with self._lock:
+            self._table.flush()
+
+    def close(self):
+        self.flush()
+        del self._table
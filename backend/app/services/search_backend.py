@@ -0,0 +1,376 @@
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from app.services.embeddings import EMBEDDING_FIELD
+from app.services.filters import SearchFilters, facet_aggregations, parse_facet_aggregations
+
+if TYPE_CHECKING:
+    from elasticsearch import AsyncElasticsearch
+
+
+class PitExpiredError(Exception):
+    """The point-in-time a cursor reads from has expired or been closed."""
+
+
+class SearchBackend:
+    """
+    First-stage retrieval interface used by the API.
+
+    `search` returns hits and `mget` returns found documents, both in the
+    Elasticsearch shape (`_index`, `_id`, `_score`, `_source`), so reranking,
+    caching and summarization work the same whichever backend is configured.
+
+    Results past the first page are read with `search_after` from a
+    point-in-time opened by `open_pit`, in (score, tiebreaker) order. Each
+    hit's `sort` value is the position to continue after, so a page costs
+    the same however deep it is. `close_pit` gives the point-in-time back
+    once the last page has been read.
+    """
+
+    name = "base"
+
+    async def ping(self) -> bool:
+        raise NotImplementedError
+
+    async def search(
+        self,
+        query: str,
+        index_name: str = "serp-ai",
+        size: int = 100,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+    ) -> List[Dict]:
+        """Top `size` BM25 hits; `source_includes` limits the `_source` fields returned."""
+        raise NotImplementedError
+
+    async def search_with_facets(
+        self,
+        query: str,
+        index_name: str = "serp-ai",
+        size: int = 100,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        facet_size: int = 10,
+    ) -> Tuple[List[Dict], Dict[str, List[Dict[str, Any]]]]:
+        """
+        `search`, plus the `facet_size` most frequent values of each facet
+        among all the documents matching `query` and `filters`.
+        """
+        raise NotImplementedError
+
+    async def open_pit(
+        self, index_name: str = "serp-ai", scope: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Opens a point-in-time for `search_after`; None if the backend needs
+        none. Cursors with the same `scope` may share one.
+        """
+        raise NotImplementedError
+
+    async def close_pit(self, pit_id: Optional[str], scope: Optional[str] = None):
+        """Releases a point-in-time from `open_pit` with the same `scope`."""
+        pass
+
+    async def search_after(
+        self,
+        query: str,
+        pit_id: Optional[str],
+        after: Optional[List] = None,
+        index_name: str = "serp-ai",
+        size: int = 10,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        exclude_ids: Optional[List[str]] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        The `size` BM25 hits following the `sort` value `after` (from the
+        first hit when None), leaving out `exclude_ids`. Returns the hits
+        and the point-in-time id to continue with. Raises PitExpiredError if
+        `pit_id` no longer exists.
+        """
+        raise NotImplementedError
+
+    async def msearch(
+        self,
+        queries: List[str],
+        index_name: str = "serp-ai",
+        size: int = 100,
+        source_includes: Optional[List[str]] = None,
+    ) -> List[List[Dict]]:
+        """`search` for several queries at once; the hits of each query, in order."""
+        return list(
+            await asyncio.gather(
+                *(
+                    self.search(
+                        query, index_name=index_name, size=size, source_includes=source_includes
+                    )
+                    for query in queries
+                )
+            )
+        )
+
+    async def mget(self, doc_ids: List[str], index_name: str = "serp-ai") -> List[Dict]:
+        raise NotImplementedError
+
+    def get_stats(self) -> Dict:
+        return {"backend": self.name}
+
+    async def close(self):
+        pass
+
+
+class _SharedPit:
+    """A point-in-time and the cursors of one query paging through it."""
+
+    def __init__(self, pit_id: str, now: float):
+        self.pit_id = pit_id
+        self.users = 1
+        self.opened_at = now
+        self.used_at = now
+
+
+class ElasticsearchBackend(SearchBackend):
+    """
+    BM25 `multi_match` over the `text` field of an Elasticsearch index.
+
+    Cursors paging the same query share a point-in-time while it is younger
+    than `pit_keep_alive`, so later ones still see recent ingests. It is
+    closed once every cursor that opened it is exhausted. Past
+    `max_open_pits`, the least recently used one stops being shared; the
+    cursors still reading it keep it alive until they stop.
+    """
+
+    name = "elasticsearch"
+
+    def __init__(
+        self, client: "AsyncElasticsearch", pit_keep_alive: str = "5m", max_open_pits: int = 64
+    ):
+        self.client = client
+        # Each page extends the point-in-time; abandoned ones expire on their own.
+        self.pit_keep_alive = pit_keep_alive
+        self.max_open_pits = max_open_pits
+        self._pit_ttl_s = duration_seconds(pit_keep_alive)
+        self._pits: "OrderedDict[str, _SharedPit]" = OrderedDict()
+
+    async def ping(self) -> bool:
+        return await self.client.ping()
+
+    async def search(
+        self,
+        query: str,
+        index_name: str = "serp-ai",
+        size: int = 100,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+    ) -> List[Dict]:
+        response = await self.client.search(
+            index=index_name,
+            size=size,
+            query=filtered_query(query, filters),
+            source_includes=source_includes,
+            source_excludes=[EMBEDDING_FIELD],
+        )
+        return response["hits"]["hits"]
+
+    async def search_with_facets(
+        self,
+        query: str,
+        index_name: str = "serp-ai",
+        size: int = 100,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        facet_size: int = 10,
+    ) -> Tuple[List[Dict], Dict[str, List[Dict[str, Any]]]]:
+        # The aggregations run over the same filtered match set, in the same request.
+        response = await self.client.search(
+            index=index_name,
+            size=size,
+            query=filtered_query(query, filters),
+            aggregations=facet_aggregations(facet_size),
+            source_includes=source_includes,
+            source_excludes=[EMBEDDING_FIELD],
+        )
+        return response["hits"]["hits"], parse_facet_aggregations(response["aggregations"])
+
+    async def open_pit(
+        self, index_name: str = "serp-ai", scope: Optional[str] = None
+    ) -> Optional[str]:
+        now = time.monotonic()
+        # Unused past the keep-alive, Elasticsearch has already freed them.
+        for key, shared in list(self._pits.items()):
+            if now - shared.used_at > self._pit_ttl_s:
+                del self._pits[key]
+        shared = self._pits.get(scope) if scope is not None else None
+        if shared is not None and now - shared.opened_at < self._pit_ttl_s:
+            shared.users += 1
+            shared.used_at = now
+            self._pits.move_to_end(scope)
+            return shared.pit_id
+
+        response = await self.client.open_point_in_time(
+            index=index_name, keep_alive=self.pit_keep_alive
+        )
+        pit_id = response["id"]
+        if scope is not None:
+            # An older one is left to the cursors still reading it.
+            self._pits[scope] = _SharedPit(pit_id, time.monotonic())
+            self._pits.move_to_end(scope)
+            while len(self._pits) > self.max_open_pits:
+                # No longer shared; one with cursors left expires on its own.
+                _, evicted = self._pits.popitem(last=False)
+                if evicted.users <= 0:
+                    await self._close_point_in_time(evicted.pit_id)
+        return pit_id
+
+    async def close_pit(self, pit_id: Optional[str], scope: Optional[str] = None):
+        if pit_id is None:
+            return
+        if scope is None:
+            await self._close_point_in_time(pit_id)
+            return
+        shared = self._pits.get(scope)
+        if shared is None or shared.pit_id != pit_id:
+            # Evicted, expired or replaced: other cursors may still read it.
+            return
+        shared.users -= 1
+        if shared.users <= 0:
+            del self._pits[scope]
+            await self._close_point_in_time(pit_id)
+
+    async def _close_point_in_time(self, pit_id: str):
+        try:
+            await self.client.close_point_in_time(id=pit_id)
+        except Exception as e:
+            print(f"Warning: Failed to close point-in-time: {e}")
+
+    async def search_after(
+        self,
+        query: str,
+        pit_id: Optional[str],
+        after: Optional[List] = None,
+        index_name: str = "serp-ai",
+        size: int = 10,
+        source_includes: Optional[List[str]] = None,
+        filters: Optional[SearchFilters] = None,
+        exclude_ids: Optional[List[str]] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        # A point-in-time search names no index; `_shard_doc` breaks score ties.
+        try:
+            response = await self.client.search(
+                pit={"id": pit_id, "keep_alive": self.pit_keep_alive},
+                size=size,
+                query=filtered_query(query, filters, exclude_ids),
+                sort=[{"_score": "desc"}, {"_shard_doc": "asc"}],
+                search_after=after,
+                track_total_hits=False,
+                source_includes=source_includes,
+                source_excludes=[EMBEDDING_FIELD],
+            )
+        except Exception as e:
+            # A missing search context is a 404 (search_context_missing_exception).
+            if getattr(e, "status_code", None) != 404:
+                raise
+            for key, shared in list(self._pits.items()):
+                if shared.pit_id == pit_id:
+                    del self._pits[key]
+            raise PitExpiredError(str(e)) from e
+        next_pit_id = response.get("pit_id", pit_id)
+        for shared in self._pits.values():
+            if shared.pit_id == pit_id:
+                shared.pit_id = next_pit_id
+                shared.used_at = time.monotonic()
+        return response["hits"]["hits"], next_pit_id
+
+    async def msearch(
+        self,
+        queries: List[str],
+        index_name: str = "serp-ai",
+        size: int = 100,
+        source_includes: Optional[List[str]] = None,
+    ) -> List[List[Dict]]:
+        # One `_msearch` round trip for the whole batch.
+        searches = []
+        for query in queries:
+            searches.append({})
+            searches.append(
+                {
+                    "size": size,
+                    "query": bm25_query(query),
+                    "_source": source_filter(source_includes),
+                }
+            )
+        response = await self.client.msearch(index=index_name, searches=searches)
+        return msearch_hits(response)
+
+    async def mget(self, doc_ids: List[str], index_name: str = "serp-ai") -> List[Dict]:
+        response = await self.client.mget(
+            index=index_name, ids=doc_ids, source_excludes=[EMBEDDING_FIELD]
+        )
+        return [doc for doc in response["docs"] if doc.get("found")]
+
+    async def close(self):
+        while self._pits:
+            _, shared = self._pits.popitem()
+            await self._close_point_in_time(shared.pit_id)
+        await self.client.close()
+
+
+_DURATION_UNITS = {"d": 86400.0, "h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def duration_seconds(value: str) -> float:
+    """Seconds in an Elasticsearch time value such as "5m" or "30s"."""
+    match = re.fullmatch(r"(\d+)(d|h|m|s|ms)", value.strip())
+    if match is None:
+        raise ValueError(f"Unsupported time value: {value}")
+    return int(match.group(1)) * _DURATION_UNITS[match.group(2)]
+
+
+def source_filter(source_includes: Optional[List[str]] = None) -> Dict:
+    """Request-body `_source` filter: never the embedding, and only `source_includes` if given."""
+    source = {"excludes": [EMBEDDING_FIELD]}
+    if source_includes is not None:
+        source["includes"] = source_includes
+    return source
+
+
+def msearch_hits(response) -> List[List[Dict]]:
+    """The hits of each search in an `_msearch` response; any failed search raises."""
+    result_lists = []
+    for item in response["responses"]:
+        if "error" in item:
+            raise RuntimeError(item["error"])
+        result_lists.append(item["hits"]["hits"])
+    return result_lists
+
+
+def bm25_query(query: str) -> Dict:
+    return {
+        "multi_match": {
+            "query": query,
+            "fields": "text",
+            "type": "most_fields",
+        }
+    }
+
+
+def filtered_query(
+    query: str,
+    filters: Optional[SearchFilters] = None,
+    exclude_ids: Optional[List[str]] = None,
+) -> Dict:
+    """
+    `bm25_query` with `filters` in filter context and `exclude_ids` left
+    out. Neither changes the scores, so hits rank as they would unfiltered.
+    """
+    if not filters and not exclude_ids:
+        return bm25_query(query)
+    clauses: Dict[str, Any] = {"must": [bm25_query(query)]}
+    if filters:
+        clauses["filter"] = filters.es_clauses()
+    if exclude_ids:
+        clauses["must_not"] = [{"ids": {"values": list(exclude_ids)}}]
+    return {"bool": clauses}
@@ -1,20 +1,59 @@
 from fastapi import Request, HTTPException
-from elasticsearch import Elasticsearch
-from sentence_transformers import CrossEncoder
-from together import Together
-from typing import List, Dict, AsyncGenerator
+from together import AsyncTogether
+from typing import TYPE_CHECKING, List, Dict, AsyncGenerator, Optional, Tuple
+import asyncio
+import hashlib
+import time
+from app.services.batching import RerankBatcher
+from app.services.cascade import RerankCascade
+from app.services.cache import QueryResultCache, SummaryCache
+from app.services.context import TokenCounter, pack_context
+from app.services.documents import DocumentStore
+from app.services.embeddings import (
+    EMBEDDING_FIELD,
+    QueryEmbedder,
+    reciprocal_rank_fusion,
+)
+from app.services.filters import SearchFilters, facet_aggregations, parse_facet_aggregations
+from app.services.score_cache import PairScoreCache
+from app.services.suggest import SuggestIndex
+from app.services.search_backend import (
+    PitExpiredError,
+    SearchBackend,
+    filtered_query,
+    msearch_hits,
+    source_filter,
+)
+from app.services.telemetry import (
+    LLM_TIME_TO_FIRST_TOKEN,
+    LLM_TOKENS_PER_SECOND,
+    predict_timer,
+    record_stage,
+    span,
+)
 
+if TYPE_CHECKING:
+    # Deferred: sentence_transformers pulls in torch, and the local search
+    # backend does not need the Elasticsearch client.
+    from elasticsearch import AsyncElasticsearch
+    from sentence_transformers import CrossEncoder
 
-def get_es_client(request: Request) -> Elasticsearch:
-    if not hasattr(request.app.state, "es_client"):
+# Bump whenever the summarization prompt changes so cached summaries expire.
+SUMMARY_PROMPT_VERSION = "1"
+
+_ESTIMATED_TOKEN_COUNTER = TokenCounter()
+
+
+def get_search_backend(request: Request) -> SearchBackend:
+    if not hasattr(request.app.state, "search_backend"):
         raise HTTPException(
             status_code=503,
-            detail="Elasticsearch client not available.",
+            detail="Search backend not available.",
         )
-    return request.app.state.es_client
+    return request.app.state.search_backend
 
 
-def get_cross_encoder_model(request: Request) -> CrossEncoder:
+def get_cross_encoder_model(request: Request) -> "CrossEncoder":
     if not hasattr(request.app.state, "cross_encoder_model"):
         raise HTTPException(
             status_code=503,
@@ -23,7 +62,69 @@ def get_cross_encoder_model(request: Request) -> CrossEncoder:
     return request.app.state.cross_encoder_model
 
 
-def get_together_client(request: Request) -> Together:
+def get_rerank_batcher(request: Request) -> RerankBatcher:
+    if not hasattr(request.app.state, "rerank_batcher"):
+        raise HTTPException(
+            status_code=503,
+            detail="Rerank batcher not available.",
+        )
+    return request.app.state.rerank_batcher
+
+
+def get_result_cache(request: Request) -> QueryResultCache:
+    if not hasattr(request.app.state, "result_cache"):
+        raise HTTPException(
+            status_code=503,
+            detail="Search result cache not available.",
+        )
+    return request.app.state.result_cache
+
+
+def get_score_cache(request: Request) -> Optional[PairScoreCache]:
+    # The pair score cache is optional; reranking works without it.
+    return getattr(request.app.state, "score_cache", None)
+
+
+def get_document_store(request: Request) -> Optional[DocumentStore]:
+    return getattr(request.app.state, "document_store", None)
+
+
+def get_token_counter(request: Request) -> Optional[TokenCounter]:
+    return getattr(request.app.state, "token_counter", None)
+
+
+def get_query_embedder(request: Request) -> Optional[QueryEmbedder]:
+    # Only set when hybrid retrieval is enabled.
+    return getattr(request.app.state, "query_embedder", None)
+
+
+def get_rerank_cascade(request: Request) -> Optional[RerankCascade]:
+    return getattr(request.app.state, "rerank_cascade", None)
+
+
+def get_summary_cache(request: Request) -> Optional[SummaryCache]:
+    return getattr(request.app.state, "summary_cache", None)
+
+
+def get_batch_search_slots(request: Request) -> asyncio.Semaphore:
+    if not hasattr(request.app.state, "batch_search_slots"):
+        raise HTTPException(
+            status_code=503,
+            detail="Batch search not available.",
+        )
+    return request.app.state.batch_search_slots
+
+
+def get_suggest_index(request: Request) -> SuggestIndex:
+    if not hasattr(request.app.state, "suggest_index"):
+        raise HTTPException(
+            status_code=503,
+            detail="Suggest index not available.",
+        )
+    return request.app.state.suggest_index
+
+
+def get_together_client(request: Request) -> AsyncTogether:
     if not hasattr(request.app.state, "together_client"):
         raise HTTPException(
             status_code=503,
@@ -32,33 +133,290 @@ def get_together_client(request: Request) -> Together:
     return request.app.state.together_client
 
 
-def perform_elasticsearch_search(
-    query: str, es_client: Elasticsearch, index_name: str = "serp-ai", size: int = 100
-) -> list:
+async def perform_elasticsearch_search(
+    query: str,
+    search_backend: SearchBackend,
+    index_name: str = "serp-ai",
+    size: int = 100,
+    source_includes: Optional[List[str]] = None,
+    filters: Optional[SearchFilters] = None,
+    facet_size: int = 0,
+) -> Tuple[list, Optional[Dict]]:
+    """
+    BM25 retrieval through the configured backend (Elasticsearch or the
+    local index). Returns the hits, and the facet counts when `facet_size`
+    is set (None otherwise).
+    """
     try:
-        response = es_client.search(
-            index=index_name,
-            size=size,
-            query={
-                "multi_match": {
-                    "query": query,
-                    "fields": "text",
-                    "type": "most_fields",
-                }
-            },
-        )
-        return response["hits"]["hits"]
+        with span("search"):
+            if facet_size:
+                return await search_backend.search_with_facets(
+                    query,
+                    index_name=index_name,
+                    size=size,
+                    source_includes=source_includes,
+                    filters=filters,
+                    facet_size=facet_size,
+                )
+            hits = await search_backend.search(
+                query,
+                index_name=index_name,
+                size=size,
+                source_includes=source_includes,
+                filters=filters,
+            )
+            return hits, None
     except Exception as e:
-        print(f"ERROR: Elasticsearch error during service search: {e}")
+        print(f"ERROR: {search_backend.name} error during service search: {e}")
         raise HTTPException(status_code=500, detail=f"Search service error: {str(e)}")
 
 
-def rerank_with_cross_encoder(
-    query: str, search_results: list, model: CrossEncoder, k: int = 5
+async def perform_search_after(
+    query: str,
+    search_backend: SearchBackend,
+    pit_id: Optional[str],
+    after: Optional[List] = None,
+    index_name: str = "serp-ai",
+    size: int = 10,
+    source_includes: Optional[List[str]] = None,
+    filters: Optional[SearchFilters] = None,
+    exclude_ids: Optional[List[str]] = None,
+    scope: Optional[str] = None,
+) -> Tuple[list, Optional[str]]:
+    """
+    One page of BM25 hits after the `sort` value `after`, read from the
+    point-in-time `pit_id` (opened first when `after` is None, shared with
+    the cursors of the same `scope`). Returns the hits and the point-in-time
+    id for the next page.
+    """
+    try:
+        with span("search"):
+            if after is None:
+                pit_id = await search_backend.open_pit(index_name=index_name, scope=scope)
+            return await search_backend.search_after(
+                query,
+                pit_id,
+                after=after,
+                index_name=index_name,
+                size=size,
+                source_includes=source_includes,
+                filters=filters,
+                exclude_ids=exclude_ids,
+            )
+    except PitExpiredError:
+        # `after` only holds within the point-in-time that produced it.
+        raise HTTPException(
+            status_code=410, detail="The cursor has expired; restart from the first page."
+        )
+    except Exception as e:
+        print(f"ERROR: {search_backend.name} error during search_after: {e}")
+        raise HTTPException(status_code=500, detail=f"Search service error: {str(e)}")
+
+
+def _hybrid_searches(
+    query: str,
+    query_vector: List[float],
+    size: int,
+    num_candidates: int,
+    source_includes: Optional[List[str]] = None,
+    filters: Optional[SearchFilters] = None,
+    facet_size: int = 0,
+) -> List[Dict]:
+    """
+    The `msearch` header/body lines of the BM25 and the kNN search for
+    `query`. The facets are aggregated on the BM25 search, whose match set
+    is the query's.
+    """
+    bm25_search = {
+        "size": size,
+        "query": filtered_query(query, filters),
+        "_source": source_filter(source_includes),
+    }
+    if facet_size:
+        bm25_search["aggregations"] = facet_aggregations(facet_size)
+    knn = {
+        "field": EMBEDDING_FIELD,
+        "query_vector": query_vector,
+        "k": size,
+        "num_candidates": max(num_candidates, size),
+    }
+    if filters:
+        # Applied during the vector search, so all k neighbours pass the filters.
+        knn["filter"] = filters.es_clauses()
+    return [
+        {},
+        bm25_search,
+        {},
+        {"size": size, "knn": knn, "_source": source_filter(source_includes)},
+    ]
+
+
+async def perform_hybrid_search(
+    query: str,
+    es_client: "AsyncElasticsearch",
+    query_embedder: QueryEmbedder,
+    index_name: str = "serp-ai",
+    size: int = 100,
+    num_candidates: int = 100,
+    rank_constant: int = 60,
+    source_includes: Optional[List[str]] = None,
+    filters: Optional[SearchFilters] = None,
+    facet_size: int = 0,
+) -> Tuple[list, Optional[Dict]]:
+    """
+    BM25 and kNN retrieval over the document embeddings, merged with
+    reciprocal rank fusion. Returns the fused hits, and the facet counts
+    when `facet_size` is set (None otherwise).
+
+    Both searches go out in one `msearch` and are fused here, which works on
+    every Elasticsearch license (the server-side RRF retriever does not).
+    """
+    try:
+        with span("embed"):
+            query_vector = await query_embedder.embed(query)
+        searches = _hybrid_searches(
+            query, query_vector, size, num_candidates, source_includes, filters, facet_size
+        )
+        with span("search"):
+            response = await es_client.msearch(index=index_name, searches=searches)
+            result_lists = msearch_hits(response)
+        facets = None
+        if facet_size:
+            facets = parse_facet_aggregations(response["responses"][0]["aggregations"])
+        return reciprocal_rank_fusion(result_lists, size, rank_constant=rank_constant), facets
+    except Exception as e:
+        print(f"ERROR: Elasticsearch error during hybrid search: {e}")
+        raise HTTPException(status_code=500, detail=f"Search service error: {str(e)}")
+
+
+async def perform_hybrid_msearch(
+    queries: List[str],
+    es_client: "AsyncElasticsearch",
+    query_embedder: QueryEmbedder,
+    index_name: str = "serp-ai",
+    size: int = 100,
+    num_candidates: int = 100,
+    rank_constant: int = 60,
+    source_includes: Optional[List[str]] = None,
+) -> List[list]:
+    """`perform_hybrid_search` for a batch: one `encode` call and one `msearch`."""
+    try:
+        with span("embed"):
+            query_vectors = await query_embedder.embed_many(queries)
+        searches = []
+        for query, query_vector in zip(queries, query_vectors):
+            searches.extend(
+                _hybrid_searches(query, query_vector, size, num_candidates, source_includes)
+            )
+        with span("search"):
+            response = await es_client.msearch(index=index_name, searches=searches)
+            result_lists = msearch_hits(response)
+        return [
+            reciprocal_rank_fusion(result_lists[i : i + 2], size, rank_constant=rank_constant)
+            for i in range(0, len(result_lists), 2)
+        ]
+    except Exception as e:
+        print(f"ERROR: Elasticsearch error during hybrid search: {e}")
+        raise HTTPException(status_code=500, detail=f"Search service error: {str(e)}")
+
+
+async def retrieve_candidates(
+    query: str,
+    search_backend: SearchBackend,
+    query_embedder: Optional[QueryEmbedder] = None,
+    index_name: str = "serp-ai",
+    size: int = 100,
+    num_candidates: int = 100,
+    source_includes: Optional[List[str]] = None,
+    filters: Optional[SearchFilters] = None,
 ) -> list:
-    if not search_results:
-        return []
+    """
+    First-stage retrieval: hybrid when a query embedder is configured, BM25
+    otherwise. Hybrid retrieval needs the Elasticsearch backend.
+    """
+    hits, _ = await retrieve_candidates_with_facets(
+        query,
+        search_backend,
+        query_embedder=query_embedder,
+        index_name=index_name,
+        size=size,
+        num_candidates=num_candidates,
+        source_includes=source_includes,
+        filters=filters,
+    )
+    return hits
 
+
+async def retrieve_candidates_with_facets(
+    query: str,
+    search_backend: SearchBackend,
+    query_embedder: Optional[QueryEmbedder] = None,
+    index_name: str = "serp-ai",
+    size: int = 100,
+    num_candidates: int = 100,
+    source_includes: Optional[List[str]] = None,
+    filters: Optional[SearchFilters] = None,
+    facet_size: int = 0,
+) -> Tuple[list, Optional[Dict]]:
+    """
+    `retrieve_candidates`, plus the facet counts of everything matching the
+    query and `filters` when `facet_size` is set, from the same request.
+    """
+    if query_embedder is None:
+        return await perform_elasticsearch_search(
+            query=query,
+            search_backend=search_backend,
+            index_name=index_name,
+            size=size,
+            source_includes=source_includes,
+            filters=filters,
+            facet_size=facet_size,
+        )
+    return await perform_hybrid_search(
+        query=query,
+        es_client=search_backend.client,
+        query_embedder=query_embedder,
+        index_name=index_name,
+        size=size,
+        num_candidates=num_candidates,
+        source_includes=source_includes,
+        filters=filters,
+        facet_size=facet_size,
+    )
+
+
+async def retrieve_candidates_batch(
+    queries: List[str],
+    search_backend: SearchBackend,
+    query_embedder: Optional[QueryEmbedder] = None,
+    index_name: str = "serp-ai",
+    size: int = 100,
+    num_candidates: int = 100,
+    source_includes: Optional[List[str]] = None,
+) -> List[list]:
+    """`retrieve_candidates` for several queries in one backend round trip."""
+    if query_embedder is not None:
+        return await perform_hybrid_msearch(
+            queries,
+            search_backend.client,
+            query_embedder,
+            index_name=index_name,
+            size=size,
+            num_candidates=num_candidates,
+            source_includes=source_includes,
+        )
+    try:
+        with span("search"):
+            return await search_backend.msearch(
+                queries, index_name=index_name, size=size, source_includes=source_includes
+            )
+    except Exception as e:
+        print(f"ERROR: {search_backend.name} error during batch search: {e}")
+        raise HTTPException(status_code=500, detail=f"Search service error: {str(e)}")
+
+
+def _prepare_rerank_pairs(query: str, search_results: list) -> Tuple[list, list]:
+    """Builds the (query, text) pairs for every hit that has rerankable text."""
     sentence_pairs = []
     valid_hits_for_reranking = []
 
@@ -72,62 +430,337 @@ def rerank_with_cross_encoder(
                 f"Warning: Document {hit.get('_id', 'N/A')} missing 'text' field, not a string, or empty. Skipping for reranking."
             )
 
+    return sentence_pairs, valid_hits_for_reranking
+
+
+def _pairs_of(sentence_pairs: list, hits: list, selected: list) -> Tuple[list, list]:
+    """The prepared pairs of `selected`, a subset of the prepared `hits`."""
+    pair_of_hit = {id(hit): pair for pair, hit in zip(sentence_pairs, hits)}
+    return [pair_of_hit[id(hit)] for hit in selected], selected
+
+
+def _apply_rerank_scores(hits: list, scores, k: int) -> list:
+    with span("rerank_sort"):
+        for i, hit in enumerate(hits):
+            hit["cross_encoder_score"] = float(scores[i])
+
+        reranked_results = sorted(
+            hits, key=lambda x: x["cross_encoder_score"], reverse=True
+        )
+        return reranked_results[:k]
+
+
+def _append_pruned(reranked: list, candidates: list, depth: int) -> list:
+    """Fills `reranked` up to `depth` with the unscored `candidates`, in first-stage order."""
+    if len(reranked) >= depth:
+        return reranked
+    kept = {id(hit) for hit in reranked}
+    pruned = [hit for hit in candidates if id(hit) not in kept]
+    return reranked + pruned[: depth - len(reranked)]
+
+
+def _doc_cache_id(hit: Dict) -> Optional[str]:
+    return hit.get("_id") or hit["_source"].get("citekey")
+
+
+def _split_cached_scores(
+    query: str, hits: list, score_cache: Optional[PairScoreCache]
+) -> Tuple[List[Optional[float]], List[int]]:
+    """Returns the cached score per hit (None on a miss) and the indices of the misses."""
+    if score_cache is None:
+        return [None] * len(hits), list(range(len(hits)))
+    scores = score_cache.get_many(
+        query,
+        [_doc_cache_id(hit) for hit in hits],
+        [hit["_source"]["text"] for hit in hits],
+    )
+    missing = [i for i, score in enumerate(scores) if score is None]
+    return scores, missing
+
+
+def _merge_predicted_scores(
+    query: str,
+    hits: list,
+    scores: List[Optional[float]],
+    missing: List[int],
+    predicted,
+    score_cache: Optional[PairScoreCache],
+):
+    for i, score in zip(missing, predicted):
+        scores[i] = float(score)
+    if score_cache is not None:
+        score_cache.put_many(
+            query,
+            [_doc_cache_id(hits[i]) for i in missing],
+            [hits[i]["_source"]["text"] for i in missing],
+            [scores[i] for i in missing],
+        )
+
+
+def rerank_with_cross_encoder(
+    query: str,
+    search_results: list,
+    model: "CrossEncoder",
+    k: int = 5,
+    score_cache: Optional[PairScoreCache] = None,
+) -> list:
+    if not search_results:
+        return []
+
+    sentence_pairs, valid_hits_for_reranking = _prepare_rerank_pairs(
+        query, search_results
+    )
+    if not sentence_pairs:
+        return []
+
+    scores, missing = _split_cached_scores(query, valid_hits_for_reranking, score_cache)
+    if missing:
+        predicted, stages = predict_timer(model).predict(
+            model, [sentence_pairs[i] for i in missing]
+        )
+        for stage, seconds in stages.items():
+            record_stage(f"rerank_{stage}", seconds)
+        _merge_predicted_scores(
+            query, valid_hits_for_reranking, scores, missing, predicted, score_cache
+        )
+    return _apply_rerank_scores(valid_hits_for_reranking, scores, k)
+
+
+async def rerank_with_batcher(
+    query: str,
+    search_results: list,
+    batcher: RerankBatcher,
+    k: int = 5,
+    score_cache: Optional[PairScoreCache] = None,
+) -> list:
+    """
+    Async counterpart of `rerank_with_cross_encoder`. The pairs are scored by
+    the shared `RerankBatcher`, which merges them with pairs from concurrent
+    requests into a single `model.predict` call off the event loop.
+    Pairs already in `score_cache` are not sent to the model.
+    """
+    if not search_results:
+        return []
+
+    sentence_pairs, valid_hits_for_reranking = _prepare_rerank_pairs(
+        query, search_results
+    )
+    return await _rerank_prepared(
+        query, sentence_pairs, valid_hits_for_reranking, batcher, k, score_cache
+    )
+
+
+async def _rerank_prepared(
+    query: str,
+    sentence_pairs: list,
+    valid_hits_for_reranking: list,
+    batcher: RerankBatcher,
+    k: int,
+    score_cache: Optional[PairScoreCache],
+) -> list:
+    if not sentence_pairs:
+        return []
+
+    scores, missing = _split_cached_scores(query, valid_hits_for_reranking, score_cache)
+    if missing:
+        predicted = await batcher.score([sentence_pairs[i] for i in missing])
+        _merge_predicted_scores(
+            query, valid_hits_for_reranking, scores, missing, predicted, score_cache
+        )
+    return _apply_rerank_scores(valid_hits_for_reranking, scores, k)
+
+
+async def rerank_with_cascade(
+    query: str,
+    search_results: list,
+    batcher: RerankBatcher,
+    k: int = 5,
+    score_cache: Optional[PairScoreCache] = None,
+    cascade: Optional[RerankCascade] = None,
+    budget_ms: Optional[float] = None,
+    depth: Optional[int] = None,
+) -> list:
+    """
+    `rerank_with_batcher` behind an early-exit cascade: `cascade` first drops
+    the candidates that cannot plausibly reach the top `k`, optionally
+    within a per-request latency budget, and only the rest are scored by
+    the full cross-encoder.
+
+    With `depth`, up to `depth` hits are returned instead of `k`: the
+    reranked ones, then those the cascade dropped, in first-stage order.
+    A `cascade` that cannot prune is skipped.
+    """
+    depth = max(k, depth or k)
+    if cascade is None or not cascade.prunes(budget_ms) or not search_results:
+        return await rerank_with_batcher(query, search_results, batcher, depth, score_cache)
+
+    sentence_pairs, valid_hits_for_reranking = _prepare_rerank_pairs(
+        query, search_results
+    )
     if not sentence_pairs:
         return []
+    with span("cascade"):
+        selected = await cascade.select(
+            sentence_pairs, valid_hits_for_reranking, batcher, k, budget_ms=budget_ms
+        )
+    reranked = await _rerank_prepared(
+        query,
+        *_pairs_of(sentence_pairs, valid_hits_for_reranking, selected),
+        batcher,
+        depth,
+        score_cache,
+    )
+    return _append_pruned(reranked, valid_hits_for_reranking, depth)
 
-    scores = model.predict(sentence_pairs)
 
-    for i, hit in enumerate(valid_hits_for_reranking):
-        hit["cross_encoder_score"] = float(scores[i])
+async def rerank_batch_with_cascade(
+    queries: List[str],
+    search_results: List[list],
+    batcher: RerankBatcher,
+    k: int = 5,
+    score_cache: Optional[PairScoreCache] = None,
+    cascade: Optional[RerankCascade] = None,
+    depth: Optional[int] = None,
+) -> List[list]:
+    """
+    `rerank_with_cascade` for a batch of queries, with one shared
+    cross-encoder pass.
+
+    The cascade still prunes each query's candidates on its own. The pairs
+    left over from every query are then flattened and sent to the batcher
+    in chunks of its `max_batch_pairs`, so each chunk fills a whole model
+    batch and the chunks run on all rerank threads. Interactive requests
+    queue between the chunks instead of waiting for the whole batch.
 
-    reranked_results = sorted(
-        valid_hits_for_reranking, key=lambda x: x["cross_encoder_score"], reverse=True
+    `depth` is as in `rerank_with_cascade`.
+    """
+    depth = max(k, depth or k)
+    prepared = [
+        _prepare_rerank_pairs(query, hits) for query, hits in zip(queries, search_results)
+    ]
+    candidates = [hits for _, hits in prepared]
+    if cascade is not None and cascade.prunes():
+        with span("cascade"):
+            selected = await asyncio.gather(
+                *(
+                    cascade.select(pairs, hits, batcher, k)
+                    for pairs, hits in prepared
+                    if pairs
+                )
+            )
+        selected_iter = iter(selected)
+        prepared = [
+            _pairs_of(pairs, hits, next(selected_iter)) if pairs else (pairs, hits)
+            for pairs, hits in prepared
+        ]
+
+    flat_pairs = []
+    lookups = []
+    for query, (pairs, hits) in zip(queries, prepared):
+        scores, missing = _split_cached_scores(query, hits, score_cache)
+        lookups.append((scores, missing, len(flat_pairs)))
+        flat_pairs.extend(pairs[i] for i in missing)
+
+    chunk_size = max(1, batcher.max_batch_pairs)
+    chunks = await asyncio.gather(
+        *(
+            batcher.score(flat_pairs[i : i + chunk_size])
+            for i in range(0, len(flat_pairs), chunk_size)
+        )
     )
-    return reranked_results[:k]
+    predicted = [score for chunk in chunks for score in chunk]
+
+    reranked = []
+    for query, (pairs, hits), (scores, missing, offset), valid_hits in zip(
+        queries, prepared, lookups, candidates
+    ):
+        if not hits:
+            reranked.append([])
+            continue
+        _merge_predicted_scores(
+            query,
+            hits,
+            scores,
+            missing,
+            predicted[offset : offset + len(missing)],
+            score_cache,
+        )
+        reranked.append(
+            _append_pruned(_apply_rerank_scores(hits, scores, depth), valid_hits, depth)
+        )
+    return reranked
 
 
 async def stream_rag_response(
     query: str,
     documents: List[Dict],
-    together_client: Together,
+    together_client: AsyncTogether,
     model_name: str,
     max_context_tokens: int = 3000,
+    summary_cache: Optional[SummaryCache] = None,
+    token_counter: Optional[TokenCounter] = None,
 ) -> AsyncGenerator[str, None]:
     """
     Generates a summary from TogetherAI based on retrieved documents.
     Streams the response token by token.
     The 'query' parameter here is the original user query that fetched these documents.
+
+    The upstream stream is consumed with the async client, so waiting for the
+    next chunk never blocks the event loop. If the consumer stops early (e.g.
+    the HTTP client disconnects and the response task is cancelled), the
+    upstream connection is closed so the model stops generating.
+
+    With a `summary_cache`, identical requests (same model, prompt, normalized
+    query and documents) are served from the cache or attach to a generation
+    that is already running. Failed generations are never cached.
+
+    The context is packed by rerank score up to `max_context_tokens`, counted
+    with `token_counter` (estimated counts when it is not given).
     """
     if not documents:
         yield "No documents were provided to summarize."
         return
 
-    context_parts = []
-    current_token_count = 0
+    with span("summary_context"):
+        context_str = pack_context(
+            documents, token_counter or _ESTIMATED_TOKEN_COUNTER, max_context_tokens
+        )
+    if not context_str:
+        yield "No valid content found in the provided documents to summarize."
+        return
 
-    for i, doc in enumerate(documents):
-        doc_text = doc["_source"].get("text", "")
-        if not isinstance(doc_text, str) or not doc_text.strip():
-            continue
+    messages = _build_summary_messages(query, context_str)
 
-        doc_tokens = doc_text.split()
-        if current_token_count + len(doc_tokens) > max_context_tokens:
-            remaining_tokens = max_context_tokens - current_token_count
-            if remaining_tokens > 20:
-                context_parts.append(
-                    f"Document {i+1} (truncated): {' '.join(doc_tokens[:remaining_tokens])}"
-                )
-            break
-        context_parts.append(f"Document {i+1}:\n{doc_text}")
-        current_token_count += len(doc_tokens)
+    def produce():
+        return _stream_llm_completion(together_client, model_name, messages)
 
-    if not context_parts:
-        yield "No valid content found in the provided documents to summarize."
-        return
+    doc_ids = [_doc_cache_id(doc) for doc in documents]
+    if summary_cache is not None and all(doc_ids):
+        key = summary_cache.make_key(
+            model_name,
+            query,
+            doc_ids,
+            SUMMARY_PROMPT_VERSION,
+            # Documents can come from the request body, so the key also covers
+            # the text actually sent to the model.
+            hashlib.sha256(context_str.encode("utf-8")).hexdigest(),
+        )
+        source = summary_cache.stream(key, produce)
+    else:
+        source = produce()
 
-    context_str = "\n\n---\n\n".join(context_parts)
+    try:
+        async for content in source:
+            yield content
+    except Exception as e:
+        print(f"ERROR: TogetherAI API error during summarization: {e}")
+        yield f"Error communicating with the AI model for summarization: {str(e)}"
+    finally:
+        await source.aclose()
 
-    messages = [
+
+def _build_summary_messages(query: str, context_str: str) -> List[Dict]:
+    return [
         {
             "role": "system",
             "content": "You are an expert summarization AI. Your task is to read the following documents "
@@ -142,18 +775,54 @@ async def stream_rag_response(
         },
     ]
 
+
+async def _stream_llm_completion(
+    together_client: AsyncTogether, model_name: str, messages: List[Dict]
+) -> AsyncGenerator[str, None]:
+    """
+    Yields completion text as it arrives; errors propagate to the caller.
+
+    Records the time to the first chunk and the chunk rate after it, one
+    chunk being about one token. Cached summaries do not reach this point,
+    so they do not skew either.
+    """
+    response_stream = None
+    start = time.perf_counter()
+    first_chunk_at = None
+    chunks = 0
     try:
-        response_stream = together_client.chat.completions.create(
+        response_stream = await together_client.chat.completions.create(
             model=model_name,
             messages=messages,
             stream=True,
             max_tokens=5000,
         )
-        for chunk in response_stream:
+        async for chunk in response_stream:
             if hasattr(chunk, "choices") and chunk.choices:
                 content = chunk.choices[0].delta.content
                 if content:
+                    if first_chunk_at is None:
+                        first_chunk_at = time.perf_counter()
+                        LLM_TIME_TO_FIRST_TOKEN.observe(first_chunk_at - start)
+                    chunks += 1
                     yield content
+        generation_s = time.perf_counter() - first_chunk_at if first_chunk_at else 0.0
+        if chunks > 1 and generation_s > 0:
+            LLM_TOKENS_PER_SECOND.observe((chunks - 1) / generation_s)
+    finally:
+        if response_stream is not None:
+            await _close_llm_stream(response_stream)
+
+
+async def _close_llm_stream(response_stream):
+    """Closes an upstream completion stream; a no-op if it already finished."""
+    try:
+        close = getattr(response_stream, "aclose", None) or getattr(
+            response_stream, "close", None
+        )
+        if close is not None:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
     except Exception as e:
-        print(f"ERROR: TogetherAI API error during summarization: {e}")
-        yield f"Error communicating with the AI model for summarization: {str(e)}"
+        print(f"Warning: Failed to close TogetherAI stream: {e}")
@@ -0,0 +1,250 @@
+import bisect
+import json
+import mmap
+import os
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Most suggestions one request can ask for; also how many are precomputed
+# per heavy prefix.
+MAX_SUGGESTIONS = 20
+# Prefixes matching more keys than this get their suggestions precomputed,
+# so a lookup never ranks more than this many keys.
+HEAVY_PREFIX_KEYS = 1024
+# Keys are cut here; longer prefixes only match the first characters.
+MAX_KEY_CHARS = 64
+# Completions also start at later words ("neural" finds "Graph neural
+# networks"), except at these.
+STOP_WORDS = {"a", "an", "and", "at", "by", "for", "from", "in", "of", "on", "the", "to", "with"}
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_suggestion(text: str) -> str:
+    """Lowercase, accents stripped and punctuation collapsed to single spaces."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", stripped.lower()).strip()
+
+
+def _display_text(text: str) -> str:
+    # BibTeX protects capitals with braces, e.g. "{BERT}".
+    return re.sub(r"\s+", " ", text.replace("{", "").replace("}", "")).strip()
+
+
+def _word_starts(normalized: str) -> Iterable[Tuple[int, str]]:
+    """(word position, key) for the whole string and every later non-stop-word start."""
+    words = normalized.split(" ")
+    for position, word in enumerate(words):
+        if position and word in STOP_WORDS:
+            continue
+        yield position, " ".join(words[position:])[:MAX_KEY_CHARS]
+
+
+def build_suggest_index(documents: Iterable[Dict], output_dir: str) -> Dict:
+    """
+    Writes the title and author prefix index of `documents` (parsed
+    `_source` dicts) to `output_dir`.
+
+    Every distinct title and author is an entry, weighted by the number of
+    documents it appears in. Each entry is reachable through the keys
+    starting at each of its words. The keys are stored sorted and
+    concatenated with an offsets array, so a prefix is a binary search over
+    the memory-mapped file, like walking a trie, without a Python object per
+    key. For prefixes shared by more than `HEAVY_PREFIX_KEYS` keys the top
+    entries are precomputed.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    entry_ids: Dict[Tuple[str, str], int] = {}
+    entries: List[List] = []
+    for source in documents:
+        values = [("title", source.get("title"))]
+        values.extend(("author", name) for name in source.get("authors") or [])
+        for kind, value in values:
+            if not isinstance(value, str) or not value.strip():
+                continue
+            text = _display_text(value)
+            entry_id = entry_ids.setdefault((kind, text.lower()), len(entries))
+            if entry_id == len(entries):
+                entries.append([kind, text, 0])
+            entries[entry_id][2] += 1
+
+    keys = {}
+    for entry_id, (kind, text, count) in enumerate(entries):
+        for position, key in _word_starts(normalize_suggestion(text)):
+            if not key:
+                continue
+            # Matches at the first word rank above later-word matches of equal weight.
+            score = count + (0.5 if position == 0 else 0.0)
+            row = (key.encode("utf-8"), entry_id)
+            keys[row] = max(score, keys.get(row, 0.0))
+    rows = sorted(keys)
+
+    key_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+    with open(os.path.join(output_dir, "keys.bin"), "wb") as f:
+        for i, (key, _) in enumerate(rows):
+            f.write(key)
+            key_offsets[i + 1] = key_offsets[i] + len(key)
+    key_entries = np.fromiter((entry_id for _, entry_id in rows), dtype=np.uint32, count=len(rows))
+    key_scores = np.fromiter((keys[row] for row in rows), dtype=np.float32, count=len(rows))
+
+    entry_offsets = [0]
+    with open(os.path.join(output_dir, "entries.bin"), "wb") as f:
+        for entry in entries:
+            record = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+            f.write(record)
+            entry_offsets.append(entry_offsets[-1] + len(record))
+
+    heavy = {}
+    # Only the keys of a heavy prefix can share a longer heavy prefix.
+    groups = [range(len(rows))]
+    for length in range(1, MAX_KEY_CHARS + 1):
+        if not groups:
+            break
+        large_groups = []
+        for group in groups:
+            by_prefix = defaultdict(list)
+            for i in group:
+                key = rows[i][0]
+                if len(key) >= length:
+                    by_prefix[key[:length]].append(i)
+            for prefix, members in by_prefix.items():
+                if len(members) <= HEAVY_PREFIX_KEYS:
+                    continue
+                large_groups.append(members)
+                try:
+                    prefix_text = prefix.decode("utf-8")
+                except UnicodeDecodeError:
+                    # Cuts a character in two; typed prefixes never look like this.
+                    continue
+                members = np.asarray(members)
+                heavy[prefix_text] = _top_entries(
+                    key_entries[members], key_scores[members], MAX_SUGGESTIONS
+                )
+        groups = large_groups
+
+    arrays = {
+        "key_offsets": key_offsets,
+        "key_entries": key_entries,
+        "key_scores": key_scores,
+        "entry_offsets": np.asarray(entry_offsets, dtype=np.int64),
+    }
+    for name, array in arrays.items():
+        np.save(os.path.join(output_dir, f"{name}.npy"), array)
+    with open(os.path.join(output_dir, "heavy.json"), "w", encoding="utf-8") as f:
+        json.dump(heavy, f, ensure_ascii=False)
+
+    meta = {
+        "num_entries": len(entries),
+        "num_keys": len(rows),
+        "num_heavy_prefixes": len(heavy),
+    }
+    # Written last: an index directory without meta.json is incomplete.
+    with open(os.path.join(output_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def _top_entries(entry_ids: np.ndarray, scores: np.ndarray, size: int) -> List[int]:
+    """The distinct entries of the best-scored keys, best first; ties keep key order."""
+    top = []
+    for i in np.argsort(-scores, kind="stable"):
+        entry_id = int(entry_ids[i])
+        if entry_id not in top:
+            top.append(entry_id)
+            if len(top) == size:
+                break
+    return top
+
+
+class _SortedKeys:
+    """The sorted keys as a sequence of bytes, for `bisect`."""
+
+    def __init__(self, data, offsets: np.ndarray):
+        self._data = data
+        self._offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i: int) -> bytes:
+        return self._data[self._offsets[i] : self._offsets[i + 1]]
+
+
+class SuggestIndex:
+    """
+    Title and author completions from an index written by
+    `build_suggest_index`. The files are memory-mapped, and a lookup is a
+    binary search plus ranking at most `HEAVY_PREFIX_KEYS` keys, so it stays
+    well under a millisecond.
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        with open(os.path.join(index_dir, "heavy.json"), "r", encoding="utf-8") as f:
+            self.heavy: Dict[str, List[int]] = json.load(f)
+
+        def load(name: str) -> np.ndarray:
+            return np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+
+        self.key_offsets = load("key_offsets")
+        self.key_entries = load("key_entries")
+        self.key_scores = load("key_scores")
+        self.entry_offsets = load("entry_offsets")
+
+        self._files = []
+        self._maps = {}
+        for name in ("keys", "entries"):
+            f = open(os.path.join(index_dir, f"{name}.bin"), "rb")
+            self._files.append(f)
+            self._maps[name] = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                if os.fstat(f.fileno()).st_size
+                else b""
+            )
+        self._keys = _SortedKeys(self._maps["keys"], self.key_offsets)
+        self.stats = {"lookups": 0, "heavy_lookups": 0}
+
+    def _entry(self, entry_id: int) -> Dict:
+        start, end = self.entry_offsets[entry_id], self.entry_offsets[entry_id + 1]
+        kind, text, count = json.loads(self._maps["entries"][start:end])
+        return {"text": text, "type": kind, "count": count}
+
+    def suggest(self, prefix: str, size: int = 10) -> List[Dict]:
+        """Up to `size` titles and authors with a word starting with `prefix`, best first."""
+        key = normalize_suggestion(prefix)[:MAX_KEY_CHARS]
+        if not key:
+            return []
+        self.stats["lookups"] += 1
+        size = min(size, MAX_SUGGESTIONS)
+
+        entry_ids = self.heavy.get(key)
+        if entry_ids is not None:
+            self.stats["heavy_lookups"] += 1
+        else:
+            key_bytes = key.encode("utf-8")
+            start = bisect.bisect_left(self._keys, key_bytes)
+            # 0xff never occurs in UTF-8, so this is just past the last key with the prefix.
+            end = bisect.bisect_left(self._keys, key_bytes + b"\xff", lo=start)
+            # Larger ranges are all in the heavy table; this only bounds the work.
+            end = min(end, start + HEAVY_PREFIX_KEYS)
+            entry_ids = _top_entries(
+                self.key_entries[start:end], self.key_scores[start:end], size
+            )
+        return [self._entry(entry_id) for entry_id in entry_ids[:size]]
+
+    def get_stats(self) -> Dict:
+        return {"index_dir": self.index_dir, **self.meta, **self.stats}
+
+    def close(self):
+        for data in self._maps.values():
+            if isinstance(data, mmap.mmap):
+                data.close()
+        for f in self._files:
+            f.close()
@@ -0,0 +1,295 @@
+import asyncio
+import contextvars
+import os
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Stage latencies range from sub-millisecond (sorting) to seconds (LLM).
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+TOKEN_RATE_BUCKETS = (5, 10, 25, 50, 100, 200, 400, 800)
+
+
+class Histogram:
+    """A Prometheus histogram with labels, rendered in the text exposition format."""
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+        label_names: Sequence[str] = (),
+    ):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            # Per-bucket counts, then sum and count.
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            labels = [f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, key)]
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                bucket_labels = _labels(labels + ['le="%g"' % bound])
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative:g}")
+            bucket_labels = _labels(labels + ['le="+Inf"'])
+            lines.append(f"{self.name}_bucket{bucket_labels} {values[-1]:g}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {values[-2]}")
+            lines.append(f"{self.name}_count{_labels(labels)} {values[-1]:g}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: List[str]) -> str:
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+STAGE_SECONDS = Histogram(
+    "serp_stage_duration_seconds",
+    "Time spent in each stage of a request.",
+    label_names=("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "serp_request_duration_seconds",
+    "HTTP request duration, until the last body chunk was sent.",
+    label_names=("method", "route", "status"),
+)
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "serp_llm_time_to_first_token_seconds",
+    "Time from the start of a summary until its first chunk.",
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "serp_llm_tokens_per_second",
+    "Summary chunks (about one token each) per second after the first one.",
+    buckets=TOKEN_RATE_BUCKETS,
+)
+HISTOGRAMS = [STAGE_SECONDS, REQUEST_SECONDS, LLM_TIME_TO_FIRST_TOKEN, LLM_TOKENS_PER_SECOND]
+
+
+class RequestTimings:
+    """Seconds per stage for one request, summed over repeated stages."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self, total_seconds: float) -> str:
+        """The `Server-Timing` header value, in milliseconds."""
+        entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items()]
+        entries.append(f"total;dur={total_seconds * 1000:.2f}")
+        return ", ".join(entries)
+
+
+_request_timings: contextvars.ContextVar[Optional[RequestTimings]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    """The timings of the request being served, if any (tasks it spawns included)."""
+    return _request_timings.get()
+
+
+def record_stage(stage: str, seconds: float, request: bool = True):
+    """Adds a stage duration to the histogram and, with `request`, to the current request."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if request and timings is not None:
+        timings.add(stage, seconds)
+
+
+@contextmanager
+def span(stage: str):
+    """Times the enclosed block as `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start)
+
+
+class PredictTimer:
+    """
+    Splits `CrossEncoder.predict` time into model forward passes and the
+    rest, which is tokenization and collation.
+
+    The forward time comes from hooks on the underlying torch module. They
+    accumulate per thread, since several rerank threads predict at once.
+    Models without torch hooks (ONNX Runtime) only report the total.
+    """
+
+    def __init__(self, model):
+        # No reference to `model` itself, so `predict_timer` can key on it weakly.
+        self._local = threading.local()
+        module = getattr(model, "model", None)
+        self.splits_forward = hasattr(module, "register_forward_pre_hook")
+        if self.splits_forward:
+            module.register_forward_pre_hook(self._forward_started)
+            module.register_forward_hook(self._forward_finished)
+
+    def _forward_started(self, module, args):
+        self._local.started = time.perf_counter()
+
+    def _forward_finished(self, module, args, output):
+        # Calls that bypass `predict` (e.g. the warm-up) are not timed.
+        forward = getattr(self._local, "forward", None)
+        if forward is not None:
+            self._local.forward = forward + time.perf_counter() - self._local.started
+
+    def predict(self, model, pairs: List[List[str]]) -> Tuple[object, Dict[str, float]]:
+        """Scores `pairs` with `model`; returns the scores and the seconds per stage."""
+        self._local.forward = 0.0
+        start = time.perf_counter()
+        try:
+            scores = model.predict(pairs)
+        finally:
+            forward = self._local.forward
+            self._local.forward = None
+        total = time.perf_counter() - start
+        stages = {"predict": total}
+        if self.splits_forward:
+            stages["forward"] = forward
+            stages["tokenize"] = max(0.0, total - forward)
+        return scores, stages
+
+
+_predict_timers: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_predict_timers_lock = threading.Lock()
+
+
+def predict_timer(model) -> PredictTimer:
+    """The `PredictTimer` of `model`, so its hooks are only registered once."""
+    with _predict_timers_lock:
+        timer = _predict_timers.get(model)
+        if timer is None:
+            timer = _predict_timers[model] = PredictTimer(model)
+        return timer
+
+
+class TimingMiddleware:
+    """
+    ASGI middleware that times every HTTP request.
+
+    Stages recorded with `span`/`record_stage` while serving the request are
+    sent in a `Server-Timing` header, so they show up in the browser's
+    network panel; streamed responses only carry the stages finished before
+    the first byte. Request durations go to `serp_request_duration_seconds`.
+
+    With `profiler_dir`, a request sent with an `X-Profile: 1` header is run
+    under the pyinstrument sampling profiler, one request at a time, and the
+    HTML report is rendered and written to that directory off the event loop.
+    """
+
+    def __init__(self, app, profiler_dir: Optional[str] = None):
+        self.app = app
+        self.profiler_dir = profiler_dir
+        self._profiler_class = None
+        self._profiling = False
+        if profiler_dir:
+            try:
+                from pyinstrument import Profiler
+
+                self._profiler_class = Profiler
+                os.makedirs(profiler_dir, exist_ok=True)
+            except ImportError:
+                print(
+                    "Warning: Request profiling needs the 'pyinstrument' package "
+                    '(pip install -e ".[profiling]"); it is disabled.'
+                )
+
+    def _wants_profile(self, scope) -> bool:
+        # Requests arriving while another one is profiled run unprofiled.
+        if self._profiler_class is None or self._profiling:
+            return False
+        return (b"x-profile", b"1") in scope.get("headers", [])
+
+    def _write_profile(self, profiler, scope, route: str):
+        name = re.sub(r"[^A-Za-z0-9_-]+", "_", route).strip("_") or "root"
+        path = os.path.join(self.profiler_dir, f"{int(time.time() * 1000)}-{name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+        print(f"Request profile for {scope['method']} {scope['path']} written to {path}")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        status = 500
+        profiler = None
+        if self._wants_profile(scope):
+            profiler = self._profiler_class(async_mode="enabled")
+            profiler.start()
+            self._profiling = True
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = timings.server_timing(time.perf_counter() - start)
+                message = {
+                    **message,
+                    "headers": list(message.get("headers", []))
+                    + [(b"server-timing", header.encode("latin-1"))],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            # The route template, not the path: paths embed the query text.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=route,
+                status=str(status),
+            )
+            if profiler is not None:
+                profiler.stop()
+                try:
+                    await asyncio.to_thread(self._write_profile, profiler, scope, route)
+                finally:
+                    self._profiling = False
+
+
+def render_metrics(gauges: Optional[Dict[str, float]] = None) -> str:
+    """All histograms plus `gauges`, in the Prometheus text exposition format."""
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for name, value in (gauges or {}).items():
+        kind = "counter" if name.endswith("_total") else "gauge"
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
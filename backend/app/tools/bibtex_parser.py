@@ -6,8 +6,11 @@ from bibtexparser.customization import (
     type as bibtex_type,
 )
 import json
+import re
 from argparse import ArgumentParser
-from typing import List, Dict, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from typing import Iterable, Iterator, List, Dict, Any, Optional
 from tqdm.auto import tqdm
 
 
@@ -112,12 +115,34 @@ class Parser:
         # Remove fields with None values to keep documents clean
         return {k: v for k, v in doc_source.items() if v is not None}
 
-    def parse_file(self, filepath: str) -> List[Dict[str, Any]]:
+    def _parse_string(
+        self, bibtex_string: str, show_progress: bool = True
+    ) -> List[Dict[str, Any]]:
+        """Parses BibTeX content and transforms every entry that has a citekey."""
+        bib_database = bibtexparser.loads(bibtex_string, parser=self._parser)
+
+        elasticsearch_docs = []
+        entries = bib_database.entries
+        if show_progress:
+            entries = tqdm(entries, desc="Transforming BibTeX entries")
+        for entry in entries:
+            transformed_entry = self._transform_entry(entry)
+            if transformed_entry.get("citekey"):
+                elasticsearch_docs.append(transformed_entry)
+            else:
+                print(f"Warning: Skipping entry without a citekey")
+
+        return elasticsearch_docs
+
+    def parse_file(self, filepath: str, workers: int = 1) -> List[Dict[str, Any]]:
         """
         Parses a BibTeX file and returns a list of dictionaries.
 
         Args:
             filepath: Path to the BibTeX file.
+            workers: Number of processes to parse with. Above 1, the file is split
+                at top-level entry boundaries and the shards are parsed in a
+                process pool; the output is identical and in the same order.
 
         Returns:
             A list of dictionaries, where each dictionary represents a BibTeX entry.
@@ -135,22 +160,67 @@ class Parser:
 
         try:
             print(f"Parsing BibTeX content from {filepath}...")
-            bib_database = bibtexparser.loads(bibtex_string, parser=self._parser)
-            print(f"Parsed {len(bib_database.entries)} entries.")
+            if workers > 1:
+                elasticsearch_docs = self._parse_sharded(bibtex_string, workers)
+            else:
+                elasticsearch_docs = self._parse_string(bibtex_string)
+            print(f"Parsed {len(elasticsearch_docs)} entries.")
         except Exception as e:
             print(f"Error parsing BibTeX content from {filepath}: {e}")
             return []
 
-        elasticsearch_docs = []
-        for entry in tqdm(bib_database.entries, desc="Transforming BibTeX entries"):
-            transformed_entry = self._transform_entry(entry)
-            if transformed_entry.get("citekey"):
-                elasticsearch_docs.append(transformed_entry)
-            else:
-                print(f"Warning: Skipping entry without a citekey")
+        return elasticsearch_docs
+
+    def iter_parse_file(
+        self,
+        filepath: str,
+        workers: int = 1,
+        shard_chars: int = 4 * 1024 * 1024,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily parses a BibTeX file shard by shard, yielding transformed entries
+        in file order. Only about `shard_chars` of input per worker is held in
+        memory at a time, so arbitrarily large files can be streamed.
+        """
+        with open(filepath, "r", encoding="utf-8") as bibtex_file:
+            shards = iter_bibtex_shards(bibtex_file, shard_chars)
+            if workers <= 1:
+                for shard in shards:
+                    yield from _parse_shard(shard)
+                return
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                in_flight = deque()
+                for shard in shards:
+                    in_flight.append(executor.submit(_parse_shard, shard))
+                    # Bound the number of parsed-but-unconsumed shards.
+                    if len(in_flight) >= workers * 2:
+                        yield from in_flight.popleft().result()
+                while in_flight:
+                    yield from in_flight.popleft().result()
 
+    def _parse_sharded(self, bibtex_string: str, workers: int) -> List[Dict[str, Any]]:
+        # A few shards per worker keeps the pool busy when entry sizes vary.
+        shards = split_bibtex_shards(bibtex_string, num_shards=workers * 4)
+        elasticsearch_docs = []
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for shard_docs in tqdm(
+                executor.map(_parse_shard, shards),
+                total=len(shards),
+                desc=f"Parsing BibTeX shards ({workers} workers)",
+            ):
+                elasticsearch_docs.extend(shard_docs)
         return elasticsearch_docs
 
+    @staticmethod
+    def bulk_action_for(doc_source: Dict[str, Any], index_name: str) -> Dict[str, Any]:
+        """Builds the bulk API action line for a parsed document."""
+        action = {"index": {"_index": index_name}}
+        # Use citekey as the document ID if it's unique and suitable
+        if "citekey" in doc_source and doc_source["citekey"]:
+            action["index"]["_id"] = doc_source["citekey"]
+        return action
+
     def generate_ndjson_for_bulk_api(
         self,
         documents: List[Dict[str, Any]],
@@ -170,11 +240,7 @@ class Parser:
         """
         ndjson_lines = []
         for doc_source in tqdm(documents, desc="Generating NDJSON lines"):
-            action = {"index": {"_index": index_name}}
-            # Use citekey as the document ID if it's unique and suitable
-            if "citekey" in doc_source and doc_source["citekey"]:
-                action["index"]["_id"] = doc_source["citekey"]
-
+            action = self.bulk_action_for(doc_source, index_name)
             ndjson_lines.append(json.dumps(action))
             ndjson_lines.append(json.dumps(doc_source))
 
@@ -194,6 +260,60 @@ class Parser:
         return ndjson_lines
 
 
+def _parse_shard(shard: str) -> List[Dict[str, Any]]:
+    # BibTexParser accumulates entries across calls, so each shard gets its own.
+    return Parser()._parse_string(shard, show_progress=False)
+
+
+_STRING_BLOCK = re.compile(r"\s*@\s*string\s*[{(]", re.IGNORECASE)
+
+
+def iter_bibtex_shards(lines: Iterable[str], shard_chars: int) -> Iterator[str]:
+    """
+    Groups BibTeX lines into shards of about `shard_chars` characters, cutting
+    only at top-level `@entry{` boundaries and preserving entry order. A block
+    starts at a line beginning with `@` while no brace is open. `@string`
+    macro definitions seen so far are copied to the front of every later
+    shard so each one can be parsed on its own.
+    """
+    macros: List[str] = []
+    shard: List[str] = []
+    shard_size = 0
+
+    def blocks() -> Iterator[str]:
+        current: List[str] = []
+        depth = 0
+        for line in lines:
+            if depth <= 0 and line.lstrip().startswith("@") and current:
+                yield "".join(current)
+                current = []
+            current.append(line)
+            depth += line.count("{") - line.count("}")
+        if current:
+            yield "".join(current)
+
+    for block in blocks():
+        if _STRING_BLOCK.match(block):
+            macros.append(block)
+            continue
+        shard.append(block)
+        shard_size += len(block)
+        if shard_size >= shard_chars:
+            yield "".join(macros) + "".join(shard)
+            shard = []
+            shard_size = 0
+    if shard:
+        yield "".join(macros) + "".join(shard)
+
+
+def split_bibtex_shards(bibtex_string: str, num_shards: int) -> List[str]:
+    """Splits BibTeX content into about `num_shards` shards of similar size."""
+    shard_chars = max(1, len(bibtex_string) // max(1, num_shards))
+    return list(
+        iter_bibtex_shards(bibtex_string.splitlines(keepends=True), shard_chars)
+    )
+
+
 if __name__ == "__main__":
 
     argparse = ArgumentParser()
@@ -201,10 +321,16 @@ if __name__ == "__main__":
         "--bib_path", required=True, help="Path to the input BibTeX file."
     )
     argparse.add_argument("--output_path", help="Path to the output NDJSON file.")
+    argparse.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes used to parse the BibTeX file.",
+    )
     args = argparse.parse_args()
 
     bib_parser = Parser()
-    parsed_docs = bib_parser.parse_file(args.bib_path)
+    parsed_docs = bib_parser.parse_file(args.bib_path, workers=args.workers)
 
     if parsed_docs:
         bib_parser.generate_ndjson_for_bulk_api(
@@ -0,0 +1,33 @@
+import time
+from argparse import ArgumentParser
+
+from app.services.local_search import build_local_index
+from app.tools.ingest import ESIngest, IngestProgress
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Build the in-process BM25 index used by SEARCH_BACKEND=local from a bulk NDJSON file."
+    )
+    argparse.add_argument(
+        "--ndjson",
+        required=True,
+        help="NDJSON file from bibtex_parser, optionally gzip (.gz) or zstd (.zst) compressed.",
+    )
+    argparse.add_argument("--output_dir", default="local_index")
+    argparse.add_argument("--index_name", default="serp-ai")
+    args = argparse.parse_args()
+
+    progress = IngestProgress()
+    documents = (
+        (action["_id"], action["_source"])
+        for action in ESIngest().iter_ndjson_actions(args.ndjson, progress=progress)
+        if action.get("_id")
+    )
+    start = time.perf_counter()
+    meta = build_local_index(documents, args.output_dir, index_name=args.index_name)
+    print(
+        f"Indexed {meta['num_docs']} documents and {meta['num_terms']} terms into "
+        f"{args.output_dir} in {time.perf_counter() - start:.1f}s."
+    )
@@ -0,0 +1,31 @@
+import time
+from argparse import ArgumentParser
+
+from app.services.suggest import build_suggest_index
+from app.tools.ingest import ESIngest, IngestProgress
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Build the title/author prefix index used by /suggest from a bulk NDJSON file."
+    )
+    argparse.add_argument(
+        "--ndjson",
+        required=True,
+        help="NDJSON file from bibtex_parser, optionally gzip (.gz) or zstd (.zst) compressed.",
+    )
+    argparse.add_argument("--output_dir", default="suggest_index")
+    args = argparse.parse_args()
+
+    progress = IngestProgress()
+    documents = (
+        action["_source"]
+        for action in ESIngest().iter_ndjson_actions(args.ndjson, progress=progress)
+    )
+    start = time.perf_counter()
+    meta = build_suggest_index(documents, args.output_dir)
+    print(
+        f"Indexed {meta['num_entries']} titles and authors under {meta['num_keys']} keys into "
+        f"{args.output_dir} in {time.perf_counter() - start:.1f}s."
+    )
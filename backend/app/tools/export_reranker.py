@@ -0,0 +1,59 @@
+import os
+from argparse import ArgumentParser
+
+from sentence_transformers import CrossEncoder, export_dynamic_quantized_onnx_model
+from dotenv import load_dotenv
+
+from app.services.reranker import DEFAULT_QUANTIZATION_CONFIG, quantized_onnx_file_name
+
+load_dotenv()
+
+
+def export_reranker(
+    model_name: str,
+    output_dir: str,
+    quantization_config: str = DEFAULT_QUANTIZATION_CONFIG,
+):
+    """
+    Exports the cross-encoder to ONNX and writes a dynamically quantized int8
+    copy next to it, so the API can load either without converting at startup.
+    """
+    print(f"Exporting {model_name} to ONNX...")
+    model = CrossEncoder(model_name, backend="onnx")
+    model.save_pretrained(output_dir)
+    print(f"ONNX model written to: {os.path.join(output_dir, 'onnx', 'model.onnx')}")
+
+    print(f"Quantizing to int8 with the '{quantization_config}' configuration...")
+    export_dynamic_quantized_onnx_model(
+        model,
+        quantization_config=quantization_config,
+        model_name_or_path=output_dir,
+    )
+    print(
+        "Quantized model written to: "
+        f"{os.path.join(output_dir, quantized_onnx_file_name(quantization_config))}"
+    )
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser()
+    argparse.add_argument(
+        "--model",
+        default=os.environ.get(
+            "CROSS_ENCODER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+        ),
+        help="Hugging Face name or local path of the cross-encoder.",
+    )
+    argparse.add_argument(
+        "--output_dir", required=True, help="Directory for the exported models."
+    )
+    argparse.add_argument(
+        "--quantization_config",
+        default=DEFAULT_QUANTIZATION_CONFIG,
+        choices=["arm64", "avx2", "avx512", "avx512_vnni"],
+        help="Target CPU instruction set for int8 quantization.",
+    )
+    args = argparse.parse_args()
+
+    export_reranker(args.model, args.output_dir, args.quantization_config)
@@ -1,13 +1,19 @@
 import json
 import base64
+import gzip
+import io
 import re
 import os
+import time
 
 from argparse import ArgumentParser
-from typing import List, Dict
+from typing import IO, Callable, Iterable, Iterator, List, Dict, Optional
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import parallel_bulk, streaming_bulk
 from dotenv import load_dotenv
+from app.services.cache import build_cache_backend
+from app.services.embeddings import EMBEDDING_FIELD, EmbeddingEncoder
+from app.tools.manifest import IndexManifest, content_hash
 
 load_dotenv()
 
@@ -17,27 +23,62 @@ class ESIngest:
     Ingests document data into Elasticsearch index.
     """
 
-    def __init__(self):
+    def __init__(self, on_index_change: Optional[Callable[[str], None]] = None):
         self.client = None  # Initiate the client
+        # Called with the index name whenever its contents change, e.g. to
+        # invalidate the API's search result cache.
+        self.on_index_change = on_index_change
 
-    def ndjson_to_ls(self, ndjson_filepath: str):
-        """Convert document information in NDJSON to ingestable list."""
-        results = []
+    def notify_index_change(self, index_name: str):
+        if self.on_index_change is None:
+            return
+        try:
+            self.on_index_change(index_name)
+        except Exception as e:
+            print(f"Warning: Index change hook failed for {index_name}: {e}")
+
+    @staticmethod
+    def open_ndjson(ndjson_filepath: str) -> IO[str]:
+        """Open a plain, gzip (.gz) or zstd (.zst) compressed NDJSON file as text."""
+        if ndjson_filepath.endswith(".gz"):
+            return gzip.open(ndjson_filepath, "rt", encoding="utf-8")
+        if ndjson_filepath.endswith(".zst"):
+            try:
+                import zstandard
+            except ImportError as e:
+                raise ImportError(
+                    "Reading .zst files requires the 'zstandard' package (pip install zstandard)."
+                ) from e
+            raw = open(ndjson_filepath, "rb")
+            reader = zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+            return io.TextIOWrapper(reader, encoding="utf-8")
+        return open(ndjson_filepath, "r", encoding="utf-8")
 
-        with open(ndjson_filepath, "r") as file:
-            doc = []
+    def iter_ndjson_actions(
+        self, ndjson_filepath: str, progress: Optional["IngestProgress"] = None
+    ) -> Iterator[Dict]:
+        """Lazily yield bulk actions from an NDJSON file of action/source line pairs."""
+        with self.open_ndjson(ndjson_filepath) as file:
+            action = None
             for line in file:
+                if progress is not None:
+                    progress.bytes_read += len(line.encode("utf-8"))
                 line = line.strip()
-                load_doc = json.loads(line)
-                doc.append(load_doc)
+                if not line:
+                    continue
+
+                if action is None:
+                    action = json.loads(line)
+                    continue
 
-                if len(doc) % 2 == 0:
-                    root_properties = doc[0]["index"]
-                    root_properties["_source"] = doc[1]
-                    doc = []
-                    results.append(root_properties)
+                root_properties = action["index"]
+                root_properties["_source"] = json.loads(line)
+                action = None
+                yield root_properties
 
-        return results
+    def ndjson_to_ls(self, ndjson_filepath: str):
+        """Convert document information in NDJSON to ingestable list."""
+        return list(self.iter_ndjson_actions(ndjson_filepath))
 
     def es_connect(
         self,
@@ -69,40 +110,474 @@ class ESIngest:
         """Rewrite index creation with index_name."""
         self.client.indices.delete(index=index_name, ignore_unavailable=True)
         self.client.indices.create(index=index_name, mappings=custom_mapping)
+        self.notify_index_change(index_name)
 
         return self.client
 
-    def data_ingest(self, doc_ls: List[Dict]):
-        """Bulk data ingestion of documents into Elasticsearch index."""
+    def create_versioned_index(self, custom_mapping: Dict, alias: str = "serp-ai") -> str:
+        """
+        Create a new `<alias>-<timestamp>` index tuned for bulk loading
+        (no refresh, no replicas). Searches keep hitting the alias meanwhile.
+        """
+        index_name = f"{alias}-{time.strftime('%Y%m%d%H%M%S', time.gmtime())}"
+        self.client.indices.create(
+            index=index_name,
+            mappings=custom_mapping,
+            settings={"refresh_interval": "-1", "number_of_replicas": 0},
+        )
+        print(f"Created build index {index_name}.")
+        return index_name
+
+    def finalize_index(
+        self,
+        index_name: str,
+        number_of_replicas: int = 1,
+        refresh_interval: str = "1s",
+        max_num_segments: int = 1,
+    ):
+        """Restore serving settings on a freshly loaded index and force-merge it."""
+        self.client.indices.put_settings(
+            index=index_name,
+            settings={
+                "refresh_interval": refresh_interval,
+                "number_of_replicas": number_of_replicas,
+            },
+        )
+        self.client.indices.refresh(index=index_name)
+        print(f"Force-merging {index_name} to {max_num_segments} segment(s)...")
+        self.client.indices.forcemerge(
+            index=index_name, max_num_segments=max_num_segments, request_timeout=3600
+        )
+
+    def alias_versions(self, alias: str = "serp-ai", completed_only: bool = False) -> List[str]:
+        """
+        All versioned indices of `alias`, oldest first. With `completed_only`,
+        indices still carrying the bulk-loading settings of
+        `create_versioned_index` (a build in progress, or one that crashed)
+        are left out.
+        """
+        indices = self.client.indices.get(index=f"{alias}-*", expand_wildcards="open")
+        if completed_only:
+            indices = {
+                name: info
+                for name, info in indices.items()
+                if str(info.get("settings", {}).get("index", {}).get("refresh_interval")) != "-1"
+            }
+        return sorted(indices.keys())
+
+    def current_alias_target(self, alias: str = "serp-ai") -> Optional[str]:
+        if not self.client.indices.exists_alias(name=alias):
+            return None
+        return next(iter(self.client.indices.get_alias(name=alias).keys()), None)
+
+    def swap_alias(self, new_index: str, alias: str = "serp-ai"):
+        """
+        Atomically point `alias` at `new_index`. A legacy concrete index that
+        still carries the alias name is removed in the same request.
+        """
+        actions = []
+        if self.client.indices.exists_alias(name=alias):
+            for index_name in self.client.indices.get_alias(name=alias).keys():
+                actions.append({"remove": {"index": index_name, "alias": alias}})
+        elif self.client.indices.exists(index=alias):
+            actions.append({"remove_index": {"index": alias}})
+        actions.append({"add": {"index": new_index, "alias": alias}})
+
+        self.client.indices.update_aliases(actions=actions)
+        print(f"Alias {alias} now points to {new_index}.")
+        self.notify_index_change(alias)
+
+    def prune_versions(self, alias: str = "serp-ai", keep: int = 3):
+        """Delete all but the newest `keep` versions, never the live one."""
+        live_index = self.current_alias_target(alias)
+        versions = [
+            v for v in self.alias_versions(alias, completed_only=True) if v != live_index
+        ]
+        stale = versions[: max(0, len(versions) - max(0, keep - 1))]
+        for index_name in stale:
+            self.client.indices.delete(index=index_name)
+            print(f"Deleted old index version {index_name}.")
+
+    def rollback(self, alias: str = "serp-ai") -> str:
+        """Point `alias` back at the version built before the live one."""
+        live_index = self.current_alias_target(alias)
+        older = [
+            v
+            for v in self.alias_versions(alias, completed_only=True)
+            if live_index is None or v < live_index
+        ]
+        if not older:
+            raise ValueError(f"No earlier version of {alias} to roll back to.")
+        self.swap_alias(older[-1], alias=alias)
+        return older[-1]
+
+    def rebuild_with_alias(
+        self,
+        load: Callable[[str], None],
+        custom_mapping: Dict,
+        alias: str = "serp-ai",
+        keep_versions: int = 3,
+        number_of_replicas: int = 1,
+    ) -> str:
+        """
+        Zero-downtime rebuild: `load(index_name)` fills a new versioned index,
+        which is then finalized and swapped in behind `alias`. Older versions
+        are kept (up to `keep_versions` in total) for instant rollback. If
+        loading or finalizing fails, the partial index is deleted.
+        """
+        index_name = self.create_versioned_index(custom_mapping, alias=alias)
+        try:
+            load(index_name)
+            self.finalize_index(index_name, number_of_replicas=number_of_replicas)
+        except BaseException:
+            print(f"Loading {index_name} failed; {alias} was left untouched.")
+            try:
+                self.client.indices.delete(index=index_name, ignore_unavailable=True)
+                print(f"Deleted partial index {index_name}.")
+            except Exception as e:
+                print(f"Warning: Failed to delete partial index {index_name}: {e}")
+            raise
+        self.swap_alias(index_name, alias=alias)
+        self.prune_versions(alias=alias, keep=keep_versions)
+        return index_name
+
+    def create_index_if_missing(
+        self, custom_mapping: Dict, index_name: str = "serp-ai"
+    ) -> bool:
+        """Create the index only if it does not exist yet. Returns True if it was created."""
+        if self.client.indices.exists(index=index_name):
+            return False
+        self.client.indices.create(index=index_name, mappings=custom_mapping)
+        return True
+
+    def data_ingest(
+        self,
+        doc_ls: Iterable[Dict],
+        index_name: str = "serp-ai",
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 100 * 1024 * 1024,
+        thread_count: int = 1,
+        progress: Optional["IngestProgress"] = None,
+        max_reported_errors: int = 10,
+        encoder: Optional[EmbeddingEncoder] = None,
+        manifest: Optional[IndexManifest] = None,
+    ) -> "IngestProgress":
+        """
+        Bulk data ingestion of documents into Elasticsearch index.
+
+        `doc_ls` may be any iterable, including the lazy generator from
+        `iter_ndjson_actions`, so memory stays flat regardless of the corpus
+        size. With `thread_count > 1` chunks are sent concurrently through
+        `parallel_bulk`, otherwise through `streaming_bulk`. With an `encoder`,
+        document embeddings are computed in batches on the way to bulk. With a
+        `manifest`, the content hash of every document indexed successfully
+        is recorded under `index_name`.
+        """
         if not self.client:
             raise ValueError("Client not yet set, please connect to a client.")
 
-        try:
-            success_count, errors = bulk(
-                client=es_client,
-                actions=doc_ls,
-                # refresh="wait_for", # Optional: makes docs immediately searchable, use for testing, not high-load prod
-                # chunk_size=500,     # Optional: Number of docs to send in a single request (default 500)
-                # request_timeout=30  # Optional: Timeout for each chunk request (default 10s)
+        progress = progress or IngestProgress()
+        pending: Dict[str, str] = {}
+        if manifest is not None:
+            # Hashed before embedding, like the incremental sync.
+            doc_ls = self._track_hashes(doc_ls, pending)
+        if encoder is not None:
+            doc_ls = encoder.embed_actions(doc_ls)
+        bulk_kwargs = dict(
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            raise_on_error=False,
+            raise_on_exception=False,
+        )
+        if thread_count > 1:
+            results = parallel_bulk(
+                self.client, doc_ls, thread_count=thread_count, **bulk_kwargs
             )
-            print(f"Successfully indexed {success_count} documents.")
-            if errors:
-                print(f"Encountered {len(errors)} errors:")
-                for i, error_info in enumerate(errors):
-                    print(f"Error {i+1}: {error_info}")
+        else:
+            results = streaming_bulk(self.client, doc_ls, **bulk_kwargs)
+
+        try:
+            for ok, info in results:
+                if manifest is not None:
+                    _, item = next(iter(info.items()))
+                    doc_hash = pending.pop(item.get("_id"), None)
+                    if ok and doc_hash:
+                        manifest.record_indexed(index_name, item["_id"], doc_hash)
+                if ok:
+                    progress.indexed += 1
+                else:
+                    progress.errors += 1
+                    if progress.errors <= max_reported_errors:
+                        print(f"Error {progress.errors}: {info}")
+                progress.maybe_report()
+
+            progress.report(final=True)
+            if progress.errors > max_reported_errors:
+                print(
+                    f"{progress.errors - max_reported_errors} further errors not shown."
+                )
+            self.notify_index_change(index_name)
 
         except Exception as e:
             print(f"An exception occurred during bulk indexing: {e}")
+            progress.aborted = True
+        finally:
+            if manifest is not None:
+                manifest.commit()
 
+        return progress
 
-if __name__ == "__main__":
+    @staticmethod
+    def _track_hashes(doc_ls: Iterable[Dict], pending: Dict[str, str]) -> Iterator[Dict]:
+        for action in doc_ls:
+            if action.get("_id"):
+                pending[action["_id"]] = content_hash(action["_source"])
+            yield action
 
-    argparse = ArgumentParser()
-    argparse.add_argument("--ndjson")
+    def _plan_incremental(
+        self,
+        doc_ls: Iterable[Dict],
+        manifest: IndexManifest,
+        index_name: str,
+        pending: Dict[str, str],
+        stats: Dict[str, int],
+        batch_size: int = 1000,
+    ) -> Iterator[Dict]:
+        """Yield only the bulk actions that bring the index in line with `doc_ls`."""
+        manifest.start_sync()
+
+        def diff(batch: List[Dict]) -> Iterator[Dict]:
+            known = manifest.get_hashes(index_name, [action["_id"] for action in batch])
+            for action in batch:
+                doc_id = action["_id"]
+                manifest.mark_seen(doc_id)
+                doc_hash = content_hash(action["_source"])
+                previous_hash = known.get(doc_id)
+                if previous_hash == doc_hash:
+                    stats["unchanged"] += 1
+                    continue
+                stats["inserts" if previous_hash is None else "updates"] += 1
+                pending[doc_id] = doc_hash
+                yield {"_index": index_name, "_id": doc_id, "_source": action["_source"]}
+
+        batch: List[Dict] = []
+        for action in doc_ls:
+            if not action.get("_id"):
+                # Without a stable id a re-run would index a duplicate.
+                stats["skipped"] += 1
+                continue
+            batch.append(action)
+            if len(batch) >= batch_size:
+                yield from diff(batch)
+                batch = []
+        if batch:
+            yield from diff(batch)
+
+        for doc_id in manifest.unseen_ids(index_name):
+            stats["deletes"] += 1
+            yield {"_op_type": "delete", "_index": index_name, "_id": doc_id}
+
+    def incremental_ingest(
+        self,
+        doc_ls: Iterable[Dict],
+        manifest: IndexManifest,
+        index_name: str = "serp-ai",
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 100 * 1024 * 1024,
+        thread_count: int = 1,
+        progress: Optional["IngestProgress"] = None,
+        max_reported_errors: int = 10,
+        encoder: Optional[EmbeddingEncoder] = None,
+    ) -> Dict[str, int]:
+        """
+        Idempotently sync the index with `doc_ls` instead of rebuilding it.
+
+        Each document's source is hashed and compared with the manifest, so
+        only inserts, updates and deletes (ids missing from `doc_ls`) are sent
+        through bulk. The manifest is updated only for operations that
+        succeeded, so a failed run is simply retried by running it again.
+        With an `encoder`, only the inserted and updated documents are
+        embedded; hashes cover the source without the embedding.
+        """
+        if not self.client:
+            raise ValueError("Client not yet set, please connect to a client.")
+
+        progress = progress or IngestProgress()
+        stats = {"inserts": 0, "updates": 0, "deletes": 0, "unchanged": 0, "skipped": 0}
+        pending: Dict[str, str] = {}
+        actions = self._plan_incremental(doc_ls, manifest, index_name, pending, stats)
+        if encoder is not None:
+            actions = encoder.embed_actions(actions)
+
+        bulk_kwargs = dict(
+            chunk_size=chunk_size,
+            max_chunk_bytes=max_chunk_bytes,
+            raise_on_error=False,
+            raise_on_exception=False,
+        )
+        if thread_count > 1:
+            results = parallel_bulk(
+                self.client, actions, thread_count=thread_count, **bulk_kwargs
+            )
+        else:
+            results = streaming_bulk(self.client, actions, **bulk_kwargs)
+
+        try:
+            for ok, info in results:
+                op_type, item = next(iter(info.items()))
+                doc_id = item.get("_id")
+                if op_type == "delete":
+                    # A document that is already gone is as good as deleted.
+                    ok = ok or item.get("status") == 404
+                    if ok:
+                        manifest.record_deleted(index_name, doc_id)
+                else:
+                    doc_hash = pending.pop(doc_id, None)
+                    if ok and doc_hash:
+                        manifest.record_indexed(index_name, doc_id, doc_hash)
+
+                if ok:
+                    progress.indexed += 1
+                else:
+                    progress.errors += 1
+                    if progress.errors <= max_reported_errors:
+                        print(f"Error {progress.errors}: {info}")
+                progress.maybe_report()
+        finally:
+            manifest.commit()
+
+        progress.report(final=True)
+        print(
+            f"Incremental sync: {stats['inserts']} inserted, {stats['updates']} updated, "
+            f"{stats['deletes']} deleted, {stats['unchanged']} unchanged, "
+            f"{stats['skipped']} skipped without an id."
+        )
+        if stats["inserts"] or stats["updates"] or stats["deletes"]:
+            self.notify_index_change(index_name)
+        return stats
+
+
+class IngestProgress:
+    """Tracks and periodically prints bulk ingestion throughput."""
+
+    def __init__(self, report_every_s: float = 5.0):
+        self.report_every_s = report_every_s
+        self.indexed = 0
+        self.errors = 0
+        self.bytes_read = 0
+        self.aborted = False
+        self.start = time.perf_counter()
+        self._last_report = self.start
+
+    @property
+    def error_rate(self) -> float:
+        docs = self.indexed + self.errors
+        return self.errors / docs if docs else 0.0
+
+    def maybe_report(self):
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_every_s:
+            self._last_report = now
+            self.report()
+
+    def report(self, final: bool = False):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        docs = self.indexed + self.errors
+        prefix = "Finished:" if final else "Progress:"
+        print(
+            f"{prefix} {self.indexed} indexed, {self.errors} errors in {elapsed:.1f}s "
+            f"({docs / elapsed:.0f} docs/s, {self.bytes_read / elapsed / 1e6:.2f} MB/s)"
+        )
+
+
+CUSTOM_MAPPING = {
+    "properties": {
+        "citekey": {"type": "keyword"},
+        "entry_type": {"type": "keyword"},
+        "title": {"type": "text"},
+        "abstract": {"type": "text"},
+        "text": {
+            "type": "text",
+            "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
+        },
+        "year": {"type": "integer"},
+        "month": {"type": "keyword"},
+        "address": {"type": "keyword"},
+        "publisher": {
+            "type": "text",
+            "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
+        },
+        "url": {"type": "keyword"},
+        "authors": {"type": "keyword", "fields": {"text": {"type": "text"}}},
+        "editors": {"type": "keyword", "fields": {"text": {"type": "text"}}},
+        "booktitle": {
+            "type": "text",
+            "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
+        },
+        "pages": {"type": "keyword"},
+        # Filled when ingesting with --embedding_model; the dimension is taken
+        # from the first indexed vector.
+        EMBEDDING_FIELD: {"type": "dense_vector", "index": True, "similarity": "cosine"},
+    }
+}
+
+
+def add_ingest_arguments(argparse: ArgumentParser):
+    """Registers the connection, cache and bulk options shared by ingestion CLIs."""
     argparse.add_argument("--ca_cert")
     argparse.add_argument("--prod", action="store_true")
-    args = argparse.parse_args()
+    argparse.add_argument(
+        "--cache_backend",
+        default=os.environ.get("SEARCH_CACHE_BACKEND", "none"),
+        help="Shared search cache to invalidate after ingestion (none, sqlite or redis).",
+    )
+    argparse.add_argument(
+        "--cache_path",
+        default=os.environ.get("SEARCH_CACHE_PATH", "search_cache.sqlite3"),
+    )
+    argparse.add_argument(
+        "--manifest_path",
+        default="index_manifest.sqlite3",
+        help="Local record of indexed content hashes used by --incremental.",
+    )
+    argparse.add_argument(
+        "--keep_versions",
+        type=int,
+        default=3,
+        help="Index versions kept behind the serp-ai alias for rollback.",
+    )
+    argparse.add_argument(
+        "--replicas", type=int, default=1, help="Replicas restored after a rebuild."
+    )
+    argparse.add_argument(
+        "--max_error_rate",
+        type=float,
+        default=0.0,
+        help="Share of documents that may fail to index before a rebuild is abandoned.",
+    )
+    argparse.add_argument("--chunk_size", type=int, default=500)
+    argparse.add_argument(
+        "--max_chunk_bytes",
+        type=int,
+        default=100 * 1024 * 1024,
+        help="Upper bound on the size of a single bulk request.",
+    )
+    argparse.add_argument(
+        "--threads", type=int, default=1, help="Concurrent bulk requests (parallel_bulk)."
+    )
+    argparse.add_argument(
+        "--embedding_model",
+        default=os.environ.get("EMBEDDING_MODEL"),
+        help=f"Bi-encoder whose embeddings are stored in '{EMBEDDING_FIELD}' for hybrid search.",
+    )
+    argparse.add_argument("--embedding_batch_size", type=int, default=64)
+    argparse.add_argument(
+        "--embedding_workers", type=int, default=1, help="CPU processes encoding embeddings."
+    )
 
+
+def ingestor_from_args(args) -> ESIngest:
+    """Connects an ESIngest from CLI arguments and environment variables."""
     username = ""
     password = ""
     api_key = ""
@@ -114,8 +589,20 @@ if __name__ == "__main__":
         username = os.environ.get("ELASTIC_USERNAME")
         password = os.environ.get("ELASTIC_PASSWORD")
 
-    es_ingestor = ESIngest()
-    es_client = es_ingestor.es_connect(
+    cache_backend = build_cache_backend(
+        args.cache_backend,
+        path=args.cache_path,
+        redis_url=os.environ.get("SEARCH_CACHE_REDIS_URL"),
+    )
+
+    def bump_cache_generation(index_name: str):
+        generation = cache_backend.bump_generation()
+        print(f"Search cache invalidated for {index_name} (generation {generation}).")
+
+    es_ingestor = ESIngest(
+        on_index_change=bump_cache_generation if cache_backend else None
+    )
+    es_ingestor.es_connect(
         hosts=hosts,
         api_key=api_key,
         prod=args.prod,
@@ -123,38 +610,104 @@ if __name__ == "__main__":
         username=username,
         password=password,
     )
+    return es_ingestor
+
+
+def encoder_from_args(args) -> Optional[EmbeddingEncoder]:
+    """The embedding encoder configured by --embedding_model, if any."""
+    if not args.embedding_model:
+        return None
+    print(f"Loading embedding model: {args.embedding_model}...")
+    return EmbeddingEncoder(
+        args.embedding_model,
+        batch_size=args.embedding_batch_size,
+        workers=args.embedding_workers,
+    )
 
-    # Recreate the index
-    custom_mapping = {
-        "properties": {
-            "citekey": {"type": "keyword"},
-            "entry_type": {"type": "keyword"},
-            "title": {"type": "text"},
-            "abstract": {"type": "text"},
-            "text": {
-                "type": "text",
-                "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
-            },
-            "year": {"type": "integer"},
-            "month": {"type": "keyword"},
-            "address": {"type": "keyword"},
-            "publisher": {
-                "type": "text",
-                "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
-            },
-            "url": {"type": "keyword"},
-            "authors": {"type": "keyword", "fields": {"text": {"type": "text"}}},
-            "editors": {"type": "keyword", "fields": {"text": {"type": "text"}}},
-            "booktitle": {
-                "type": "text",
-                "fields": {"keyword": {"type": "keyword", "ignore_above": 256}},
-            },
-            "pages": {"type": "keyword"},
-        }
-    }
 
-    es_client = es_ingestor.create_index(custom_mapping, index_name="serp-ai")
-    doc_ls = es_ingestor.ndjson_to_ls(args.ndjson)
+if __name__ == "__main__":
+
+    argparse = ArgumentParser()
+    argparse.add_argument(
+        "--ndjson", help="NDJSON file to ingest, optionally gzip (.gz) or zstd (.zst) compressed."
+    )
+    argparse.add_argument(
+        "--rollback",
+        action="store_true",
+        help="Point the serp-ai alias back at the previous index version and exit.",
+    )
+    argparse.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only send inserts, updates and deletes instead of recreating the index.",
+    )
+    add_ingest_arguments(argparse)
+    args = argparse.parse_args()
+
+    es_ingestor = ingestor_from_args(args)
+    manifest = IndexManifest(args.manifest_path)
+    if args.rollback:
+        es_ingestor.rollback(alias="serp-ai")
+        # The manifest describes the version rolled away from; the next
+        # incremental run re-syncs every document.
+        manifest.clear("serp-ai")
+        manifest.close()
+        raise SystemExit(0)
+
+    encoder = encoder_from_args(args)
+    progress = IngestProgress()
+    doc_ls = es_ingestor.iter_ndjson_actions(args.ndjson, progress=progress)
+
+    if args.incremental:
+        if es_ingestor.create_index_if_missing(CUSTOM_MAPPING, index_name="serp-ai"):
+            # A fresh index holds nothing the manifest may claim it does.
+            manifest.clear("serp-ai")
+        es_ingestor.incremental_ingest(
+            doc_ls=doc_ls,
+            manifest=manifest,
+            index_name="serp-ai",
+            chunk_size=args.chunk_size,
+            max_chunk_bytes=args.max_chunk_bytes,
+            thread_count=args.threads,
+            progress=progress,
+            encoder=encoder,
+        )
+    else:
+        # Build a new index version and swap the alias, so searches keep being
+        # served from the old version until the new one is ready.
+        # The hashes of the new version are recorded under its own name and
+        # only take over the alias' entries once it is swapped in.
+        def load(index_name: str):
+            try:
+                result = es_ingestor.data_ingest(
+                    doc_ls=(dict(action, _index=index_name) for action in doc_ls),
+                    index_name=index_name,
+                    chunk_size=args.chunk_size,
+                    max_chunk_bytes=args.max_chunk_bytes,
+                    thread_count=args.threads,
+                    progress=progress,
+                    encoder=encoder,
+                    manifest=manifest,
+                )
+                if result.aborted or not result.indexed:
+                    raise RuntimeError(f"Bulk indexing into {index_name} did not complete.")
+                if result.error_rate > args.max_error_rate:
+                    raise RuntimeError(
+                        f"{result.errors} documents failed to index into {index_name}, "
+                        f"more than --max_error_rate {args.max_error_rate}."
+                    )
+            except BaseException:
+                manifest.clear(index_name)
+                raise
 
-    # Ingest list of documents to index
-    es_ingestor.data_ingest(doc_ls=doc_ls)
+        index_name = es_ingestor.rebuild_with_alias(
+            load,
+            CUSTOM_MAPPING,
+            alias="serp-ai",
+            keep_versions=args.keep_versions,
+            number_of_replicas=args.replicas,
+        )
+        manifest.replace("serp-ai", from_index=index_name)
+    manifest.close()
+    if encoder is not None:
+        encoder.close()
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import sqlite3
+import threading
+from typing import Dict, List, Tuple
+
+
+def content_hash(doc_source: Dict) -> str:
+    """Stable hash of a document source, independent of key order."""
+    canonical = json.dumps(
+        doc_source, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """
+    Local SQLite record of what has been indexed, one content hash per document id.
+
+    During a sync, every id found in the input is marked as seen, so that ids
+    left unseen at the end are the documents to delete from the index. The
+    bulk helpers may read actions on a worker thread, so access is serialized.
+    """
+
+    def __init__(self, path: str, batch_size: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS manifest ("
+            "index_name TEXT NOT NULL, doc_id TEXT NOT NULL, content_hash TEXT NOT NULL, "
+            "PRIMARY KEY (index_name, doc_id))"
+        )
+        self._conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS seen (doc_id TEXT PRIMARY KEY)"
+        )
+        self._conn.commit()
+        self._seen_buffer: List[Tuple[str]] = []
+        self._upserts: List[Tuple[str, str, str]] = []
+        self._deletes: List[Tuple[str, str]] = []
+
+    def get_hashes(self, index_name: str, doc_ids: List[str]) -> Dict[str, str]:
+        with self._lock:
+            hashes = {}
+            for start in range(0, len(doc_ids), 500):
+                batch = doc_ids[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT doc_id, content_hash FROM manifest "
+                    f"WHERE index_name = ? AND doc_id IN ({placeholders})",
+                    (index_name, *batch),
+                )
+                hashes.update(rows)
+            return hashes
+
+    def count(self, index_name: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM manifest WHERE index_name = ?", (index_name,)
+            ).fetchone()[0]
+
+    def start_sync(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM seen")
+            self._seen_buffer = []
+
+    def mark_seen(self, doc_id: str):
+        with self._lock:
+            self._seen_buffer.append((doc_id,))
+            if len(self._seen_buffer) >= self.batch_size:
+                self._flush_seen()
+
+    def _flush_seen(self):
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO seen (doc_id) VALUES (?)", self._seen_buffer
+        )
+        self._seen_buffer = []
+
+    def unseen_ids(self, index_name: str) -> List[str]:
+        """Ids recorded for `index_name` that were not seen during this sync."""
+        with self._lock:
+            self._flush_seen()
+            rows = self._conn.execute(
+                "SELECT doc_id FROM manifest WHERE index_name = ? "
+                "AND doc_id NOT IN (SELECT doc_id FROM seen)",
+                (index_name,),
+            ).fetchall()
+        return [doc_id for (doc_id,) in rows]
+
+    def record_indexed(self, index_name: str, doc_id: str, doc_hash: str):
+        with self._lock:
+            self._upserts.append((index_name, doc_id, doc_hash))
+            if len(self._upserts) >= self.batch_size:
+                self.commit()
+
+    def record_deleted(self, index_name: str, doc_id: str):
+        with self._lock:
+            self._deletes.append((index_name, doc_id))
+            if len(self._deletes) >= self.batch_size:
+                self.commit()
+
+    def clear(self, index_name: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM manifest WHERE index_name = ?", (index_name,))
+            self._conn.commit()
+
+    def replace(self, index_name: str, from_index: str):
+        """
+        Makes the hashes recorded under `from_index` those of `index_name`,
+        e.g. once a rebuilt index version is swapped in behind the alias.
+        """
+        with self._lock:
+            self.commit()
+            self._conn.execute("DELETE FROM manifest WHERE index_name = ?", (index_name,))
+            self._conn.execute(
+                "UPDATE manifest SET index_name = ? WHERE index_name = ?",
+                (index_name, from_index),
+            )
+            self._conn.commit()
+
+    def commit(self):
+        with self._lock:
+            if self._upserts:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO manifest (index_name, doc_id, content_hash) "
+                    "VALUES (?, ?, ?)",
+                    self._upserts,
+                )
+                self._upserts = []
+            if self._deletes:
+                self._conn.executemany(
+                    "DELETE FROM manifest WHERE index_name = ? AND doc_id = ?",
+                    self._deletes,
+                )
+                self._deletes = []
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.commit()
+            self._conn.close()
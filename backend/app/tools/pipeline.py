@@ -0,0 +1,294 @@
+import json
+import queue
+import threading
+from argparse import ArgumentParser
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from elasticsearch.helpers import parallel_bulk, streaming_bulk
+
+from app.tools.bibtex_parser import Parser
+from app.services.embeddings import EmbeddingEncoder
+from app.tools.manifest import IndexManifest, content_hash
+from app.tools.ingest import (
+    CUSTOM_MAPPING,
+    ESIngest,
+    IngestProgress,
+    add_ingest_arguments,
+    encoder_from_args,
+    ingestor_from_args,
+)
+
+_DONE = object()
+
+
+class _StageFailure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class BibtexToESPipeline:
+    """
+    Streams a BibTeX file straight into Elasticsearch without an intermediate
+    NDJSON file.
+
+    Parsing, JSON encoding and bulk indexing run as separate stages connected
+    by bounded queues, so they overlap and a slow stage applies backpressure
+    to the ones before it. With an `encoder`, the encode stage also computes
+    document embeddings in batches of `embedding_buffer`. With `dry_run_path` set, the encoded bulk lines are
+    written to that file instead of being sent to Elasticsearch. With a
+    `manifest`, the content hash of every document indexed successfully is
+    recorded under `index_name`.
+    """
+
+    def __init__(
+        self,
+        ingestor: Optional[ESIngest] = None,
+        index_name: str = "serp-ai",
+        parse_workers: int = 1,
+        queue_size: int = 10000,
+        chunk_size: int = 500,
+        max_chunk_bytes: int = 100 * 1024 * 1024,
+        thread_count: int = 1,
+        encoder: Optional[EmbeddingEncoder] = None,
+        embedding_buffer: int = 1024,
+        manifest: Optional[IndexManifest] = None,
+    ):
+        self.ingestor = ingestor
+        self.index_name = index_name
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.chunk_size = chunk_size
+        self.max_chunk_bytes = max_chunk_bytes
+        self.thread_count = thread_count
+        self.encoder = encoder
+        self.embedding_buffer = embedding_buffer
+        self.manifest = manifest
+        self._pending_hashes: Dict[str, str] = {}
+        self._stop = threading.Event()
+
+    def _put(self, target: queue.Queue, item: Any):
+        # Blocks while the queue is full, but gives up once the pipeline stops.
+        while not self._stop.is_set():
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run_stage(self, produce: Callable[[], Iterator[Any]], output: queue.Queue):
+        try:
+            for item in produce():
+                if self._stop.is_set():
+                    return
+                self._put(output, item)
+            self._put(output, _DONE)
+        except BaseException as e:
+            self._put(output, _StageFailure(e))
+
+    def _drain(self, source: queue.Queue) -> Iterator[Any]:
+        while True:
+            # Waits for the upstream stage, but gives up once the pipeline
+            # stops, e.g. because the consumer failed.
+            try:
+                item = source.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    raise RuntimeError("Pipeline stopped before its input was drained.")
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, _StageFailure):
+                raise item.error
+            yield item
+
+    def _encode(self, docs: queue.Queue, progress: IngestProgress) -> Iterator[Tuple[dict, str]]:
+        sources = self._drain(docs)
+        if self.manifest is not None:
+            sources = self._track_hashes(sources)
+        if self.encoder is not None:
+            sources = self._embed(sources)
+        for doc_source in sources:
+            # The source is serialized here, off the bulk thread; the bulk
+            # helpers forward already-encoded strings untouched.
+            source_line = json.dumps(doc_source)
+            progress.bytes_read += len(source_line) + 1
+            yield Parser.bulk_action_for(doc_source, self.index_name), source_line
+
+    def _track_hashes(self, sources: Iterator[dict]) -> Iterator[dict]:
+        # Hashed before embedding, like the incremental sync.
+        for doc_source in sources:
+            if doc_source.get("citekey"):
+                self._pending_hashes[doc_source["citekey"]] = content_hash(doc_source)
+            yield doc_source
+
+    def _embed(self, sources: Iterator[dict]) -> Iterator[dict]:
+        buffer = []
+        for doc_source in sources:
+            buffer.append(doc_source)
+            if len(buffer) >= self.embedding_buffer:
+                self.encoder.add_embeddings(buffer)
+                yield from buffer
+                buffer = []
+        if buffer:
+            self.encoder.add_embeddings(buffer)
+            yield from buffer
+
+    def run(
+        self, bib_path: str, dry_run_path: Optional[str] = None
+    ) -> IngestProgress:
+        if dry_run_path is None and (self.ingestor is None or not self.ingestor.client):
+            raise ValueError("Client not yet set, please connect to a client.")
+
+        progress = IngestProgress()
+        docs: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        actions: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        parser = Parser()
+        stages = [
+            threading.Thread(
+                target=self._run_stage,
+                args=(
+                    lambda: parser.iter_parse_file(bib_path, workers=self.parse_workers),
+                    docs,
+                ),
+                name="pipeline-parse",
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._run_stage,
+                args=(lambda: self._encode(docs, progress), actions),
+                name="pipeline-encode",
+                daemon=True,
+            ),
+        ]
+        self._stop.clear()
+        for stage in stages:
+            stage.start()
+
+        try:
+            if dry_run_path is not None:
+                self._write_dry_run(self._drain(actions), dry_run_path, progress)
+            else:
+                self._bulk_index(self._drain(actions), progress)
+        finally:
+            self._stop.set()
+            for stage in stages:
+                stage.join(timeout=5)
+
+        progress.report(final=True)
+        return progress
+
+    def _write_dry_run(
+        self, actions: Iterator[Tuple[dict, str]], dry_run_path: str, progress: IngestProgress
+    ):
+        with open(dry_run_path, "w", encoding="utf-8") as f:
+            for action, source_line in actions:
+                f.write(json.dumps(action) + "\n")
+                f.write(source_line + "\n")
+                progress.indexed += 1
+                progress.maybe_report()
+        print(f"Dry run: bulk NDJSON written to {dry_run_path}")
+
+    def _bulk_index(self, actions: Iterator[Tuple[dict, str]], progress: IngestProgress):
+        bulk_kwargs = dict(
+            chunk_size=self.chunk_size,
+            max_chunk_bytes=self.max_chunk_bytes,
+            raise_on_error=False,
+            raise_on_exception=False,
+            # Actions are already (action, encoded source) pairs.
+            expand_action_callback=lambda item: item,
+        )
+        client = self.ingestor.client
+        if self.thread_count > 1:
+            results = parallel_bulk(
+                client, actions, thread_count=self.thread_count, **bulk_kwargs
+            )
+        else:
+            results = streaming_bulk(client, actions, **bulk_kwargs)
+
+        try:
+            for ok, info in results:
+                if self.manifest is not None:
+                    _, item = next(iter(info.items()))
+                    doc_hash = self._pending_hashes.pop(item.get("_id"), None)
+                    if ok and doc_hash:
+                        self.manifest.record_indexed(self.index_name, item["_id"], doc_hash)
+                if ok:
+                    progress.indexed += 1
+                else:
+                    progress.errors += 1
+                    if progress.errors <= 10:
+                        print(f"Error {progress.errors}: {info}")
+                progress.maybe_report()
+        finally:
+            if self.manifest is not None:
+                self.manifest.commit()
+        self.ingestor.notify_index_change(self.index_name)
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Parse a BibTeX file and bulk-index it into Elasticsearch in one pass."
+    )
+    argparse.add_argument("--bib_path", required=True, help="Path to the input BibTeX file.")
+    argparse.add_argument(
+        "--dry_run_path",
+        help="Write the bulk NDJSON to this file instead of sending it to Elasticsearch.",
+    )
+    argparse.add_argument("--workers", type=int, default=1, help="BibTeX parsing processes.")
+    argparse.add_argument(
+        "--queue_size", type=int, default=10000, help="Capacity of each stage queue."
+    )
+    add_ingest_arguments(argparse)
+    args = argparse.parse_args()
+
+    encoder = encoder_from_args(args)
+    manifest = None
+
+    def make_pipeline(index_name: str, ingestor: Optional[ESIngest]):
+        return BibtexToESPipeline(
+            ingestor=ingestor,
+            index_name=index_name,
+            parse_workers=args.workers,
+            queue_size=args.queue_size,
+            chunk_size=args.chunk_size,
+            max_chunk_bytes=args.max_chunk_bytes,
+            thread_count=args.threads,
+            encoder=encoder,
+            manifest=manifest,
+        )
+
+    if args.dry_run_path:
+        make_pipeline("serp-ai", None).run(args.bib_path, dry_run_path=args.dry_run_path)
+    else:
+        es_ingestor = ingestor_from_args(args)
+        manifest = IndexManifest(args.manifest_path)
+
+        def load(index_name: str):
+            try:
+                progress = make_pipeline(index_name, es_ingestor).run(args.bib_path)
+                if not progress.indexed:
+                    raise RuntimeError(f"Bulk indexing into {index_name} did not complete.")
+                if progress.error_rate > args.max_error_rate:
+                    raise RuntimeError(
+                        f"{progress.errors} documents failed to index into {index_name}, "
+                        f"more than --max_error_rate {args.max_error_rate}."
+                    )
+            except BaseException:
+                manifest.clear(index_name)
+                raise
+
+        # Searches keep being served from the previous version behind the
+        # serp-ai alias until the new one is loaded and swapped in. Its
+        # hashes then replace the alias' entries in the incremental manifest.
+        index_name = es_ingestor.rebuild_with_alias(
+            load,
+            CUSTOM_MAPPING,
+            alias="serp-ai",
+            keep_versions=args.keep_versions,
+            number_of_replicas=args.replicas,
+        )
+        manifest.replace("serp-ai", from_index=index_name)
+        manifest.close()
+    if encoder is not None:
+        encoder.close()
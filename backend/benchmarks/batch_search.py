@@ -0,0 +1,110 @@
+import asyncio
+import json
+import time
+from argparse import ArgumentParser
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_search import DEFAULT_QUERIES
+
+
+def unique_queries(count: int, offset: int = 0) -> List[str]:
+    """
+    Distinct queries, so neither the result cache nor the pair score cache
+    answers them. Each run gets its own `offset` for the same reason.
+    """
+    return [
+        f"{DEFAULT_QUERIES[i % len(DEFAULT_QUERIES)]} {offset + i}" for i in range(count)
+    ]
+
+
+async def run_sequential(client: httpx.AsyncClient, queries: List[str], concurrency: int) -> float:
+    """Sends one GET /search per query, `concurrency` at a time. Returns the wall time."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one_query(query: str):
+        async with semaphore:
+            response = await client.get(f"/search/{query}")
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_query(query) for query in queries))
+    return time.perf_counter() - start
+
+
+async def run_batched(client: httpx.AsyncClient, queries: List[str], batch_size: int) -> float:
+    """Sends the queries as POST /search/batch requests of `batch_size`. Returns the wall time."""
+    start = time.perf_counter()
+    for i in range(0, len(queries), batch_size):
+        response = await client.post(
+            "/search/batch", json={"queries": queries[i : i + batch_size]}
+        )
+        response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def main(args) -> List[Dict]:
+    results = []
+    offset = args.offset
+    async with httpx.AsyncClient(base_url=args.url, timeout=600.0) as client:
+        for concurrency in args.concurrency:
+            queries = unique_queries(args.queries, offset)
+            offset += args.queries
+            wall = await run_sequential(client, queries, concurrency)
+            results.append(
+                {
+                    "mode": "sequential",
+                    "concurrency": concurrency,
+                    "queries": len(queries),
+                    "wall_s": round(wall, 4),
+                    "queries_per_s": round(len(queries) / wall, 2),
+                }
+            )
+            print(json.dumps(results[-1]))
+        for batch_size in args.batch_sizes:
+            queries = unique_queries(args.queries, offset)
+            offset += args.queries
+            wall = await run_batched(client, queries, batch_size)
+            results.append(
+                {
+                    "mode": "batch",
+                    "batch_size": batch_size,
+                    "queries": len(queries),
+                    "wall_s": round(wall, 4),
+                    "queries_per_s": round(len(queries) / wall, 2),
+                }
+            )
+            print(json.dumps(results[-1]))
+    return results
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Queries/s of POST /search/batch against one GET /search per query."
+    )
+    argparse.add_argument("--url", default="http://localhost:8000")
+    argparse.add_argument("--queries", type=int, default=200)
+    argparse.add_argument(
+        "--concurrency",
+        type=int,
+        nargs="+",
+        default=[1, 8],
+        help="In-flight GET /search calls for the sequential path.",
+    )
+    argparse.add_argument("--batch_sizes", type=int, nargs="+", default=[10, 50, 100])
+    argparse.add_argument(
+        "--offset",
+        type=int,
+        default=0,
+        help="First query number; change it between runs against the same server.",
+    )
+    argparse.add_argument("--output_path", help="Optional JSON file for results.")
+    args = argparse.parse_args()
+
+    results = asyncio.run(main(args))
+    if args.output_path:
+        with open(args.output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to: {args.output_path}")
@@ -0,0 +1,154 @@
+import json
+import math
+import re
+import statistics
+import time
+from argparse import ArgumentParser
+from typing import Dict, List
+
+import numpy as np
+
+from app.services.reranker import RERANKER_BACKENDS, load_cross_encoder
+from benchmarks.load_search import DEFAULT_QUERIES, percentile
+
+
+def load_texts(ndjson_filepath: str, limit: int) -> List[str]:
+    """Reads document `text` fields from a bulk-API NDJSON file (action/source line pairs)."""
+    texts = []
+    with open(ndjson_filepath, "r", encoding="utf-8") as file:
+        for i, line in enumerate(file):
+            if i % 2 == 0:
+                continue
+            text = json.loads(line).get("text")
+            if isinstance(text, str) and text.strip():
+                texts.append(text)
+            if len(texts) >= limit:
+                break
+    return texts
+
+
+def candidate_sets(queries: List[str], texts: List[str], size: int) -> List[List[str]]:
+    """Picks a fixed candidate list per query by term overlap, standing in for BM25."""
+    tokenized = [set(re.findall(r"\w+", text.lower())) for text in texts]
+    candidates = []
+    for query in queries:
+        terms = set(re.findall(r"\w+", query.lower()))
+        overlap = [(len(terms & doc_terms), i) for i, doc_terms in enumerate(tokenized)]
+        overlap.sort(key=lambda x: (-x[0], x[1]))
+        candidates.append([texts[i] for _, i in overlap[:size]])
+    return candidates
+
+
+def ndcg_at_k(reference_scores: np.ndarray, candidate_scores: np.ndarray, k: int) -> float:
+    """NDCG@k of the candidate ordering, using min-max scaled reference scores as gains."""
+    low, high = reference_scores.min(), reference_scores.max()
+    gains = (reference_scores - low) / (high - low) if high > low else np.ones_like(reference_scores)
+
+    def dcg(order):
+        return sum(gains[j] / math.log2(rank + 2) for rank, j in enumerate(order[:k]))
+
+    ideal = dcg(np.argsort(-reference_scores))
+    return dcg(np.argsort(-candidate_scores)) / ideal if ideal else 1.0
+
+
+def benchmark_backend(
+    model_name: str,
+    backend: str,
+    onnx_file: str,
+    queries: List[str],
+    candidates: List[List[str]],
+    throughput_batch: int,
+    repeats: int,
+) -> Dict:
+    model = load_cross_encoder(model_name, backend=backend, onnx_file=onnx_file)
+    request_pairs = [
+        [[query, text] for text in texts] for query, texts in zip(queries, candidates)
+    ]
+
+    # Warm-up so one-time graph/session setup is not counted.
+    model.predict(request_pairs[0])
+
+    latencies = []
+    scores = []
+    for _ in range(repeats):
+        scores = []
+        for pairs in request_pairs:
+            start = time.perf_counter()
+            scores.append(np.asarray(model.predict(pairs), dtype=np.float32))
+            latencies.append(time.perf_counter() - start)
+
+    all_pairs = [pair for pairs in request_pairs for pair in pairs]
+    start = time.perf_counter()
+    for _ in range(repeats):
+        model.predict(all_pairs, batch_size=throughput_batch)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "backend": backend,
+        "request_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "request_p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "request_mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+        "throughput_pairs_per_s": round(len(all_pairs) * repeats / elapsed, 1),
+        "scores": scores,
+    }
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Compare reranker backends on latency, throughput and ranking agreement."
+    )
+    argparse.add_argument("--ndjson", required=True, help="NDJSON produced by bibtex_parser.py.")
+    argparse.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    argparse.add_argument(
+        "--backends", nargs="+", default=list(RERANKER_BACKENDS), choices=RERANKER_BACKENDS
+    )
+    argparse.add_argument("--onnx_file", help="Override the ONNX graph used by the int8 backend.")
+    argparse.add_argument("--docs", type=int, default=5000)
+    argparse.add_argument("--candidates", type=int, default=20)
+    argparse.add_argument("--throughput_batch", type=int, default=200)
+    argparse.add_argument("--repeats", type=int, default=3)
+    argparse.add_argument("--output_path", help="Optional JSON file for results.")
+    args = argparse.parse_args()
+
+    texts = load_texts(args.ndjson, args.docs)
+    candidates = candidate_sets(DEFAULT_QUERIES, texts, args.candidates)
+
+    results = []
+    for backend in args.backends:
+        print(f"Benchmarking {backend} backend...")
+        results.append(
+            benchmark_backend(
+                args.model,
+                backend,
+                args.onnx_file if backend == "int8" else None,
+                DEFAULT_QUERIES,
+                candidates,
+                args.throughput_batch,
+                args.repeats,
+            )
+        )
+
+    # Ranking agreement is measured against the fp32 PyTorch scores.
+    reference = next((r for r in results if r["backend"] == "torch"), results[0])
+    for result in results:
+        result["ndcg_at_5_vs_reference"] = round(
+            statistics.fmean(
+                ndcg_at_k(ref, cand, 5)
+                for ref, cand in zip(reference["scores"], result["scores"])
+            ),
+            4,
+        )
+    for result in results:
+        del result["scores"]
+        print(
+            f"{result['backend']:>6}  p50={result['request_p50_ms']:>8}ms  "
+            f"p95={result['request_p95_ms']:>8}ms  "
+            f"throughput={result['throughput_pairs_per_s']:>9} pairs/s  "
+            f"ndcg@5={result['ndcg_at_5_vs_reference']}"
+        )
+
+    if args.output_path:
+        with open(args.output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to: {args.output_path}")
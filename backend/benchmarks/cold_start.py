@@ -0,0 +1,114 @@
+import json
+import signal
+import subprocess
+import sys
+import time
+from argparse import ArgumentParser
+from typing import Dict, List, Optional
+
+import httpx
+
+# How each startup mode is launched; the API is configured through the
+# environment as usual.
+MODES = {
+    "uvicorn": ["-m", "uvicorn", "app.main:app", "--workers"],
+    "serve": ["-m", "app.serve", "--workers"],
+    "serve_no_preload": ["-m", "app.serve", "--no_preload", "--workers"],
+}
+
+
+def read_memory_kb(pid: int) -> Dict[str, Optional[int]]:
+    """RSS and PSS of a process, from /proc (Linux only)."""
+    memory = {"rss_kb": None, "pss_kb": None}
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    memory["rss_kb"] = int(line.split()[1])
+        # PSS splits shared pages between the processes mapping them, so it
+        # sums to the real memory use of the process tree.
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    memory["pss_kb"] = int(line.split()[1])
+    except OSError:
+        pass
+    return memory
+
+
+def wait_until_ready(url: str, workers: int, start: float, timeout_s: float) -> Dict[int, float]:
+    """
+    Polls `/ready` on fresh connections until `workers` distinct worker pids
+    answered 200. Returns the seconds from `start` until each one did.
+    """
+    ready_at: Dict[int, float] = {}
+    while len(ready_at) < workers:
+        if time.perf_counter() - start > timeout_s:
+            raise TimeoutError(
+                f"Only {len(ready_at)}/{workers} worker(s) ready after {timeout_s}s."
+            )
+        try:
+            response = httpx.get(f"{url}/ready", timeout=2.0)
+            if response.status_code == 200:
+                ready_at.setdefault(response.json()["pid"], time.perf_counter() - start)
+                continue
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.05)
+    return ready_at
+
+
+def measure_mode(mode: str, workers: int, port: int, timeout_s: float) -> Dict:
+    command = [sys.executable] + MODES[mode] + [str(workers), "--port", str(port)]
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready_at = wait_until_ready(f"http://127.0.0.1:{port}", workers, start, timeout_s)
+        worker_memory = {pid: read_memory_kb(pid) for pid in ready_at}
+        # A single uvicorn worker runs in the launched process itself.
+        parent_memory = read_memory_kb(process.pid) if process.pid not in ready_at else {}
+    finally:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    rss = [m["rss_kb"] for m in worker_memory.values() if m["rss_kb"] is not None]
+    pss = [m["pss_kb"] for m in worker_memory.values() if m["pss_kb"] is not None]
+    parent_pss = parent_memory.get("pss_kb") or 0
+    return {
+        "mode": mode,
+        "workers": workers,
+        "first_worker_ready_s": round(min(ready_at.values()), 2),
+        "cold_start_s": round(max(ready_at.values()), 2),
+        "worker_rss_mb": [round(kb / 1024, 1) for kb in rss],
+        "worker_pss_mb": [round(kb / 1024, 1) for kb in pss],
+        "parent_pss_mb": round(parent_pss / 1024, 1),
+        # What the whole process tree costs in RAM.
+        "total_pss_mb": round((sum(pss) + parent_pss) / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Cold-start time and per-worker memory of the API per startup mode (Linux)."
+    )
+    argparse.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    argparse.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    argparse.add_argument("--port", type=int, default=8765)
+    argparse.add_argument("--timeout_s", type=float, default=300.0)
+    argparse.add_argument("--output_path", help="Optional JSON file for results.")
+    args = argparse.parse_args()
+
+    results: List[Dict] = []
+    for workers in args.workers:
+        for mode in args.modes:
+            result = measure_mode(mode, workers, args.port, args.timeout_s)
+            print(json.dumps(result))
+            results.append(result)
+
+    if args.output_path:
+        with open(args.output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
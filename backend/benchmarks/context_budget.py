@@ -0,0 +1,121 @@
+import json
+import random
+import statistics
+import time
+from argparse import ArgumentParser
+from typing import Callable, Dict, List
+
+from app.services.context import TokenCounter, pack_context
+from benchmarks.bench_reranker import load_texts
+
+
+def whitespace_context(documents: List[Dict], max_context_tokens: int) -> str:
+    """The previous context builder, which counted whitespace-separated words."""
+    context_parts = []
+    current_token_count = 0
+    for i, doc in enumerate(documents):
+        doc_text = doc["_source"].get("text", "")
+        if not isinstance(doc_text, str) or not doc_text.strip():
+            continue
+        doc_tokens = doc_text.split()
+        if current_token_count + len(doc_tokens) > max_context_tokens:
+            remaining_tokens = max_context_tokens - current_token_count
+            if remaining_tokens > 20:
+                context_parts.append(
+                    f"Document {i+1} (truncated): {' '.join(doc_tokens[:remaining_tokens])}"
+                )
+            break
+        context_parts.append(f"Document {i+1}:\n{doc_text}")
+        current_token_count += len(doc_tokens)
+    return "\n\n---\n\n".join(context_parts)
+
+
+def make_requests(texts: List[str], num_requests: int, docs_per_request: int, seed: int) -> List[List[Dict]]:
+    """Random document sets drawn from a small pool, so popular documents recur as in production."""
+    rng = random.Random(seed)
+    docs = [
+        {"_id": f"doc-{i}", "_source": {"text": text}} for i, text in enumerate(texts)
+    ]
+    requests = []
+    for _ in range(num_requests):
+        picked = [dict(doc) for doc in rng.sample(docs, min(docs_per_request, len(docs)))]
+        for doc in picked:
+            doc["cross_encoder_score"] = rng.uniform(-10, 10)
+        requests.append(picked)
+    return requests
+
+
+def measure(
+    build: Callable[[List[Dict]], str],
+    requests: List[List[Dict]],
+    reference: TokenCounter,
+    budget: int,
+) -> Dict:
+    timings = []
+    contexts = []
+    for documents in requests:
+        start = time.perf_counter()
+        contexts.append(build(documents))
+        timings.append(time.perf_counter() - start)
+
+    # Accuracy is judged on the whole assembled context, tokenized at once.
+    real_tokens = [reference.count(context) for context in contexts]
+    return {
+        "mean_build_ms": round(statistics.mean(timings) * 1000, 3),
+        "first_half_mean_build_ms": round(statistics.mean(timings[: len(timings) // 2]) * 1000, 3),
+        "second_half_mean_build_ms": round(statistics.mean(timings[len(timings) // 2 :]) * 1000, 3),
+        "mean_real_tokens": round(statistics.mean(real_tokens), 1),
+        "max_real_tokens": max(real_tokens),
+        "overflow_rate": round(sum(t > budget for t in real_tokens) / len(real_tokens), 4),
+        "mean_budget_fill": round(statistics.mean(min(t, budget) / budget for t in real_tokens), 4),
+    }
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Compare context builders on build time and real token counts against the budget."
+    )
+    argparse.add_argument("--ndjson", required=True, help="Bulk-API NDJSON file to draw documents from.")
+    argparse.add_argument(
+        "--tokenizer",
+        default="meta-llama/Llama-3.3-70B-Instruct",
+        help="Hugging Face tokenizer used as ground truth and by the tokenizer-based builder.",
+    )
+    argparse.add_argument("--budget", type=int, default=3000)
+    argparse.add_argument("--pool_size", type=int, default=500, help="Documents to draw from.")
+    argparse.add_argument("--requests", type=int, default=500)
+    argparse.add_argument("--docs_per_request", type=int, default=5)
+    argparse.add_argument("--seed", type=int, default=0)
+    argparse.add_argument("--output_path", help="Optional JSON file for results.")
+    args = argparse.parse_args()
+
+    texts = load_texts(args.ndjson, args.pool_size)
+    requests = make_requests(texts, args.requests, args.docs_per_request, args.seed)
+    reference = TokenCounter(args.tokenizer)
+    if not reference.exact:
+        raise SystemExit(f"Tokenizer '{args.tokenizer}' is required as the ground truth.")
+
+    estimated = TokenCounter()
+    exact = TokenCounter(args.tokenizer)
+    results = {
+        "budget": args.budget,
+        "tokenizer": args.tokenizer,
+        "builders": {
+            "whitespace": measure(
+                lambda docs: whitespace_context(docs, args.budget), requests, reference, args.budget
+            ),
+            "estimated": measure(
+                lambda docs: pack_context(docs, estimated, args.budget), requests, reference, args.budget
+            ),
+            "tokenizer": measure(
+                lambda docs: pack_context(docs, exact, args.budget), requests, reference, args.budget
+            ),
+        },
+        "tokenizer_memo": exact.get_stats(),
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output_path:
+        with open(args.output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import threading
+import time
+from argparse import ArgumentParser
+from typing import Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+from app.services.local_search import LocalSearchBackend
+
+
+def _query_text(query: Dict) -> str:
+    """The text of the `multi_match`/`match` queries the API sends, also inside a `bool`."""
+    if "bool" in query:
+        return " ".join(_query_text(clause) for clause in query["bool"].get("must", []))
+    for clause in ("multi_match", "match"):
+        if clause in query:
+            body = query[clause]
+            if "query" in body:
+                return body["query"]
+            # {"match": {"field": "text"}} or {"match": {"field": {"query": ...}}}
+            value = next(iter(body.values()), "")
+            return value.get("query", "") if isinstance(value, dict) else value
+    return ""
+
+
+def _source_includes(source) -> Optional[List[str]]:
+    if isinstance(source, dict):
+        return source.get("includes")
+    if isinstance(source, list):
+        return source
+    return None
+
+
+def create_fake_es_app(index_dir: str, latency_ms: float = 0.0) -> FastAPI:
+    """
+    Elasticsearch stand-in for the API's BM25 retrieval and for ingestion.
+
+    `_search`, `_msearch` and `_mget` are answered from a local BM25 index
+    (`benchmarks.fixtures` builds one), with `latency_ms` added to each
+    request to model the network and cluster time. `_bulk` accepts and
+    counts documents without storing them, and index creation and deletion
+    always succeed. kNN searches, filter clauses, aggregations and
+    point-in-time searches are not supported, so hybrid retrieval, filters,
+    facets and pages past the rerank window cannot be benchmarked against it.
+    """
+    app = FastAPI()
+    backend = LocalSearchBackend(index_dir)
+    latency_s = latency_ms / 1000
+    app.state.stats = {"searches": 0, "msearches": 0, "mgets": 0, "bulk_docs": 0}
+
+    @app.middleware("http")
+    async def add_product_header(request: Request, call_next):
+        if latency_s:
+            await asyncio.sleep(latency_s)
+        response = await call_next(request)
+        # The official clients refuse to talk to a server without it.
+        response.headers["X-Elastic-Product"] = "Elasticsearch"
+        return response
+
+    def search_response(query: str, size: int, source) -> Dict:
+        start = time.perf_counter()
+        hits = backend.search_sync(query, size, _source_includes(source))
+        return {
+            "took": int((time.perf_counter() - start) * 1000),
+            "timed_out": False,
+            "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+            "hits": {
+                "total": {"value": len(hits), "relation": "eq"},
+                "max_score": hits[0]["_score"] if hits else None,
+                "hits": hits,
+            },
+        }
+
+    @app.api_route("/", methods=["GET", "HEAD"])
+    async def info():
+        return {
+            "name": "fake-es",
+            "cluster_name": "fake-es",
+            "version": {"number": "9.0.0", "build_flavor": "default"},
+            "tagline": "You Know, for Search",
+        }
+
+    @app.api_route("/{index}/_search", methods=["GET", "POST"])
+    async def search(index: str, request: Request):
+        body = json.loads(await request.body() or b"{}")
+        source = body.get("_source")
+        if "_source_includes" in request.query_params:
+            source = request.query_params["_source_includes"].split(",")
+        result = await asyncio.to_thread(
+            search_response,
+            _query_text(body.get("query", {})),
+            int(request.query_params.get("size", body.get("size", 10))),
+            source,
+        )
+        app.state.stats["searches"] += 1
+        return result
+
+    @app.api_route("/{index}/_msearch", methods=["GET", "POST"])
+    async def msearch(index: str, request: Request):
+        lines = [json.loads(line) for line in (await request.body()).splitlines() if line.strip()]
+        bodies = lines[1::2]
+
+        def run():
+            return [
+                {
+                    **search_response(
+                        _query_text(body.get("query", {})),
+                        int(body.get("size", 10)),
+                        body.get("_source"),
+                    ),
+                    "status": 200,
+                }
+                for body in bodies
+            ]
+
+        start = time.perf_counter()
+        responses = await asyncio.to_thread(run)
+        app.state.stats["msearches"] += 1
+        return {"took": int((time.perf_counter() - start) * 1000), "responses": responses}
+
+    @app.api_route("/{index}/_mget", methods=["GET", "POST"])
+    async def mget(index: str, request: Request):
+        body = json.loads(await request.body() or b"{}")
+        doc_ids = body.get("ids") or [doc["_id"] for doc in body.get("docs", [])]
+        found = {doc["_id"]: doc for doc in await asyncio.to_thread(backend.mget_sync, doc_ids)}
+        app.state.stats["mgets"] += 1
+        return {
+            "docs": [
+                found.get(doc_id, {"_index": index, "_id": doc_id, "found": False})
+                for doc_id in doc_ids
+            ]
+        }
+
+    @app.api_route("/_bulk", methods=["POST", "PUT"])
+    @app.api_route("/{index}/_bulk", methods=["POST", "PUT"])
+    async def bulk(request: Request, index: str = "serp-ai"):
+        lines = (await request.body()).splitlines()
+        items = []
+        for line in lines[::2]:
+            if not line.strip():
+                continue
+            action_type, action = next(iter(json.loads(line).items()))
+            items.append(
+                {
+                    action_type: {
+                        "_index": action.get("_index", index),
+                        "_id": action.get("_id"),
+                        "result": "created",
+                        "status": 201,
+                    }
+                }
+            )
+        app.state.stats["bulk_docs"] += len(items)
+        return {"took": 0, "errors": False, "items": items}
+
+    @app.api_route("/{index}", methods=["PUT", "DELETE", "HEAD"])
+    async def index_admin(index: str, request: Request):
+        if request.method == "HEAD":
+            return Response(status_code=404)
+        return {"acknowledged": True, "index": index}
+
+    @app.post("/{index}/_refresh")
+    async def refresh(index: str):
+        return {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+
+    @app.exception_handler(json.JSONDecodeError)
+    async def bad_json(request: Request, exc: json.JSONDecodeError):
+        return JSONResponse(
+            status_code=400,
+            content={"error": {"type": "parse_exception", "reason": str(exc)}, "status": 400},
+        )
+
+    return app
+
+
+class FakeESServer:
+    """Runs the fake Elasticsearch app with uvicorn on a background thread."""
+
+    def __init__(self, index_dir: str, host: str = "127.0.0.1", port: int = 9201, **app_kwargs):
+        self.app = create_fake_es_app(index_dir, **app_kwargs)
+        self.url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(
+            uvicorn.Config(self.app, host=host, port=port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def stats(self) -> Dict:
+        return self.app.state.stats
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Serve a fake Elasticsearch from a local index for offline benchmarks."
+    )
+    argparse.add_argument("--index_dir", required=True, help="Index from benchmarks.fixtures.")
+    argparse.add_argument("--host", default="127.0.0.1")
+    argparse.add_argument("--port", type=int, default=9201)
+    argparse.add_argument("--latency_ms", type=float, default=0.0)
+    args = argparse.parse_args()
+
+    uvicorn.run(
+        create_fake_es_app(args.index_dir, latency_ms=args.latency_ms),
+        host=args.host,
+        port=args.port,
+    )
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import threading
+import time
+from argparse import ArgumentParser
+from typing import Dict
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+def create_fake_llm_app(
+    token_delay_s: float = 0.02, num_tokens: int = 200, token: str = "lorem "
+) -> FastAPI:
+    """
+    OpenAI/TogetherAI-compatible `/v1/chat/completions` stand-in that streams
+    `num_tokens` chunks, one every `token_delay_s` seconds.
+
+    `app.state.stats` records how many tokens each stream produced and whether
+    the client went away before the end, so callers can check that abandoned
+    generations really stop upstream.
+    """
+    app = FastAPI()
+    app.state.stats = {
+        "streams_started": 0,
+        "streams_completed": 0,
+        "streams_cancelled": 0,
+        "tokens_sent": 0,
+    }
+
+    def chunk(index: int, content: str, finish_reason=None) -> str:
+        payload = {
+            "id": f"fake-{index}",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": "fake-llm",
+            "choices": [
+                {
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": content},
+                    "finish_reason": finish_reason,
+                }
+            ],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats = app.state.stats
+        max_tokens = min(num_tokens, int(body.get("max_tokens") or num_tokens))
+
+        async def stream():
+            stats["streams_started"] += 1
+            sent = 0
+            try:
+                for i in range(max_tokens):
+                    await asyncio.sleep(token_delay_s)
+                    yield chunk(i, token)
+                    sent += 1
+                    stats["tokens_sent"] += 1
+                yield chunk(max_tokens, "", finish_reason="stop")
+                yield "data: [DONE]\n\n"
+                stats["streams_completed"] += 1
+            except asyncio.CancelledError:
+                stats["streams_cancelled"] += 1
+                raise
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+class FakeLLMServer:
+    """Runs the fake LLM app with uvicorn on a background thread."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, **app_kwargs):
+        self.app = create_fake_llm_app(**app_kwargs)
+        self.base_url = f"http://{host}:{port}/v1"
+        self._server = uvicorn.Server(
+            uvicorn.Config(self.app, host=host, port=port, log_level="warning")
+        )
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def stats(self) -> Dict:
+        return self.app.state.stats
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(description="Serve a fake streaming LLM for local testing.")
+    argparse.add_argument("--host", default="127.0.0.1")
+    argparse.add_argument("--port", type=int, default=8765)
+    argparse.add_argument("--token_delay_ms", type=float, default=20)
+    argparse.add_argument("--num_tokens", type=int, default=200)
+    args = argparse.parse_args()
+
+    uvicorn.run(
+        create_fake_llm_app(
+            token_delay_s=args.token_delay_ms / 1000, num_tokens=args.num_tokens
+        ),
+        host=args.host,
+        port=args.port,
+    )
@@ -0,0 +1,125 @@
+import os
+import random
+import time
+from argparse import ArgumentParser
+from typing import Dict
+
+from app.services.local_search import build_local_index
+from app.services.suggest import build_suggest_index
+from app.tools.bibtex_parser import Parser
+from app.tools.ingest import ESIngest
+from benchmarks.load_search import DEFAULT_QUERIES
+
+# Titles and abstracts are drawn from the benchmark queries' words plus
+# filler, so every query has matches with a realistic score spread.
+QUERY_WORDS = sorted({word for query in DEFAULT_QUERIES for word in query.split()})
+FILLER_WORDS = [
+    "approach", "analysis", "benchmark", "corpus", "dataset", "efficient", "empirical",
+    "framework", "improving", "large", "method", "multilingual", "novel", "robust",
+    "scalable", "study", "supervised", "survey", "task", "towards", "unsupervised",
+    "adaptation", "alignment", "attention", "bias", "classification", "compression",
+    "contrastive", "decoding", "distillation", "embedding", "generation", "inference",
+    "parsing", "pretraining", "representation", "sampling", "search", "summarization",
+]
+FIRST_NAMES = ["Alice", "Bob", "Chen", "Dana", "Emre", "Fatima", "Goro", "Hana", "Ivan", "Jia"]
+LAST_NAMES = ["Smith", "Jones", "Wang", "Garcia", "Kim", "Müller", "Sato", "Rossi", "Singh", "Novak"]
+VENUES = [
+    ("inproceedings", "booktitle", "Proceedings of the Annual Meeting of the ACL"),
+    ("inproceedings", "booktitle", "Proceedings of EMNLP"),
+    ("inproceedings", "booktitle", "Proceedings of SIGIR"),
+    ("article", "journal", "Transactions of the ACL"),
+    ("article", "journal", "Computational Linguistics"),
+]
+PUBLISHERS = ["Association for Computational Linguistics", "ACM", "MIT Press"]
+
+
+def _words(rng: random.Random, count: int) -> str:
+    return " ".join(
+        rng.choice(QUERY_WORDS) if rng.random() < 0.3 else rng.choice(FILLER_WORDS)
+        for _ in range(count)
+    )
+
+
+def write_synthetic_bibtex(filepath: str, num_docs: int, seed: int = 0):
+    """
+    Writes `num_docs` BibTeX entries generated from `seed`, so every run and
+    every commit benchmarks the same corpus.
+    """
+    rng = random.Random(seed)
+    with open(filepath, "w", encoding="utf-8") as f:
+        for i in range(num_docs):
+            entry_type, venue_field, venue = rng.choice(VENUES)
+            authors = " and ".join(
+                f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+                for _ in range(rng.randint(1, 4))
+            )
+            first_page = rng.randint(1, 900)
+            f.write(
+                f"@{entry_type}{{bench{i},\n"
+                f"    title = \"{_words(rng, rng.randint(5, 12)).capitalize()}\",\n"
+                f"    author = \"{authors}\",\n"
+                f"    {venue_field} = \"{venue}\",\n"
+                f"    year = \"{rng.randint(1990, 2024)}\",\n"
+                f"    publisher = \"{rng.choice(PUBLISHERS)}\",\n"
+                f"    pages = \"{first_page}--{first_page + rng.randint(5, 15)}\",\n"
+                f"    abstract = \"{_words(rng, rng.randint(60, 160)).capitalize()}.\",\n"
+                f"    url = \"https://example.org/bench{i}\"\n"
+                "}\n\n"
+            )
+
+
+def build_fixture(
+    output_dir: str, num_docs: int, seed: int = 0, index_name: str = "serp-ai"
+) -> Dict:
+    """
+    Builds the benchmark corpus through the real ingestion code: a synthetic
+    BibTeX file, parsed with `Parser.parse_file`, written as bulk NDJSON by
+    `generate_ndjson_for_bulk_api` and indexed into a local BM25 index that
+    the fake Elasticsearch serves, plus the /suggest index. Returns the paths
+    and the docs/s of each step.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {
+        "bibtex": os.path.join(output_dir, "corpus.bib"),
+        "ndjson": os.path.join(output_dir, "corpus.ndjson"),
+        "local_index": os.path.join(output_dir, "local_index"),
+        "suggest_index": os.path.join(output_dir, "suggest_index"),
+    }
+    write_synthetic_bibtex(paths["bibtex"], num_docs, seed)
+
+    parser = Parser()
+    start = time.perf_counter()
+    documents = parser.parse_file(paths["bibtex"])
+    parse_s = time.perf_counter() - start
+    parser.generate_ndjson_for_bulk_api(documents, index_name, paths["ndjson"])
+
+    start = time.perf_counter()
+    meta = build_local_index(
+        (
+            (action["_id"], action["_source"])
+            for action in ESIngest().iter_ndjson_actions(paths["ndjson"])
+        ),
+        paths["local_index"],
+        index_name=index_name,
+    )
+    index_s = time.perf_counter() - start
+    build_suggest_index(documents, paths["suggest_index"])
+    return {
+        **paths,
+        "docs": len(documents),
+        "parse_file_docs_per_s": round(len(documents) / parse_s, 1),
+        "local_index_docs_per_s": round(meta["num_docs"] / index_s, 1),
+    }
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Generate the synthetic benchmark corpus (BibTeX, bulk NDJSON and local index)."
+    )
+    argparse.add_argument("--output_dir", default="bench_data")
+    argparse.add_argument("--docs", type=int, default=5000)
+    argparse.add_argument("--seed", type=int, default=0)
+    args = argparse.parse_args()
+
+    print(build_fixture(args.output_dir, args.docs, args.seed))
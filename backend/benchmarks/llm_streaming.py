@@ -0,0 +1,102 @@
+import asyncio
+import json
+import time
+from argparse import ArgumentParser
+from typing import Dict
+
+from together import AsyncTogether
+
+from app.services.services import stream_rag_response
+from benchmarks.fake_llm import FakeLLMServer
+
+DOCUMENTS = [
+    {"_id": f"doc-{i}", "_source": {"text": f"Document {i} about retrieval."}}
+    for i in range(5)
+]
+
+
+async def measure_loop_lag(stop: asyncio.Event, interval_s: float = 0.005) -> float:
+    """Largest delay observed between scheduled ticks of the event loop."""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval_s)
+        worst = max(worst, loop.time() - start - interval_s)
+    return worst
+
+
+async def consume(client: AsyncTogether, max_tokens: int = None) -> int:
+    tokens = 0
+    stream = stream_rag_response(
+        query="retrieval", documents=DOCUMENTS, together_client=client, model_name="fake"
+    )
+    try:
+        async for _ in stream:
+            tokens += 1
+            if max_tokens is not None and tokens >= max_tokens:
+                break
+    finally:
+        # Same path as a StreamingResponse whose client disconnected.
+        await stream.aclose()
+    return tokens
+
+
+async def run(server: FakeLLMServer, concurrency: int, cancel_after: int) -> Dict:
+    client = AsyncTogether(api_key="fake", base_url=server.base_url)
+    # Warm up the connection pool and the client's lazy imports.
+    await consume(client, max_tokens=1)
+    await asyncio.sleep(0.2)
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(measure_loop_lag(stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(consume(client) for _ in range(concurrency)))
+    streaming_wall = time.perf_counter() - start
+    stop.set()
+    max_lag = await lag_task
+
+    completed_tokens = server.stats["tokens_sent"]
+    cancelled_before = server.stats["streams_cancelled"]
+    await consume(client, max_tokens=cancel_after)
+    # Give the fake server a moment to notice the closed connection.
+    await asyncio.sleep(0.5)
+    tokens_after_cancel = server.stats["tokens_sent"] - completed_tokens
+    await asyncio.sleep(0.5)
+    tokens_still_flowing = server.stats["tokens_sent"] - completed_tokens - tokens_after_cancel
+
+    return {
+        "concurrent_streams": concurrency,
+        "streaming_wall_s": round(streaming_wall, 3),
+        "max_event_loop_lag_ms": round(max_lag * 1000, 2),
+        "cancel_after_tokens": cancel_after,
+        "tokens_generated_for_cancelled_stream": tokens_after_cancel,
+        "tokens_generated_after_cancel_settled": tokens_still_flowing,
+        "upstream_stream_cancelled": server.stats["streams_cancelled"] > cancelled_before,
+    }
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Check that LLM streaming does not block the event loop and stops on disconnect."
+    )
+    argparse.add_argument("--concurrency", type=int, default=8)
+    argparse.add_argument("--token_delay_ms", type=float, default=10)
+    argparse.add_argument("--num_tokens", type=int, default=100)
+    argparse.add_argument("--cancel_after", type=int, default=5)
+    argparse.add_argument("--port", type=int, default=8765)
+    argparse.add_argument("--output_path", help="Optional JSON file for results.")
+    args = argparse.parse_args()
+
+    with FakeLLMServer(
+        port=args.port,
+        token_delay_s=args.token_delay_ms / 1000,
+        num_tokens=args.num_tokens,
+    ) as server:
+        result = asyncio.run(run(server, args.concurrency, args.cancel_after))
+
+    print(json.dumps(result, indent=2))
+    if args.output_path:
+        with open(args.output_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import statistics
+import time
+from argparse import ArgumentParser
+from typing import Dict, List
+
+import httpx
+
+
+DEFAULT_QUERIES = [
+    "transformer language models",
+    "graph neural networks",
+    "information retrieval evaluation",
+    "dense passage retrieval",
+    "neural machine translation",
+    "reinforcement learning from human feedback",
+    "cross-encoder reranking",
+    "question answering over knowledge bases",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a list of latencies."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def run_level(
+    base_url: str, queries: List[str], concurrency: int, total_requests: int
+) -> Dict:
+    """
+    Fires `total_requests` GET /search calls with at most `concurrency` in flight.
+
+    The overlap factor is the sum of the individual request latencies divided
+    by the wall-clock time. A server that serializes requests on its event loop
+    stays close to 1.0 no matter the concurrency; one that lets requests overlap
+    grows towards `concurrency`.
+
+    The queries repeat, so a backend with its search result cache enabled
+    answers almost every request from the cache. Start it with
+    `SEARCH_CACHE_MAX_ENTRIES=0` and `SEARCH_CACHE_BACKEND=none` to measure
+    retrieval and reranking instead.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+
+        async def one_request(i: int):
+            nonlocal errors
+            query = queries[i % len(queries)]
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(f"/search/{query}")
+                    response.raise_for_status()
+                except Exception as e:
+                    errors += 1
+                    print(f"Request {i} failed: {e}")
+                    return
+                latencies.append(time.perf_counter() - start)
+
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(one_request(i) for i in range(total_requests)))
+        wall = time.perf_counter() - wall_start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "errors": errors,
+        "wall_s": round(wall, 4),
+        "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "overlap_factor": round(sum(latencies) / wall, 2) if wall else 0.0,
+    }
+
+
+async def main(args):
+    results = []
+    for concurrency in args.concurrency:
+        result = await run_level(
+            args.url, DEFAULT_QUERIES, concurrency, args.requests
+        )
+        print(
+            f"c={result['concurrency']:>3}  rps={result['throughput_rps']:>8}  "
+            f"p50={result['p50_ms']:>8}ms  p99={result['p99_ms']:>8}ms  "
+            f"overlap={result['overlap_factor']}"
+        )
+        results.append(result)
+
+    if args.output_path:
+        with open(args.output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to: {args.output_path}")
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Concurrent load test against a running /search endpoint."
+    )
+    argparse.add_argument("--url", default="http://localhost:8000")
+    argparse.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 4, 16, 32]
+    )
+    argparse.add_argument("--requests", type=int, default=200)
+    argparse.add_argument("--output_path", help="Optional JSON file for results.")
+    args = argparse.parse_args()
+
+    asyncio.run(main(args))
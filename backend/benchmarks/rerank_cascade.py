@@ -0,0 +1,150 @@
+import json
+import re
+import statistics
+import time
+from argparse import ArgumentParser
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services.cascade import select_cascade_candidates
+from app.services.reranker import load_cross_encoder
+from benchmarks.bench_reranker import load_texts
+from benchmarks.load_search import DEFAULT_QUERIES
+
+
+def overlap_candidates(queries: List[str], texts: List[str], size: int) -> List[Dict]:
+    """Per query, the `size` texts sharing the most terms, with that overlap as the cheap score."""
+    tokenized = [set(re.findall(r"\w+", text.lower())) for text in texts]
+    candidates = []
+    for query in queries:
+        terms = set(re.findall(r"\w+", query.lower()))
+        overlap = [(len(terms & doc_terms), i) for i, doc_terms in enumerate(tokenized)]
+        overlap.sort(key=lambda x: (-x[0], x[1]))
+        candidates.append(
+            {
+                "query": query,
+                "texts": [texts[i] for _, i in overlap[:size]],
+                "first_stage_scores": [float(score) for score, _ in overlap[:size]],
+            }
+        )
+    return candidates
+
+
+def score_pairs(model, query: str, texts: List[str]):
+    start = time.perf_counter()
+    scores = np.asarray(model.predict([[query, text] for text in texts]))
+    return scores, time.perf_counter() - start
+
+
+def evaluate(
+    candidates: List[Dict],
+    full_scores: List[np.ndarray],
+    cheap_scores: List[List[float]],
+    ms_per_full_pair: float,
+    ms_per_cheap_pair: float,
+    k: int,
+    margin: Optional[float],
+    max_depth: Optional[int],
+) -> Dict:
+    recalls = []
+    reranked = 0
+    total = 0
+    for candidate, full, cheap in zip(candidates, full_scores, cheap_scores):
+        indices = list(range(len(candidate["texts"])))
+        selected = select_cascade_candidates(
+            indices, cheap, k, margin=margin, max_depth=max_depth
+        )
+        reference = set(np.argsort(-full)[:k].tolist())
+        kept = set(sorted(selected, key=lambda i: -full[i])[:k])
+        recalls.append(len(reference & kept) / min(k, len(indices)))
+        reranked += len(selected)
+        total += len(indices)
+
+    full_cost = total * ms_per_full_pair
+    cascade_cost = reranked * ms_per_full_pair + total * ms_per_cheap_pair
+    return {
+        "margin": margin,
+        "max_depth": max_depth,
+        f"recall@{k}": round(statistics.mean(recalls), 4),
+        "reranked_fraction": round(reranked / total, 4),
+        "cpu_saved": round(1 - cascade_cost / full_cost, 4),
+    }
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Offline recall@k loss vs. CPU saved by the rerank cascade."
+    )
+    argparse.add_argument("--ndjson", required=True, help="Bulk-API NDJSON file to draw documents from.")
+    argparse.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    argparse.add_argument("--backend", default="torch")
+    argparse.add_argument(
+        "--cheap_model",
+        help="Smaller cross-encoder for the cheap pass; the first-stage term overlap is used otherwise.",
+    )
+    argparse.add_argument("--num_docs", type=int, default=2000)
+    argparse.add_argument("--candidates", type=int, default=20)
+    argparse.add_argument("--k", type=int, default=5)
+    argparse.add_argument(
+        "--margins", type=float, nargs="+", default=[0.25, 0.5, 1.0, 1.5, 2.0]
+    )
+    argparse.add_argument("--max_depths", type=int, nargs="*", default=[10, 15])
+    argparse.add_argument("--output_path", help="Optional JSON file for results.")
+    args = argparse.parse_args()
+
+    texts = load_texts(args.ndjson, args.num_docs)
+    candidates = overlap_candidates(DEFAULT_QUERIES, texts, args.candidates)
+
+    model = load_cross_encoder(args.model, backend=args.backend)
+    cheap_model = load_cross_encoder(args.cheap_model) if args.cheap_model else None
+    # Warm-up, so the first query does not carry the model's lazy initialization.
+    score_pairs(model, candidates[0]["query"], candidates[0]["texts"])
+    if cheap_model is not None:
+        score_pairs(cheap_model, candidates[0]["query"], candidates[0]["texts"])
+
+    full_scores, cheap_scores = [], []
+    full_seconds = cheap_seconds = 0.0
+    for candidate in candidates:
+        scores, elapsed = score_pairs(model, candidate["query"], candidate["texts"])
+        full_scores.append(scores)
+        full_seconds += elapsed
+        if cheap_model is not None:
+            scores, elapsed = score_pairs(cheap_model, candidate["query"], candidate["texts"])
+            cheap_scores.append(scores.tolist())
+            cheap_seconds += elapsed
+        else:
+            cheap_scores.append(candidate["first_stage_scores"])
+
+    num_pairs = sum(len(candidate["texts"]) for candidate in candidates)
+    ms_per_full_pair = full_seconds * 1000 / num_pairs
+    ms_per_cheap_pair = cheap_seconds * 1000 / num_pairs
+
+    settings = [(margin, None) for margin in args.margins]
+    settings += [(None, depth) for depth in args.max_depths]
+    results = {
+        "queries": len(candidates),
+        "candidates_per_query": args.candidates,
+        "cheap_scorer": args.cheap_model or "first_stage",
+        "ms_per_full_pair": round(ms_per_full_pair, 4),
+        "ms_per_cheap_pair": round(ms_per_cheap_pair, 4),
+        "settings": [
+            evaluate(
+                candidates,
+                full_scores,
+                cheap_scores,
+                ms_per_full_pair,
+                ms_per_cheap_pair,
+                args.k,
+                margin,
+                depth,
+            )
+            for margin, depth in settings
+        ],
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output_path:
+        with open(args.output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
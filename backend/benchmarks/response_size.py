@@ -0,0 +1,165 @@
+import gzip
+import json
+import statistics
+import time
+from argparse import ArgumentParser
+from typing import Callable, Dict, List, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.services.responses import (
+    RESPONSE_PROFILES,
+    brotli,
+    dumps_json,
+    orjson,
+    project_hits,
+    source_includes,
+)
+from benchmarks.bench_reranker import candidate_sets
+from benchmarks.load_search import DEFAULT_QUERIES
+
+
+def load_documents(ndjson_filepath: str, limit: int) -> List[Tuple[str, Dict]]:
+    """Reads (doc_id, source) pairs from a bulk-API NDJSON file."""
+    documents = []
+    with open(ndjson_filepath, "r", encoding="utf-8") as file:
+        for action_line in file:
+            source = json.loads(next(file))
+            action = next(iter(json.loads(action_line).values()))
+            if not isinstance(source.get("text"), str) or not source["text"].strip():
+                continue
+            documents.append((action.get("_id") or source.get("citekey"), source))
+            if len(documents) >= limit:
+                break
+    return documents
+
+
+def build_responses(
+    documents: List[Tuple[str, Dict]], candidates: int, k: int
+) -> List[Tuple[List[Dict], Dict]]:
+    """Per query, the first-stage hits and the `/search` body built from them."""
+    by_text = {source["text"]: (doc_id, source) for doc_id, source in documents}
+    responses = []
+    for query, texts in zip(
+        DEFAULT_QUERIES, candidate_sets(DEFAULT_QUERIES, list(by_text), candidates)
+    ):
+        hits = []
+        for rank, text in enumerate(texts):
+            doc_id, source = by_text[text]
+            hits.append(
+                {
+                    "_index": "serp-ai",
+                    "_id": doc_id,
+                    "_score": float(candidates - rank),
+                    "_source": source,
+                }
+            )
+        reranked = [{**hit, "cross_encoder_score": float(-i)} for i, hit in enumerate(hits[:k])]
+        responses.append(
+            (hits, {"query": query, "initial_hits_count": len(hits), "reranked_hits": reranked})
+        )
+    return responses
+
+
+def select_sources(hits: List[Dict], profile: str) -> List[Dict]:
+    """The first-stage hits as the search backend returns them for `profile`."""
+    fields = source_includes(profile)
+    if fields is None:
+        return hits
+    return [
+        {
+            **hit,
+            "_source": {name: hit["_source"][name] for name in fields if name in hit["_source"]},
+        }
+        for hit in hits
+    ]
+
+
+def fastapi_default(value) -> bytes:
+    # What FastAPI does for a plain dict returned without a response class.
+    return json.dumps(
+        jsonable_encoder(value), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def time_encoder(encode: Callable, bodies: List[Dict], repeats: int) -> float:
+    """Mean microseconds to serialize one response body."""
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for body in bodies:
+            encode(body)
+        samples.append((time.perf_counter() - start) * 1e6 / len(bodies))
+    return statistics.median(samples)
+
+
+def measure(bodies: List[Dict], encode: Callable, repeats: int) -> Dict:
+    payloads = [encode(body) for body in bodies]
+    result = {
+        "serialize_us": round(time_encoder(encode, bodies, repeats), 2),
+        "bytes": round(statistics.mean(len(p) for p in payloads)),
+        "gzip_bytes": round(statistics.mean(len(gzip.compress(p, 5)) for p in payloads)),
+    }
+    if brotli is not None:
+        result["brotli_bytes"] = round(
+            statistics.mean(len(brotli.compress(p, quality=4)) for p in payloads)
+        )
+    return result
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Payload size and serialization time of /search responses per profile and encoder."
+    )
+    argparse.add_argument("--ndjson", required=True, help="Bulk-API NDJSON file to draw documents from.")
+    argparse.add_argument("--num_docs", type=int, default=2000)
+    argparse.add_argument("--candidates", type=int, default=20)
+    argparse.add_argument("--k", type=int, default=5)
+    argparse.add_argument("--repeats", type=int, default=50)
+    argparse.add_argument("--output_path", help="Optional JSON file for results.")
+    args = argparse.parse_args()
+
+    responses = build_responses(
+        load_documents(args.ndjson, args.num_docs), args.candidates, args.k
+    )
+
+    results = {
+        "queries": len(responses),
+        "orjson": orjson is not None,
+        "brotli": brotli is not None,
+        # Bytes of `_source` the search backend sends per query, before reranking.
+        "first_stage_source_bytes": {
+            profile: round(
+                statistics.mean(
+                    len(dumps_json([hit["_source"] for hit in select_sources(hits, profile)]))
+                    for hits, _ in responses
+                )
+            )
+            for profile in RESPONSE_PROFILES
+        },
+        "responses": {},
+    }
+    for profile in RESPONSE_PROFILES:
+        bodies = [
+            {**body, "reranked_hits": project_hits(body["reranked_hits"], profile)}
+            for _, body in responses
+        ]
+        results["responses"][profile] = {
+            "fastapi_default": measure(bodies, fastapi_default, args.repeats),
+            "dumps_json": measure(bodies, dumps_json, args.repeats),
+        }
+    # Before: full `_source` through FastAPI's default encoder. After: the
+    # compact profile through `dumps_json`.
+    before = results["responses"]["full"]["fastapi_default"]
+    after = results["responses"]["compact"]["dumps_json"]
+    results["summary"] = {
+        "bytes_reduction": round(1 - after["bytes"] / before["bytes"], 4),
+        "gzip_bytes_reduction": round(1 - after["gzip_bytes"] / before["gzip_bytes"], 4),
+        "serialize_speedup": round(before["serialize_us"] / after["serialize_us"], 2),
+    }
+
+    print(json.dumps(results, indent=2))
+    if args.output_path:
+        with open(args.output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
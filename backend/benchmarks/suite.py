@@ -0,0 +1,369 @@
+import asyncio
+import json
+import os
+import platform
+import resource
+import signal
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.fake_es import FakeESServer
+from benchmarks.fake_llm import FakeLLMServer
+from benchmarks.fixtures import build_fixture
+from benchmarks.load_search import DEFAULT_QUERIES, percentile, run_level
+
+SECTIONS = ["ingest", "rerank", "search"]
+# Result keys holding measurements; the others describe the run.
+METRIC_SUFFIXES = ("_per_s", "_rps", "_ms", "_s", "_mb", "_factor")
+
+
+def git_commit() -> Optional[str]:
+    """The checked-out commit, with a `-dirty` suffix for uncommitted changes."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if dirty else commit
+
+
+def peak_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Peak RSS of `pid` from /proc (Linux), or of this process."""
+    if pid is None:
+        # ru_maxrss is in KB on Linux and in bytes on macOS.
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def measure_ingest(fixture: Dict, es_url: str, thread_counts: List[int]) -> Dict:
+    """Docs/s of `ndjson_to_ls` and of `data_ingest` into the fake Elasticsearch."""
+    from app.tools.ingest import ESIngest, IngestProgress
+
+    ingestor = ESIngest()
+    start = time.perf_counter()
+    docs = ingestor.ndjson_to_ls(fixture["ndjson"])
+    ndjson_to_ls_s = time.perf_counter() - start
+
+    ingestor.es_connect([es_url], prod=True, api_key="fake")
+    data_ingest = []
+    for thread_count in thread_counts:
+        start = time.perf_counter()
+        progress = ingestor.data_ingest(
+            ingestor.iter_ndjson_actions(fixture["ndjson"]),
+            thread_count=thread_count,
+            progress=IngestProgress(report_every_s=3600),
+        )
+        elapsed = time.perf_counter() - start
+        data_ingest.append(
+            {
+                "thread_count": thread_count,
+                "indexed": progress.indexed,
+                "errors": progress.errors,
+                "docs_per_s": round(progress.indexed / elapsed, 1),
+            }
+        )
+    ingestor.client.close()
+    return {
+        "docs": fixture["docs"],
+        "parse_file_docs_per_s": fixture["parse_file_docs_per_s"],
+        "local_index_docs_per_s": fixture["local_index_docs_per_s"],
+        "ndjson_to_ls_docs_per_s": round(len(docs) / ndjson_to_ls_s, 1),
+        "data_ingest": data_ingest,
+    }
+
+
+def measure_rerank(
+    model_name: str, ndjson_filepath: str, batch_sizes: List[int], num_pairs: int
+) -> List[Dict]:
+    """Cross-encoder pairs/s and time per batch for each `predict` batch size."""
+    from app.services.reranker import load_cross_encoder
+    from app.tools.ingest import ESIngest
+
+    texts = []
+    for action in ESIngest().iter_ndjson_actions(ndjson_filepath):
+        texts.append(action["_source"]["text"])
+        if len(texts) >= num_pairs:
+            break
+    pairs = [[DEFAULT_QUERIES[i % len(DEFAULT_QUERIES)], text] for i, text in enumerate(texts)]
+
+    model = load_cross_encoder(model_name)
+    model.predict(pairs[: max(batch_sizes)], batch_size=max(batch_sizes))
+    results = []
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        model.predict(pairs, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        results.append(
+            {
+                "batch_size": batch_size,
+                "pairs": len(pairs),
+                "pairs_per_s": round(len(pairs) / elapsed, 1),
+                "ms_per_batch": round(elapsed * 1000 / -(-len(pairs) // batch_size), 3),
+            }
+        )
+        print(json.dumps(results[-1]))
+    return results
+
+
+def start_api(
+    port: int, es_url: str, llm_url: str, model_name: str, suggest_index: str, timeout_s: float
+):
+    """Launches the API against the stand-ins, with every result cache off."""
+    env = {
+        **os.environ,
+        "SUGGEST_INDEX_PATH": suggest_index,
+        "SEARCH_BACKEND": "elasticsearch",
+        "ELASTIC_URL_PROD": es_url,
+        "API_KEY": "fake",
+        "TOGETHER_API_KEY": "fake",
+        "TOGETHER_BASE_URL": llm_url,
+        "CROSS_ENCODER_MODEL": model_name,
+        "EMBEDDING_MODEL": "",
+        "CONTEXT_TOKENIZER": "",
+        # Every request has to do the work being measured.
+        "SEARCH_CACHE_MAX_ENTRIES": "0",
+        "PAIR_SCORE_CACHE_PATH": "",
+        "SUMMARY_CACHE_MAX_BYTES": "0",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.perf_counter() + timeout_s
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"API exited during startup with status {process.returncode}.")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready", timeout=2.0).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    stop_api(process)
+    raise TimeoutError(f"API not ready after {timeout_s}s.")
+
+
+def stop_api(process: subprocess.Popen):
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def measure_search_stream(base_url: str, queries: List[str], requests: int) -> Dict:
+    """
+    Latency of `/search_stream` until the results event, the first summary
+    token and the end of the stream, one request at a time.
+    """
+    results_at, first_token_at, done_at = [], [], []
+    async with httpx.AsyncClient(base_url=base_url, timeout=120.0) as client:
+        for i in range(requests):
+            start = time.perf_counter()
+            async with client.stream("GET", f"/search_stream/{queries[i % len(queries)]}") as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line == "event: results":
+                        results_at.append(time.perf_counter() - start)
+                    elif line == "event: token" and len(first_token_at) < len(results_at):
+                        first_token_at.append(time.perf_counter() - start)
+            done_at.append(time.perf_counter() - start)
+
+    def summary(values: List[float]) -> Dict:
+        return {
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "mean_ms": round(statistics.fmean(values) * 1000, 2) if values else 0.0,
+        }
+
+    return {
+        "requests": requests,
+        "results_event": summary(results_at),
+        "first_token": summary(first_token_at),
+        "complete": summary(done_at),
+    }
+
+
+async def measure_suggest(base_url: str, queries: List[str]) -> Dict:
+    """Latency of /suggest for every prefix of `queries`, as typed, one request at a time."""
+    latencies = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=30.0) as client:
+        for query in queries:
+            for end in range(1, len(query) + 1):
+                start = time.perf_counter()
+                response = await client.get("/suggest", params={"q": query[:end]})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+    return {
+        "requests": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 3),
+    }
+
+
+def measure_search(args, fixture: Dict, es: FakeESServer) -> Dict:
+    with FakeLLMServer(
+        port=args.llm_port,
+        token_delay_s=args.token_delay_ms / 1000,
+        num_tokens=args.num_tokens,
+    ) as llm:
+        process = start_api(
+            args.api_port,
+            es.url,
+            llm.base_url,
+            args.model,
+            fixture["suggest_index"],
+            args.startup_timeout_s,
+        )
+        base_url = f"http://127.0.0.1:{args.api_port}"
+        try:
+            levels = []
+            for concurrency in args.concurrency:
+                levels.append(
+                    asyncio.run(run_level(base_url, DEFAULT_QUERIES, concurrency, args.requests))
+                )
+                print(json.dumps(levels[-1]))
+            search_stream = asyncio.run(
+                measure_search_stream(base_url, DEFAULT_QUERIES, args.stream_requests)
+            )
+            print(json.dumps(search_stream))
+            suggest = asyncio.run(measure_suggest(base_url, DEFAULT_QUERIES))
+            print(json.dumps(suggest))
+            api_peak_rss_mb = peak_rss_mb(process.pid)
+        finally:
+            stop_api(process)
+    return {
+        "levels": levels,
+        "search_stream": search_stream,
+        "suggest": suggest,
+        "api_peak_rss_mb": api_peak_rss_mb,
+    }
+
+
+def flatten_metrics(results, prefix: str = "") -> Dict[str, float]:
+    """Numeric leaves of a results document, keyed by their path."""
+    metrics = {}
+    if isinstance(results, dict):
+        for key, value in results.items():
+            if key != "meta":
+                metrics.update(flatten_metrics(value, f"{prefix}{key}."))
+    elif isinstance(results, list):
+        for i, value in enumerate(results):
+            label = next(
+                (
+                    f"{key}={value[key]}"
+                    for key in ("concurrency", "batch_size", "thread_count")
+                    if isinstance(value, dict) and key in value
+                ),
+                str(i),
+            )
+            metrics.update(flatten_metrics(value, f"{prefix}{label}."))
+    elif isinstance(results, (int, float)) and not isinstance(results, bool):
+        metrics[prefix.rstrip(".")] = results
+    return metrics
+
+
+def compare_results(baseline: Dict, current: Dict):
+    """Prints every metric that is in both runs, with its relative change."""
+    print(
+        f"Compared with {baseline.get('meta', {}).get('commit')} "
+        f"(now {current['meta']['commit']}):"
+    )
+    old, new = flatten_metrics(baseline), flatten_metrics(current)
+    for key in sorted(old.keys() & new.keys()):
+        if not key.endswith(METRIC_SUFFIXES):
+            continue
+        change = f"{(new[key] - old[key]) / old[key] * 100:+.1f}%" if old[key] else "n/a"
+        print(f"  {key}: {old[key]} -> {new[key]} ({change})")
+
+
+def main(args) -> Dict:
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="serp-bench-")
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ("output_path", "baseline")},
+        }
+    }
+
+    print(f"Building a {args.docs}-document fixture in {work_dir}...")
+    fixture = build_fixture(work_dir, args.docs, seed=args.seed)
+    with FakeESServer(fixture["local_index"], port=args.es_port, latency_ms=args.es_latency_ms) as es:
+        if "ingest" in args.sections:
+            results["ingest"] = measure_ingest(fixture, es.url, args.ingest_threads)
+            print(json.dumps(results["ingest"]))
+        if "rerank" in args.sections:
+            results["rerank"] = measure_rerank(
+                args.model, fixture["ndjson"], args.rerank_batch_sizes, args.rerank_pairs
+            )
+        if "search" in args.sections:
+            results["search"] = measure_search(args, fixture, es)
+    results["suite_peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+if __name__ == "__main__":
+
+    argparse = ArgumentParser(
+        description="Offline benchmark suite: ingestion, reranking and /search against "
+        "a fake Elasticsearch and a fake streaming LLM."
+    )
+    argparse.add_argument("--sections", nargs="+", choices=SECTIONS, default=SECTIONS)
+    argparse.add_argument("--docs", type=int, default=5000)
+    argparse.add_argument("--seed", type=int, default=0)
+    argparse.add_argument("--work_dir", help="Fixture directory (default: a new temporary one).")
+    argparse.add_argument("--model", default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    argparse.add_argument("--ingest_threads", type=int, nargs="+", default=[1, 4])
+    argparse.add_argument("--rerank_batch_sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    argparse.add_argument("--rerank_pairs", type=int, default=512)
+    argparse.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    argparse.add_argument("--requests", type=int, default=200)
+    argparse.add_argument("--stream_requests", type=int, default=20)
+    argparse.add_argument("--es_latency_ms", type=float, default=2.0)
+    argparse.add_argument("--token_delay_ms", type=float, default=10.0)
+    argparse.add_argument("--num_tokens", type=int, default=100)
+    argparse.add_argument("--api_port", type=int, default=8790)
+    argparse.add_argument("--es_port", type=int, default=9201)
+    argparse.add_argument("--llm_port", type=int, default=8791)
+    argparse.add_argument("--startup_timeout_s", type=float, default=300.0)
+    argparse.add_argument(
+        "--baseline", help="Results JSON of an earlier run to compare this run against."
+    )
+    argparse.add_argument("--output_path", help="Optional JSON file for results.")
+    args = argparse.parse_args()
+
+    results = main(args)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare_results(json.load(f), results)
+    if args.output_path:
+        with open(args.output_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to: {args.output_path}")
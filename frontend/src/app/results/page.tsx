@@ -119,7 +119,9 @@ export default function SearchResults() {
                     },
                     body: JSON.stringify({
                         query: searchQuery,
-                        documents: searchResults.reranked_hits,
+                        document_ids: searchResults.reranked_hits.map(
+                            (hit) => hit._id
+                        ),
                     }),
                 }
             );